@@ -37,7 +37,7 @@ class Company(modelBase):
     uuid = models.UUIDField(verbose_name=_('uuid'), 
                 primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(verbose_name=_('company name'), 
-                max_length=100, default=_('default company name'))
+                max_length=100, default=_('default company name'), db_index=True)
     url = models.URLField(verbose_name=_('company url'),
                 max_length=2083, null=True, blank=True)
 
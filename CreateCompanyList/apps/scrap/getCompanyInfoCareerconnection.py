@@ -2,12 +2,15 @@
 
 import re
 import os
-from typing import List
+from typing import Generator, List
 from datetime import datetime
 
+from lxml.html import HtmlElement
 from selenium.webdriver.common.by import By
+from selenium.webdriver.firefox.webdriver import WebDriver as FirefoxWebDriver
 
-from scrapCompanyInfo import GetCompanyInfoMixin
+from scrapCompanyInfo import GetCompanyInfoMixin, ListingPage
+from common.utils.companyNameSet import CompanyNameSet
 
 
 class GetCompanyInfoCareerconnection(GetCompanyInfoMixin):
@@ -57,83 +60,81 @@ class GetCompanyInfoCareerconnection(GetCompanyInfoMixin):
         return c_name
 
 
-    def _create_company_name_list(self, url_: str, output_list: List[str]) -> List[str]:
-        # 会社一覧ページをパース
-        company_name_list = []
-        driver = self.init_selenium_ff_get_page(url_=url_)
+    def _get_listing_page(
+        self,
+        driver: FirefoxWebDriver,
+        url_: str,
+        output_list: CompanyNameSet
+    ) -> ListingPage:
+        """
+        ブラウザで一覧ページを開き、同じDOMから会社名と次のページURLを取り出す
+        """
+        self.load_page(driver=driver, url_=url_)
+        # ページのDOMをまとめて取得
+        tree = self.get_page_tree(driver=driver, ready_locator=(By.CLASS_NAME, "recommend_list"))
+        return ListingPage(
+            company_names=self._create_company_name_list(tree=tree, output_list=output_list),
+            next_url=self._get_next_page_url(tree=tree)
+        )
+
+
+    def _create_company_name_list(self, tree: HtmlElement, output_list: CompanyNameSet) -> CompanyNameSet:
+        # 会社一覧ページから会社名を取得
+        company_name_list = CompanyNameSet()
         # 会社名の一覧のエレメントを取得
-        company_name_element = driver.find_element(By.CLASS_NAME, "recommend_list")
-        if company_name_element:
-            c_name_elements = company_name_element.find_elements(By.XPATH, ".//li/h2/a")
+        company_name_element = tree.find_class("recommend_list")[0]
+        if company_name_element is not None:
+            c_name_elements = company_name_element.xpath(".//li/h2/a")
             for c_name_element in c_name_elements:
-                conpany_name_text = c_name_element.text
+                conpany_name_text = self.get_element_text(c_name_element)
                 # 会社名の後に続く不要な文言を削除
                 conpany_name_text = self._remove_other_company_name(company_name=conpany_name_text)
                 if conpany_name_text not in company_name_list \
                                 and conpany_name_text not in output_list:
                     print(f"company name: {conpany_name_text}")
                     # 重複なし
-                    company_name_list.append(conpany_name_text)
-        driver.close()
+                    company_name_list.add(conpany_name_text)
         return company_name_list
 
 
-    def _get_next_page_url(self, url_: str) -> str:
+    def _get_next_page_url(self, tree: HtmlElement) -> str:
         """
         次のページ用のURLを取得
         """
-        driver = self.init_selenium_ff_get_page(url_=url_)
         p_next = None
         try:
             # 次のページのエレメントを取得
-            paging_element = driver.find_element(By.XPATH, "/html/body/div[1]/div[3]/div/div/ul/li/div[2]/ul/ul/ul/li[3]/a")
-            p_next = paging_element if "次の" in paging_element.text else None
+            paging_element = tree.xpath("/html/body/div[1]/div[3]/div/div/ul/li/div[2]/ul/ul/ul/li[3]/a")[0]
+            p_next = paging_element if "次の" in self.get_element_text(paging_element) else None
         except:
             pass
         nextpage = ""
-        if p_next:
+        if p_next is not None:
             # 次のページのURLが存在する
-            nextpage = p_next.get_attribute("href")
+            nextpage = p_next.get("href", "")
             print(f"next page: {nextpage}")
-        # ドライバを閉じる
-        driver.close()
         return nextpage
 
 
-    def execute(
+    def crawl_company_names(
         self,
-        source: str = "キャリコネ",
-        output_filename: str = "./temp.txt",
-        output_filename_csv: str = "./temp.csv",
-        output_flg: bool = False
-    ) -> List[str]:
+        source: str,
+        output_list: CompanyNameSet
+    ) -> Generator[str, None, None]:
         """
-        会社名リスト作成を実行
+        一覧ページから会社名を順に取得(取得した会社名はoutput_listにも追加)
         """
-        # Slack通知
-        self.slack_client.post_message(
-            source=source,
-            message="処理を開始します。"
-        )
-        output_company_list = []
         try:
-            # 検索ページトップ画面の一覧から会社名を取得
-            c_name_list = self._create_company_name_list(
-                        url_=self.SEARCH_PAGE_URL, output_list=output_company_list)
-            output_company_list.extend(c_name_list)
-            print(f"output_company_list: {output_company_list}")
-            # 次のページURL取得
-            next_url = self._get_next_page_url(url_=self.SEARCH_PAGE_URL)
-            while next_url:
-                output_company_list.extend(
-                        self._create_company_name_list(
-                                url_=next_url, output_list=output_company_list).copy())
-                # 次のページURL取得
-                next_url = self._get_next_page_url(url_=next_url)
-                if not next_url:
-                    # 次のページがない場合、ループ終了
-                    print("This is the last page.")
-                    break
+            # 1つのブラウザで検索ページトップ画面から順に一覧の会社名を取得
+            with self.driver_session() as driver:
+                for listing_page in self.iter_listing_pages(
+                        start_url=self.SEARCH_PAGE_URL,
+                        source=source,
+                        get_listing_page=lambda url_: self._get_listing_page(
+                                driver=driver, url_=url_, output_list=output_list)):
+                    output_list.extend(listing_page.company_names)
+                    yield from listing_page.company_names
+            print("This is the last page.")
         except Exception as e:
             import traceback
             # Slack通知
@@ -143,20 +144,31 @@ class GetCompanyInfoCareerconnection(GetCompanyInfoMixin):
                 status="warn"
             )
 
-        if output_flg:
-            # 外部ファイルへの書き出し
-            self.output_data(filename_=output_filename,
-                    data_list=output_company_list)
+
+    def execute(
+        self,
+        source: str = "キャリコネ",
+        output_filename: str = "./temp.txt",
+        output_filename_csv: str = "./temp.csv",
+        output_flg: bool = False
+    ) -> CompanyNameSet:
+        """
+        会社名リスト作成を実行
+        """
         # Slack通知
         self.slack_client.post_message(
             source=source,
-            message=f"媒体から会社名の取得が完了しました。 {len(output_company_list)} 件"
+            message="処理を開始します。"
         )
-        # 取得した会社名リストにHPのURLを付与したデータをDBへ登録
-        _ = self.create_company_info(
-            company_name_list=output_company_list,
+        output_company_list = CompanyNameSet()
+        # 一覧ページから取得した会社名にHPのURLを付与したデータをDBへ登録
+        self.collect_company_info(
+            company_names=self.crawl_company_names(
+                    source=source, output_list=output_company_list),
+            output_list=output_company_list,
             source=source,
-            output_filename=output_filename_csv,
+            output_filename=output_filename,
+            output_filename_csv=output_filename_csv,
             output_flg=output_flg
         )
         # 出力用ファイル名を設定
@@ -1,17 +1,17 @@
 # -*- coding: utf-8 -*-
 
-import time
 import os
-from typing import List, Tuple, Union
+from typing import Generator, List, Union
 from datetime import datetime
 from enum import Enum
 
+from lxml.html import HtmlElement
 from selenium.webdriver.chrome.webdriver import WebDriver as ChromeWebDriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.firefox.webdriver import WebDriver as FirefoxWebDriver
 
-from scrapCompanyInfo import GetCompanyInfoMixin
-from common.utils.utils import generate_interval
+from scrapCompanyInfo import GetCompanyInfoMixin, ListingPage
+from common.utils.companyNameSet import CompanyNameSet
 
 
 class PrefectureType(Enum):
@@ -87,6 +87,11 @@ class GetCompanyInfoEngage(GetCompanyInfoMixin):
     """
     # 【】や()の文字列を検出するパターン
     PTN = "(.+)(【|（)(.+)(】|）)"
+    # サイトへのアクセス間隔(秒)と待機時のゆらぎ(秒). 間隔は応答を見て上下限の範囲で調整
+    REQUEST_INTERVAL = 30
+    REQUEST_INTERVAL_MIN = 10
+    REQUEST_INTERVAL_MAX = 300
+    REQUEST_JITTER = 10
 
     def __init__(
         self,
@@ -113,46 +118,59 @@ class GetCompanyInfoEngage(GetCompanyInfoMixin):
         return company_name
 
 
-    def _create_company_name_list(
+    def _get_listing_page(
         self,
+        driver: Union[ChromeWebDriver, FirefoxWebDriver],
         url_: str,
-        output_list: List[str] = []
-    ) -> Tuple[List[str], str]:
-        company_name_list = []
-        # 企業詳細ページを展開
-        driver = self.init_selenium_ff_get_page(url_=url_)
-        company_name_list_elements = driver\
-                .find_elements(By.CLASS_NAME, "company_name_anchor")
+        output_list: CompanyNameSet
+    ) -> ListingPage:
+        """
+        ブラウザで一覧ページを開き、同じDOMから会社名と次のページURLを取り出す
+        """
+        self.load_page(driver=driver, url_=url_)
+        # ページのDOMをまとめて取得
+        tree = self.get_page_tree(driver=driver, ready_locator=(By.CLASS_NAME, "company_name_anchor"))
+        return ListingPage(
+            company_names=self._create_company_name_list(tree=tree, output_list=output_list),
+            next_url=self._get_next_page_url(url_=url_, tree=tree)
+        )
+
+
+    def _create_company_name_list(
+        self,
+        tree: HtmlElement,
+        output_list: CompanyNameSet
+    ) -> CompanyNameSet:
+        company_name_list = CompanyNameSet()
+        company_name_list_elements = tree.find_class("company_name_anchor")
 
         # 余計な文言を取り除いた会社名でリストを作成
         for company_name_element in company_name_list_elements:
             company_name = self._remove_extra_phrases(
-                company_name=company_name_element.text
+                company_name=self.get_element_text(company_name_element)
             )
             if company_name not in output_list:
                 # サイト内での会社名の被らない物のみリストに追加
-                company_name_list.append(company_name)
-        # 次にアクセスするページのURLを取得
-        nextpage = self._get_next_page_url(url_=url_, driver=driver)
-        return company_name_list, nextpage
+                company_name_list.add(company_name)
+        return company_name_list
 
 
     def _get_next_page_url(
         self,
         url_: str,
-        driver: Union[ChromeWebDriver, FirefoxWebDriver]
-    ) -> None:
+        tree: HtmlElement
+    ) -> str:
         """
         次のページ用のURLを取得
         """
         nextpage = ""
         # 最終ページかチェック
         try:
-            exist_next_page_element = driver.find_element(By.CSS_SELECTOR, 'a[rel="next"]')
-            if exist_next_page_element:
+            exist_next_page_elements = tree.xpath('//a[@rel="next"]')
+            if exist_next_page_elements:
                 # 次のページが存在する場合、現在のページ数を取得
-                current_page_element = driver.find_element(By.CLASS_NAME, "current-page")
-                curry_page = current_page_element.text
+                current_page_element = tree.find_class("current-page")[0]
+                curry_page = self.get_element_text(current_page_element)
                 # ページより前方のURLを取得
                 url_before_page = url_.split("?page")[0]
                 # 次のページを生成
@@ -163,51 +181,32 @@ class GetCompanyInfoEngage(GetCompanyInfoMixin):
         except:
             print("Reached the last page.")
             nextpage = ""
-    
-        driver.close()
         return nextpage
 
 
-    def execute(
+    def crawl_company_names(
         self,
-        source: str = "エンゲージ",
-        prefecture_list: List[str] = [],
-        output_filename: str = "./temp.txt",
-        output_filename_csv: str = "./temp.csv",
-        output_flg: bool = False
-    ) -> List[str]:
+        source: str,
+        output_list: CompanyNameSet,
+        prefecture_list: List[str]
+    ) -> Generator[str, None, None]:
         """
-        会社名リスト作成を実行
+        一覧ページから会社名を順に取得(取得した会社名はoutput_listにも追加)
         """
-        # Slack通知
-        self.slack_client.post_message(
-            source=source,
-            message="処理を開始します。"
-        )
-        output_company_list = []
         for prefecture in prefecture_list:
             # ページURL生成
             url_ = self.SEARCH_PAGE_URL.format(PrefectureType.get_yomi_by_name(pref=prefecture))
             try:
-                # 検索ページトップ画面の一覧から会社名を取得
-                c_name_list, next_url = self._create_company_name_list(
-                            url_=url_, output_list=output_company_list)
-                output_company_list.extend(c_name_list.copy())
-                # 次のページURL取得
-                while next_url:
-                    interval = generate_interval()
-                    print(f"wait: {interval} sec")
-                    time.sleep(generate_interval())
-                    c_name_list, next_url = self._create_company_name_list(
-                        url_=next_url,
-                        output_list=output_company_list
-                    )
-                    output_company_list.extend(c_name_list.copy())
-                    print(f"out put companys name: {output_company_list}")
-                    # 次のページURL取得
-                    if not next_url:
-                        # 次のページがない場合、ループ終了
-                        break
+                # 1つのブラウザで検索ページトップ画面から順に一覧の会社名を取得
+                with self.driver_session() as driver:
+                    for listing_page in self.iter_listing_pages(
+                            start_url=url_,
+                            source=source,
+                            get_listing_page=lambda page_url: self._get_listing_page(
+                                    driver=driver, url_=page_url, output_list=output_list)):
+                        output_list.extend(listing_page.company_names)
+                        yield from listing_page.company_names
+                        print(f"company names: {len(output_list)}")
             except Exception as e:
                 import traceback
                 # Slack通知
@@ -217,20 +216,32 @@ class GetCompanyInfoEngage(GetCompanyInfoMixin):
                     status="warn"
                 )
 
-        if output_flg:
-            # 外部ファイルへの書き出し
-            self.output_data(filename_=output_filename,
-                    data_list=output_company_list)
+
+    def execute(
+        self,
+        source: str = "エンゲージ",
+        prefecture_list: List[str] = [],
+        output_filename: str = "./temp.txt",
+        output_filename_csv: str = "./temp.csv",
+        output_flg: bool = False
+    ) -> CompanyNameSet:
+        """
+        会社名リスト作成を実行
+        """
         # Slack通知
         self.slack_client.post_message(
             source=source,
-            message=f"媒体から会社名の取得が完了しました。 {len(output_company_list)} 件"
+            message="処理を開始します。"
         )
-        # 取得した会社名リストにHPのURLを付与したデータをDBへ登録
-        _ = self.create_company_info(
-            company_name_list=output_company_list,
+        output_company_list = CompanyNameSet()
+        # 一覧ページから取得した会社名にHPのURLを付与したデータをDBへ登録
+        self.collect_company_info(
+            company_names=self.crawl_company_names(
+                    source=source, output_list=output_company_list, prefecture_list=prefecture_list),
+            output_list=output_company_list,
             source=source,
-            output_filename=output_filename_csv,
+            output_filename=output_filename,
+            output_filename_csv=output_filename_csv,
             output_flg=output_flg
         )
         # 出力用ファイル名を設定
@@ -1,16 +1,14 @@
 # -*- coding: utf-8 -*-
 
-import time
-import random
 import os
-from typing import List, Union, Tuple
+from typing import Generator, List, Union, Tuple
 from datetime import datetime
 
-from selenium.webdriver.chrome.webdriver import WebDriver as ChromeWebDriver
+from lxml.html import HtmlElement
 from selenium.webdriver.common.by import By
-from selenium.webdriver.firefox.webdriver import WebDriver as FirefoxWebDriver
 
 from scrapCompanyInfo import GetCompanyInfoMixin
+from common.utils.companyNameSet import CompanyNameSet
 
 
 class GetCompanyInfoFuma(GetCompanyInfoMixin):
@@ -19,6 +17,11 @@ class GetCompanyInfoFuma(GetCompanyInfoMixin):
     """
     # 取得するページ数
     GET_PAGE_NUM = 10
+    # サイトへのアクセス間隔(秒)と待機時のゆらぎ(秒). 間隔は応答を見て上下限の範囲で調整
+    REQUEST_INTERVAL = 30
+    REQUEST_INTERVAL_MIN = 10
+    REQUEST_INTERVAL_MAX = 300
+    REQUEST_JITTER = 10
 
     def __init__(
         self,
@@ -41,89 +44,83 @@ class GetCompanyInfoFuma(GetCompanyInfoMixin):
                     .format(url=self.BASE_URL, keyword=self.keyword)
 
 
-    def generate_interval(self, min: int = 60, max: int = 300) -> int:
-        return random.randint(min, max)
-
-
     def _get_company_details(self, url_: str) -> Tuple[str]:
         # 会社の詳細を取得
         url = capital = employee = ""
         # 企業詳細ページを展開
         driver = self.init_selenium_ff_get_page(url_=url_)
-        company_detail_data_element = driver\
-                .find_element(By.CLASS_NAME, "detail_kigyou_data")
+        try:
+            # ページのDOMをまとめて取得
+            tree = self.get_page_tree(driver=driver, ready_locator=(By.CLASS_NAME, "detail_kigyou_data"))
+        except Exception:
+            self.release_driver(driver=driver, discard=True)
+            raise
+        self.release_driver(driver=driver)
+        company_detail_data_element = tree.find_class("detail_kigyou_data")[0]
         # 企業用のHPのURLを取得
-        url = company_detail_data_element\
-                .find_element(By.CLASS_NAME, "a_text").text
+        url = self.get_element_text(company_detail_data_element.find_class("a_text")[0])
         # 企業データ用のテーブル情報を取得
-        company_data_tr_elements = company_detail_data_element\
-                .find_elements(By.XPATH, ".//tr")
+        company_data_tr_elements = company_detail_data_element.xpath(".//tr")
 
         for tr in company_data_tr_elements:
-            th_elements = tr.find_elements(By.XPATH, ".//th")
+            th_elements = tr.xpath(".//th")
+            td_elements = tr.xpath(".//td")
 
             for i, th_element in enumerate(th_elements):
                 # 各情報を取得
-                if "資本金" in th_element.text:
-                    capital = tr.find_elements(By.XPATH, ".//td")[i].text
-                if  "従業員数" in th_element.text:
-                    employee = tr.find_elements(By.XPATH, ".//td")[i].text
+                th_text = self.get_element_text(th_element)
+                if "資本金" in th_text:
+                    capital = self.get_element_text(td_elements[i])
+                if  "従業員数" in th_text:
+                    employee = self.get_element_text(td_elements[i])
 
-        driver.close()
         return url, capital, employee
 
 
     def _create_company_name_list(
         self,
-        driver: Union[ChromeWebDriver, FirefoxWebDriver],
-        output_list: List[str] = []
-    ) -> List[List[Union[str, int]]]:
+        tree: HtmlElement,
+        output_list: CompanyNameSet
+    ) -> CompanyNameSet:
         # 現在のページ数を取得
-        paging_box_element = driver.find_element(By.CLASS_NAME, "paging_box")
-        current_page_element = paging_box_element.find_element(By.XPATH, ".//div/span/strong")
-        c_page = current_page_element.text
+        paging_box_element = tree.find_class("paging_box")[0]
+        current_page_element = paging_box_element.xpath(".//div/span/strong")[0]
+        c_page = self.get_element_text(current_page_element)
         # 会社情報一覧を取得
-        company_box_element_list = driver.find_elements(By.CLASS_NAME, "s_box")
-        company_name_list = []
+        company_box_element_list = tree.find_class("s_box")
+        company_name_list = CompanyNameSet(get_company_name=lambda company_info: company_info[0])
         c_name = ""
         for company_box_element in company_box_element_list:
             # 会社名取得
-            company_name_element = company_box_element.find_element(By.CLASS_NAME, "s_coprate")
-            c_name = company_name_element.text
-            company_info_element = company_box_element.find_element(By.CLASS_NAME, "fl_box")
-            company_info_list_element = company_info_element.find_elements(By.XPATH, ".//li")
+            company_name_element = company_box_element.find_class("s_coprate")[0]
+            c_name = self.get_element_text(company_name_element)
+            company_info_element = company_box_element.find_class("fl_box")[0]
+            company_info_list_element = company_info_element.xpath(".//li")
             c_capital = c_employee = ""
             for company_info in company_info_list_element:
-                if "資本金" in company_info.text:
-                    c_capital = company_info.text.lstrip("資本金：")
-                elif "従業員数" in company_info.text:
-                    c_employee = company_info.text.lstrip("従業員数：")
+                company_info_text = self.get_element_text(company_info)
+                if "資本金" in company_info_text:
+                    c_capital = company_info_text.lstrip("資本金：")
+                elif "従業員数" in company_info_text:
+                    c_employee = company_info_text.lstrip("従業員数：")
             
             if c_name not in company_name_list \
                             and c_name not in output_list:
                 # 会社名の重複なし
-                company_name_list.append([c_name, c_capital, c_employee, c_page])
+                company_name_list.add([c_name, c_capital, c_employee, c_page])
 
         return company_name_list
 
 
-    def execute(
+    def crawl_company_names(
         self,
-        source: str = "Fuma",
-        target_page: int = 0,
-        output_filename: str = "./temp.txt",
-        output_filename_csv: str = "./temp.csv",
-        output_flg: bool = False
-    ) -> List[Union[str, int]]:
+        source: str,
+        output_list: CompanyNameSet,
+        target_page: int = 0
+    ) -> Generator[List[Union[str, int]], None, None]:
         """
-        会社名リスト作成を実行
+        一覧ページから会社情報を順に取得(取得した会社情報はoutput_listにも追加)
         """
-        # Slack通知
-        self.slack_client.post_message(
-            source=source,
-            message="処理を開始します。"
-        )
-        output_company_list = []
         cnt = page = 0
         while cnt < self.GET_PAGE_NUM:
             print(f"started main process: ({cnt+1}/{self.GET_PAGE_NUM}), from page: {target_page}")
@@ -141,19 +138,26 @@ class GetCompanyInfoFuma(GetCompanyInfoMixin):
             print(f"access page: {search_page_url}")
             try:
                 driver = self.init_selenium_ff_get_page(url_=search_page_url)
-                output_company_list.extend(self._create_company_name_list(
-                        driver=driver, output_list=output_company_list).copy())
+                try:
+                    # ページのDOMをまとめて取得
+                    tree = self.get_page_tree(driver=driver, ready_locator=(By.CLASS_NAME, "s_box"))
+                except Exception:
+                    # 状態の分からないブラウザは破棄
+                    self.release_driver(driver=driver, discard=True)
+                    raise
+                # ブラウザをプールへ返却
+                self.release_driver(driver=driver)
+                company_list = self._create_company_name_list(
+                        tree=tree, output_list=output_list)
+                # ページ内の会社のURLキャッシュをまとめて読み込む
+                self.prefetch_url_cache(company_names=[company_name[0] for company_name in company_list])
+                output_list.extend(company_list)
+                yield from company_list
                 
                 if cnt <= self.GET_PAGE_NUM:
                     # 次のページ
                     page += 1
-                    # ランダムにインターバルを挟む
-                    interval = self.generate_interval()
-                    print(f"wait: {interval} sec")
-                    time.sleep(interval)
                 cnt += 1
-                # ブラウザを閉じる
-                driver.close()
             except Exception as e:
                 import traceback
                 # Slack通知
@@ -164,21 +168,34 @@ class GetCompanyInfoFuma(GetCompanyInfoMixin):
                 )
                 break
 
-        if output_flg:
-            # 外部ファイルへの書き出し
-            self.output_datas(filename_=output_filename,
-                    data_list=output_company_list)
+
+    def execute(
+        self,
+        source: str = "Fuma",
+        target_page: int = 0,
+        output_filename: str = "./temp.txt",
+        output_filename_csv: str = "./temp.csv",
+        output_flg: bool = False
+    ) -> CompanyNameSet:
+        """
+        会社名リスト作成を実行
+        """
         # Slack通知
         self.slack_client.post_message(
             source=source,
-            message=f"媒体から会社名の取得が完了しました。 {len(output_company_list)} 件"
+            message="処理を開始します。"
         )
-        # 取得した会社名リストにHPのURLを付与したデータをDBへ登録
-        _ = self.create_company_infos(
-            company_name_list=output_company_list,
+        output_company_list = CompanyNameSet(get_company_name=lambda company_info: company_info[0])
+        # 一覧ページから取得した会社名にHPのURL等を付与したデータをDBへ登録
+        self.collect_company_info(
+            company_names=self.crawl_company_names(
+                    source=source, output_list=output_company_list, target_page=target_page),
+            output_list=output_company_list,
             source=source,
-            output_filename=output_filename_csv,
-            output_flg=output_flg
+            output_filename=output_filename,
+            output_filename_csv=output_filename_csv,
+            output_flg=output_flg,
+            detailed=True
         )
         # 出力用ファイル名を設定
         output_filename_list: List[str] = output_filename_csv.split(".")
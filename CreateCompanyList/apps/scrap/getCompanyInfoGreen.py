@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 
 import os
-from typing import List
+from typing import Generator, List
 from datetime import datetime
+from urllib.parse import urlparse, parse_qs
 
+from bs4 import BeautifulSoup as bs
 from selenium.webdriver.common.by import By
 
-from scrapCompanyInfo import GetCompanyInfoMixin
+from scrapCompanyInfo import GetCompanyInfoMixin, ListingPage
+from common.utils.companyNameSet import CompanyNameSet
 
 
 class GetCompanyInfoGreen(GetCompanyInfoMixin):
@@ -15,6 +18,8 @@ class GetCompanyInfoGreen(GetCompanyInfoMixin):
     """
     # 【】や()の文字列を検出するパターン
     PTN = "(.+)(【|（)(.+)(】|）)"
+    # 一覧ページを取得する上限のページ数
+    MAX_PAGES = 500
 
 
     def __init__(
@@ -40,12 +45,30 @@ class GetCompanyInfoGreen(GetCompanyInfoMixin):
         else:
             # キーワードなしエラー
             pass
+        # HTMLからページャが取れない場合にブラウザで次のページを確認するか
+        self.browser_fallback = kwargs.get("browser_fallback", False)
+        # 一覧ページを取得する上限のページ数
+        self.MAX_PAGES = int(kwargs.get("max_pages", self.MAX_PAGES))
+        # 前のページの会社名(ページャがない場合に同じページの繰り返しを判定)
+        self._previous_page_names: List[str] = []
 
 
-    def _create_company_name_list(self, url_: str, output_list: List[str]) -> List[str]:
-        # 会社一覧ページをパース
+    def _get_listing_page(self, url_: str, output_list: CompanyNameSet) -> ListingPage:
+        """
+        一覧ページを1回だけ取得して会社名と次のページURLを取り出す
+        """
         soup = self.parse_html(url_=url_)
-        company_name_list = []
+        company_names = self._create_company_name_list(soup=soup, output_list=output_list)
+        next_url = self._get_next_page_url(url_=url_, soup=soup, company_names=company_names)
+        if next_url and self._get_page_number(url_=next_url) > self.MAX_PAGES:
+            print(f"上限のページ数({self.MAX_PAGES})に達しました。")
+            next_url = ""
+        return ListingPage(company_names=company_names, next_url=next_url)
+
+
+    def _create_company_name_list(self, soup: bs, output_list: CompanyNameSet) -> CompanyNameSet:
+        # 会社一覧ページから会社名を取得
+        company_name_list = CompanyNameSet()
         for company_name in soup.find_all("div", class_="MuiTypography-subtitle2"):
             if company_name:
                 # 会社名がnullではない
@@ -53,20 +76,62 @@ class GetCompanyInfoGreen(GetCompanyInfoMixin):
                 if conpany_name_text not in company_name_list \
                                 and conpany_name_text not in output_list:
                     # 重複なし
-                    company_name_list.append(conpany_name_text)
+                    company_name_list.add(conpany_name_text)
         return company_name_list
 
 
-    def _get_next_page_url(self, url_: str) -> str:
+    def _get_page_number(self, url_: str) -> int:
         """
-        次のページ用のURLを取得
+        URLのクエリからページ番号を取得(指定なしは1ページ目)
         """
-        driver = self.init_selenium_ff_get_page(url_=url_)
-        selected_page_element = driver.find_element(By.CLASS_NAME, "Mui-selected")
-        curr_page = selected_page_element.text
-        next_page_href = f"/search?page={int(curr_page)+1}"
+        page = parse_qs(urlparse(url_).query).get("page", ["1"])[0]
+        return int(page) if page.isdigit() else 1
 
-        next_page_element = driver.find_element(By.CSS_SELECTOR, f'a[href="{next_page_href}"]')
+
+    def _get_next_page_url(self, url_: str, soup: bs, company_names: CompanyNameSet = None) -> str:
+        """
+        次のページ用のURLを取得(取得済みのHTMLから判定)
+        ページャがない場合、範囲外のページ番号は最終ページが返されるため、
+        新しい会社名がないページ・前のページと同じ会社名のページで終了
+        """
+        selected_page_element = soup.find(class_="Mui-selected")
+        if selected_page_element and selected_page_element.text.strip().isdigit():
+            # ページャの選択中のページの次のページへのリンクを探す
+            next_page_href = f"/search?page={int(selected_page_element.text.strip())+1}"
+            if soup.find("a", href=next_page_href):
+                return "{base_url}{next}"\
+                    .format(base_url=self.BASE_URL, next=next_page_href)
+            return ""
+        if self.browser_fallback:
+            # ページャがHTMLにない場合のみブラウザで確認
+            return self._get_next_page_url_by_browser(url_=url_)
+        if not soup.find("div", class_="MuiTypography-subtitle2"):
+            # 会社が載っていないページで終了
+            return ""
+        page_names = [element.text for element in soup.find_all("div", class_="MuiTypography-subtitle2")]
+        previous_page_names, self._previous_page_names = self._previous_page_names, page_names
+        if (company_names is not None and not company_names) or page_names == previous_page_names:
+            print("新しい会社がないため最終ページです。")
+            return ""
+        # ページ番号を1つ進めたURL
+        return "{base_url}/search?page={page}"\
+            .format(base_url=self.BASE_URL, page=self._get_page_number(url_=url_) + 1)
+
+
+    def _get_next_page_url_by_browser(self, url_: str) -> str:
+        """
+        次のページ用のURLをブラウザで取得
+        """
+        driver = self.init_selenium_ff_get_page(url_=url_)
+        try:
+            selected_page_element = driver.find_element(By.CLASS_NAME, "Mui-selected")
+            curr_page = selected_page_element.text
+            next_page_href = f"/search?page={int(curr_page)+1}"
+
+            next_page_element = driver.find_element(By.CSS_SELECTOR, f'a[href="{next_page_href}"]')
+        finally:
+            # 最終ページで要素が見つからない場合もブラウザをプールへ返却
+            self.release_driver(driver=driver)
         nextpage = ""
         if next_page_element:
             # 次のページがあれば
@@ -75,18 +140,39 @@ class GetCompanyInfoGreen(GetCompanyInfoMixin):
             # 基となるURLと次ページのURLを合わせる
             nextpage = "{base_url}{next}"\
                 .format(base_url=self.BASE_URL, next=nextpage)
-        # ブラウザを閉じる
-        driver.close()
         return nextpage
 
 
+    def crawl_company_names(
+        self,
+        source: str,
+        output_list: CompanyNameSet
+    ) -> Generator[str, None, None]:
+        """
+        一覧ページから会社名を順に取得(取得した会社名はoutput_listにも追加)
+        """
+        self._previous_page_names = []
+        try:
+            # 検索ページトップ画面から順に一覧の会社名を取得
+            for listing_page in self.iter_listing_pages(
+                    start_url=self.SEARCH_PAGE_URL,
+                    source=source,
+                    get_listing_page=lambda url_: self._get_listing_page(
+                            url_=url_, output_list=output_list)):
+                output_list.extend(listing_page.company_names)
+                yield from listing_page.company_names
+                print(f"次のURL：{listing_page.next_url}")
+        except:
+            print("最終ページです。")
+
+
     def execute(
         self,
         source: str = "Green",
         output_filename: str = "./temp.txt",
         output_filename_csv: str = "./temp.csv",
         output_flg: bool = False
-    ) -> List[str]:
+    ) -> CompanyNameSet:
         """
         会社名リスト作成を実行
         """
@@ -95,43 +181,15 @@ class GetCompanyInfoGreen(GetCompanyInfoMixin):
             source=source,
             message="処理を開始します。"
         )
-        output_company_list = []
-        # 検索ページトップ画面の一覧から会社名を取得
-        c_name_list = self._create_company_name_list(
-                    url_=self.SEARCH_PAGE_URL, output_list=output_company_list)
-        output_company_list.extend(c_name_list)
-        # 次のページURL取得
-        next_url = self._get_next_page_url(url_=self.SEARCH_PAGE_URL)
-        print(f"次のURL：{next_url}")
-        while next_url:
-            try:
-                output_company_list.extend(
-                        self._create_company_name_list(
-                                url_=next_url, output_list=output_company_list).copy())
-                # 次のページURL取得
-                next_url = self._get_next_page_url(url_=next_url)
-                if not next_url:
-                    # 次のページがない場合、ループ終了
-                    break
-                print(f"次のURL：{next_url}")
-            except:
-                print("最終ページです。")
-                break
-
-        if output_flg:
-            # 外部ファイルへの書き出し
-            self.output_data(filename_=output_filename,
-                    data_list=output_company_list)
-        # Slack通知
-        self.slack_client.post_message(
-            source=source,
-            message=f"媒体から会社名の取得が完了しました。 {len(output_company_list)} 件"
-        )
-        # 取得した会社名リストにHPのURLを付与したデータをDBへ登録
-        _ = self.create_company_info(
-            company_name_list=output_company_list,
+        output_company_list = CompanyNameSet()
+        # 一覧ページから取得した会社名にHPのURLを付与したデータをDBへ登録
+        self.collect_company_info(
+            company_names=self.crawl_company_names(
+                    source=source, output_list=output_company_list),
+            output_list=output_company_list,
             source=source,
-            output_filename=output_filename_csv,
+            output_filename=output_filename,
+            output_filename_csv=output_filename_csv,
             output_flg=output_flg
         )
         # 出力用ファイル名を設定
@@ -162,6 +220,7 @@ if __name__ == "__main__":
     parser.add_argument("--keyword", type=str, help="媒体サイト内での検索キーワード", default="IT")
     parser.add_argument("--interval", type=int, help="処理の間隔時間(秒)", default=2)
     parser.add_argument("--output", type=bool, help="中間ファイル出力可否フラグ", default=True)
+    parser.add_argument("--browser_fallback", type=bool, help="ページャをブラウザで確認するフラグ", default=False)
     parser.add_argument("--file_text", type=str, help="出力ファイル名(text).", default="temp_green.txt")
     parser.add_argument("--file_csv", type=str, help="出力ファイル名(csv/tsv).", default="temp_dict_green.csv")
     args = parser.parse_args()
@@ -169,6 +228,7 @@ if __name__ == "__main__":
     keyword = args.keyword
     interval = args.interval
     output_flg = args.output
+    browser_fallback = args.browser_fallback
     output_filename_text = args.file_text
     output_filename_csv = args.file_csv
 
@@ -177,7 +237,7 @@ if __name__ == "__main__":
 
     purge_domein_list = ['wantedly.com']
 
-    get_company_info = GetCompanyInfoGreen(keyword=keyword, interval=interval, purge_domein_list=purge_domein_list)
+    get_company_info = GetCompanyInfoGreen(keyword=keyword, interval=interval, purge_domein_list=purge_domein_list, browser_fallback=browser_fallback)
     company_list = get_company_info.execute(
         source="Green",
         output_filename=output_filename_text,
@@ -1,21 +1,20 @@
 # -*- coding: utf-8 -*-
 
 import re
-import time
 import os
 
 from datetime import datetime
 from enum import Enum
-from typing import List, Tuple, Union
+from typing import Generator, List, Union
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 
+from lxml.html import HtmlElement
 from selenium.webdriver.chrome.webdriver import WebDriver as ChromeWebDriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.firefox.webdriver import WebDriver as FirefoxWebDriver
 
-from scrapCompanyInfo import GetCompanyInfoMixin
-from common.utils.utils import generate_interval
-from common.decorater.wait_sec import wait_seconds
+from scrapCompanyInfo import GetCompanyInfoMixin, ListingPage
+from common.utils.companyNameSet import CompanyNameSet
 
 class IndustoryType(Enum):
     industory_1 = (1, "ソフトウェア/ハードウェア開発", "IT/通信/インターネット系")
@@ -95,6 +94,11 @@ class GetCompanyInfoJobtalk(GetCompanyInfoMixin):
     """
     # 【】や()の文字列を検出するパターン
     PTN = "(.+)(【|（)(.+)(】|）)"
+    # サイトへのアクセス間隔(秒)と待機時のゆらぎ(秒). 間隔は応答を見て上下限の範囲で調整
+    REQUEST_INTERVAL = 30
+    REQUEST_INTERVAL_MIN = 10
+    REQUEST_INTERVAL_MAX = 300
+    REQUEST_JITTER = 10
 
     def __init__(
         self,
@@ -141,31 +145,46 @@ class GetCompanyInfoJobtalk(GetCompanyInfoMixin):
         return company_name
 
 
-    def _create_company_name_list(
+    def _get_listing_page(
         self,
+        driver: Union[ChromeWebDriver, FirefoxWebDriver],
         url_: str,
-        output_list: List[str] = []
-    ) -> Tuple[List[str], str]:
-        company_name_list = []
-        # 企業詳細ページを展開
-        driver = self.init_selenium_ff_get_page(url_=url_)
-        company_detail_data_element = driver\
-                .find_element(By.XPATH, "/html/body/div/div/div[2]/div[2]/div[4]")
-        company_name_list_elements = company_detail_data_element.find_elements(
-            By.XPATH, "//div/div/div/h2/span"
+        output_list: CompanyNameSet
+    ) -> ListingPage:
+        """
+        ブラウザで一覧ページを開き、同じDOMから会社名と次のページURLを取り出す
+        """
+        self.load_page(driver=driver, url_=url_)
+        # ページのDOMをまとめて取得
+        tree = self.get_page_tree(
+            driver=driver,
+            ready_locator=(By.XPATH, "/html/body/div/div/div[2]/div[2]/div[4]")
+        )
+        return ListingPage(
+            company_names=self._create_company_name_list(tree=tree, output_list=output_list),
+            next_url=self._get_next_page_url(url_=url_, tree=tree)
+        )
+
+
+    def _create_company_name_list(
+        self,
+        tree: HtmlElement,
+        output_list: CompanyNameSet
+    ) -> CompanyNameSet:
+        company_name_list = CompanyNameSet()
+        company_detail_data_element = tree.xpath("/html/body/div/div/div[2]/div[2]/div[4]")[0]
+        company_name_list_elements = company_detail_data_element.xpath(
+            "//div/div/div/h2/span"
         )
         # 余計な文言を取り除いた会社名でリストを作成
         for company_name_element in company_name_list_elements:
             company_name = self._remove_extra_phrases(
-                company_name=company_name_element.text
+                company_name=self.get_element_text(company_name_element)
             )
             if company_name not in output_list:
                 # サイト内での会社名の被らない物のみリストに追加
-                company_name_list.append(company_name)
-        nextpage = self._get_next_page_url(url_=url_, driver=driver)
-        # Webドライバを閉じる
-        # driver.close()
-        return company_name_list, nextpage
+                company_name_list.add(company_name)
+        return company_name_list
 
 
     def _generated_url(self, url_: str, page: str = "") -> str:
@@ -196,19 +215,16 @@ class GetCompanyInfoJobtalk(GetCompanyInfoMixin):
     def _get_next_page_url(
         self,
         url_: str,
-        driver: Union[ChromeWebDriver, FirefoxWebDriver]
-    ) -> None:
+        tree: HtmlElement
+    ) -> str:
         """
         次のページ用のURLを取得
         """
-        # driver = self.init_selenium_ff_get_page(url_=url_)
         # ページャURL全件取得
-        pager_list_element = driver.find_elements(
-            By.XPATH, "/html/body/div/div/nav/div/ul/li"
-        )
+        pager_list_element = tree.xpath("/html/body/div/div/nav/div/ul/li")
         nextpage = ""
         page = ""
-        matched = re.match(r"^([0-9]+)ページ目", pager_list_element[-1].text)
+        matched = re.match(r"^([0-9]+)ページ目", self.get_element_text(pager_list_element[-1]))
         if matched:
             page = str(int(matched.group(1)) + 1)
         # 次のページを作成
@@ -218,10 +234,8 @@ class GetCompanyInfoJobtalk(GetCompanyInfoMixin):
         # 最終ページかのチェック
         try:
             # driver = self.init_selenium_ff_get_page(url_=url_)
-            pager_element = driver.find_elements(
-                By.XPATH, "/html/body/div/div/div[2]/div[2]/div[3]/div[2]/div"
-            )
-            if pager_element[-1].text != "›":
+            pager_element = tree.xpath("/html/body/div/div/div[2]/div[2]/div[3]/div[2]/div")
+            if self.get_element_text(pager_element[-1]) != "›":
                 # 最終ページがない場合は次のページはなし
                 nextpage = ""
         except Exception as e:
@@ -229,45 +243,30 @@ class GetCompanyInfoJobtalk(GetCompanyInfoMixin):
             nextpage = ""
 
         print(f"next page url: {nextpage}")
-        driver.close()
         return nextpage
 
 
-    def execute(
+    def crawl_company_names(
         self,
-        source: str = "転職会議",
-        output_filename: str = "./temp.txt",
-        output_filename_csv: str = "./temp.csv",
-        output_flg: bool = False
-    ) -> List[str]:
+        source: str,
+        output_list: CompanyNameSet
+    ) -> Generator[str, None, None]:
         """
-        会社名リスト作成を実行
+        一覧ページから会社名を順に取得(取得した会社名はoutput_listにも追加)
         """
-        # Slack通知
-        self.slack_client.post_message(
-            source=source,
-            message="処理を開始します。"
-        )
-        output_company_list = []
         try:
-            for search_page_url in self.SEARCH_PAGE_URLS:
-                # 検索ページトップ画面の一覧から会社名を取得
-                c_name_list, next_url = self._create_company_name_list(
-                            url_=search_page_url, output_list=output_company_list)
-                output_company_list.extend(c_name_list)
-                while next_url:
-                    interval = generate_interval()
-                    print(f"wait: {interval} sec")
-                    time.sleep(generate_interval())
-                    c_name_list, next_url = self._create_company_name_list(
-                        url_=next_url,
-                        output_list=output_company_list
-                    )
-                    output_company_list.extend(c_name_list.copy())
-                    print(f"out put companys name: {output_company_list}")
-                    if not next_url:
-                        # 次のページがない場合、ループ終了
-                        break
+            # 全検索条件を1つのブラウザで巡回
+            with self.driver_session() as driver:
+                for search_page_url in self.SEARCH_PAGE_URLS:
+                    # 検索ページトップ画面から順に一覧の会社名を取得
+                    for listing_page in self.iter_listing_pages(
+                            start_url=search_page_url,
+                            source=source,
+                            get_listing_page=lambda url_: self._get_listing_page(
+                                    driver=driver, url_=url_, output_list=output_list)):
+                        output_list.extend(listing_page.company_names)
+                        yield from listing_page.company_names
+                        print(f"company names: {len(output_list)}")
         except Exception as e:
             import traceback
             # Slack通知
@@ -277,20 +276,31 @@ class GetCompanyInfoJobtalk(GetCompanyInfoMixin):
                 status="warn"
             )
 
-        if output_flg:
-            # 外部ファイルへの書き出し
-            self.output_data(filename_=output_filename,
-                    data_list=output_company_list)
+
+    def execute(
+        self,
+        source: str = "転職会議",
+        output_filename: str = "./temp.txt",
+        output_filename_csv: str = "./temp.csv",
+        output_flg: bool = False
+    ) -> CompanyNameSet:
+        """
+        会社名リスト作成を実行
+        """
         # Slack通知
         self.slack_client.post_message(
             source=source,
-            message=f"媒体から会社名の取得が完了しました。 {len(output_company_list)} 件"
+            message="処理を開始します。"
         )
-        # 取得した会社名リストにHPのURLを付与したデータをDBへ登録
-        _ = self.create_company_info(
-            company_name_list=output_company_list,
+        output_company_list = CompanyNameSet()
+        # 一覧ページから取得した会社名にHPのURLを付与したデータをDBへ登録
+        self.collect_company_info(
+            company_names=self.crawl_company_names(
+                    source=source, output_list=output_company_list),
+            output_list=output_company_list,
             source=source,
-            output_filename=output_filename_csv,
+            output_filename=output_filename,
+            output_filename_csv=output_filename_csv,
             output_flg=output_flg
         )
         # 出力用ファイル名を設定
@@ -3,13 +3,15 @@
 import os
 import re
 from datetime import datetime
-from typing import List, Union, Tuple
+from typing import Generator, List, Union
 
+from lxml.html import HtmlElement
 from selenium.webdriver.chrome.webdriver import WebDriver as ChromeWebDriver
 from selenium.webdriver.firefox.webdriver import WebDriver as FirefoxWebDriver
 from selenium.webdriver.common.by import By
 
-from scrapCompanyInfo import GetCompanyInfoMixin
+from scrapCompanyInfo import GetCompanyInfoMixin, ListingPage
+from common.utils.companyNameSet import CompanyNameSet
 
 
 class GetCompanyInfoRikunabi(GetCompanyInfoMixin):
@@ -46,9 +48,9 @@ class GetCompanyInfoRikunabi(GetCompanyInfoMixin):
 
     def _cleansing_company_name(
         self,
-        company_element: Union[ChromeWebDriver, FirefoxWebDriver]
+        company_element: HtmlElement
     ) -> str:
-        company_name = company_element.text
+        company_name = self.get_element_text(company_element)
         matched = re.match(self.COMPANY_NAME_PTN, company_name)
         if matched:
             return matched.group(1)
@@ -60,34 +62,35 @@ class GetCompanyInfoRikunabi(GetCompanyInfoMixin):
 
     def _get_pure_company_name(
         self,
-        company_element: Union[ChromeWebDriver, FirefoxWebDriver]
+        company_element: HtmlElement
     ) -> str:
         try:
-            company_link_element = company_element.find_element(By.TAG_NAME, "a")
-            c_link = company_link_element.get_attribute('href')
+            company_link_element = company_element.xpath(".//a")[0]
+            c_link = company_link_element.get("href")
             soup = self.parse_html(url_=c_link)
             breadcrumb = soup.find("ul", class_="rnn-breadcrumb")
             return breadcrumb.text.splitlines()[-1]
         except:
-            return company_element.text
+            return self.get_element_text(company_element)
 
 
     def _is_filtered_keyword(
         self,
-        discripts: List[Union[ChromeWebDriver, FirefoxWebDriver]]
+        discripts: List[HtmlElement]
     ) -> bool:
         for discript in discripts:
+            discript_text = self.get_element_text(discript)
             for key in self.KEYWOED:
-                if key in discript.text:
+                if key in discript_text:
                     return True
         return False
 
 
-    def get_next_page_url(self, driver: Union[ChromeWebDriver, FirefoxWebDriver]) -> str:
+    def get_next_page_url(self, tree: HtmlElement) -> str:
         try:
-            next_page_element = driver.find_element(By.CLASS_NAME, "rnn-pagination__next")
-            next_page_link_element = next_page_element.find_element(By.TAG_NAME, "a")
-            return next_page_link_element.get_attribute('href')
+            next_page_element = tree.find_class("rnn-pagination__next")[0]
+            next_page_link_element = next_page_element.xpath(".//a")[0]
+            return next_page_link_element.get('href')
         except Exception as e:
             print("最終ページです。")
             print(e)
@@ -106,63 +109,79 @@ class GetCompanyInfoRikunabi(GetCompanyInfoMixin):
 
     def _create_company_name_list(
         self,
-        driver: Union[ChromeWebDriver, FirefoxWebDriver],
-        output_list: List[str] = []
-    ) -> Tuple[Union[ChromeWebDriver, FirefoxWebDriver, List[str]]]:
+        tree: HtmlElement,
+        output_list: CompanyNameSet
+    ) -> CompanyNameSet:
         # 会社情報一覧を取得
-        company_element_list = driver.find_elements(By.CLASS_NAME, "rnn-jobOfferList__item")
-        company_name_list = []
+        company_element_list = tree.find_class("rnn-jobOfferList__item")
+        company_name_list = CompanyNameSet()
         for company_element in company_element_list:
             # 会社名欄
-            c_name_element = company_element.find_element(By.CLASS_NAME, "rnn-jobOfferList__item__company__text")
+            c_name_element = company_element.find_class("rnn-jobOfferList__item__company__text")[0]
             # 仕事の概要欄
-            c_disc_elements = company_element.find_elements(By.CLASS_NAME, "rnn-offerDetail__text")
+            c_disc_elements = company_element.find_class("rnn-offerDetail__text")
             if self._is_filtered_keyword(discripts=c_disc_elements):
                 c_name = self._get_pure_company_name(company_element=c_name_element)
                 if c_name not in company_name_list \
                                     and c_name not in output_list:
                     print(f"company name: {c_name}")
-                    company_name_list.append(c_name)
-        return driver, company_name_list
+                    company_name_list.add(c_name)
+        return company_name_list
 
 
-    def execute(
-        self,
-        source: str = "リクナビNEXT",
-        output_filename: str = "./temp.txt",
-        output_filename_csv: str = "./temp.csv",
-        output_flg: bool = False
-    ) -> List[str]:
+    def _get_listing_page(self, url_: str, start_url: str, output_list: CompanyNameSet) -> ListingPage:
         """
-        会社名リスト作成を実行
+        一覧ページを1回だけ表示して会社名と次のページURLを取り出す
+        (先頭ページは検索ページのトップからキーワードで検索して表示)
         """
-        # Slack通知
-        self.slack_client.post_message(
-            source=source,
-            message="処理を開始します。"
-        )
-        output_company_list = []
-        try:
+        if url_ == start_url:
             # トップページを表示
             driver = self.init_selenium_ff_get_page(url_=self.SEARCH_PAGE_URL)
-            # キーワードでサイト内検索
-            driver = self._search_keyword(driver=driver)
-            url = ""
-            while True:
-                if url:
-                    # URL
-                    print(f"accsess url: {url}")
-                    # 会社一覧ページをパース
-                    driver = self.init_selenium_ff_get_page(url_=url)
-                driver, company_list = self._create_company_name_list(
-                                    driver=driver, output_list=output_company_list)
+        else:
+            print(f"accsess url: {url_}")
+            # 会社一覧ページをパース
+            driver = self.init_selenium_ff_get_page(url_=url_)
+        discard = True
+        try:
+            if url_ == start_url:
+                # キーワードでサイト内検索
+                driver = self._search_keyword(driver=driver)
+            # ページのDOMをまとめて取得
+            tree = self.get_page_tree(
+                driver=driver,
+                ready_locator=(By.CLASS_NAME, "rnn-jobOfferList__item")
+            )
+            discard = False
+        finally:
+            # 詳細ページの取得中はブラウザを保持しないよう毎回プールへ返却
+            # (途中で失敗した状態の分からないブラウザは破棄)
+            self.release_driver(driver=driver, discard=discard)
+        return ListingPage(
+            company_names=self._create_company_name_list(tree=tree, output_list=output_list),
+            next_url=self.get_next_page_url(tree=tree) or ""
+        )
+
+
+    def crawl_company_names(
+        self,
+        source: str,
+        output_list: CompanyNameSet
+    ) -> Generator[str, None, None]:
+        """
+        一覧ページから会社名を順に取得(取得した会社名はoutput_listにも追加)
+        """
+        # 取得状況は検索キーワード毎に保存(先頭ページはURLがないため検索ページ+キーワードで表す)
+        start_url = f"{self.SEARCH_PAGE_URL}#{self.keyword}"
+        try:
+            for listing_page in self.iter_listing_pages(
+                    start_url=start_url,
+                    source=source,
+                    get_listing_page=lambda url_: self._get_listing_page(
+                            url_=url_, start_url=start_url, output_list=output_list)):
                 # 会社名のリスト
-                output_company_list.extend(company_list.copy())
-                #次のページURLを取得
-                url = self.get_next_page_url(driver=driver)
-                print(f"next page url: {url}")
-                # 毎回ブラウザを閉じる
-                driver.close()
+                output_list.extend(listing_page.company_names)
+                yield from listing_page.company_names
+                print(f"next page url: {listing_page.next_url}")
         except Exception as e:
             import traceback
             # Slack通知
@@ -172,20 +191,31 @@ class GetCompanyInfoRikunabi(GetCompanyInfoMixin):
                 status="warn"
             )
 
-        if output_flg:
-            # 外部ファイルへの書き出し
-            self.output_data(filename_=output_filename,
-                    data_list=output_company_list)
+
+    def execute(
+        self,
+        source: str = "リクナビNEXT",
+        output_filename: str = "./temp.txt",
+        output_filename_csv: str = "./temp.csv",
+        output_flg: bool = False
+    ) -> CompanyNameSet:
+        """
+        会社名リスト作成を実行
+        """
         # Slack通知
         self.slack_client.post_message(
             source=source,
-            message=f"媒体から会社名の取得が完了しました。 {len(output_company_list)} 件"
+            message="処理を開始します。"
         )
-        # 取得した会社名リストにHPのURLを付与したデータをDBへ登録
-        _ = self.create_company_info(
-            company_name_list=output_company_list,
+        output_company_list = CompanyNameSet()
+        # 一覧ページから取得した会社名にHPのURLを付与したデータをDBへ登録
+        self.collect_company_info(
+            company_names=self.crawl_company_names(
+                    source=source, output_list=output_company_list),
+            output_list=output_company_list,
             source=source,
-            output_filename=output_filename_csv,
+            output_filename=output_filename,
+            output_filename_csv=output_filename_csv,
             output_flg=output_flg
         )
         # 出力用ファイル名を設定
@@ -2,20 +2,19 @@
 
 import os
 import re
-import time
 
 from datetime import datetime
 from enum import Enum
-from typing import List, Tuple, Union
+from typing import Generator, List, Union
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 
+from lxml.html import HtmlElement
 from selenium.webdriver.chrome.webdriver import WebDriver as ChromeWebDriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.firefox.webdriver import WebDriver as FirefoxWebDriver
 
-from scrapCompanyInfo import GetCompanyInfoMixin
-from common.utils.utils import generate_interval
-from common.decorater.wait_sec import wait_seconds
+from scrapCompanyInfo import GetCompanyInfoMixin, ListingPage
+from common.utils.companyNameSet import CompanyNameSet
 
 class IndustoryType(Enum):
     industory_14 = (14, "Webサービス", "IT・通信")
@@ -74,6 +73,11 @@ class GetCompanyInfoSyukatsuKaigi(GetCompanyInfoMixin):
     """
     # 【】や()の文字列を検出するパターン
     PTN = "(.+)(【|（)(.+)(】|）)"
+    # サイトへのアクセス間隔(秒)と待機時のゆらぎ(秒). 間隔は応答を見て上下限の範囲で調整
+    REQUEST_INTERVAL = 30
+    REQUEST_INTERVAL_MIN = 10
+    REQUEST_INTERVAL_MAX = 300
+    REQUEST_JITTER = 10
 
     def __init__(
         self,
@@ -118,85 +122,79 @@ class GetCompanyInfoSyukatsuKaigi(GetCompanyInfoMixin):
         return company_name
 
 
-    def _create_company_name_list(
+    def _get_listing_page(
         self,
+        driver: Union[ChromeWebDriver, FirefoxWebDriver],
         url_: str,
-        output_list: List[str] = []
-    ) -> Tuple[List[str], str]:
-        company_name_list = []
-        # 企業詳細ページを展開
-        driver = self.init_selenium_ff_get_page(url_=url_)
-        company_name_elements = driver\
-                .find_elements(By.CLASS_NAME, "p-search-panel__heading")
+        output_list: CompanyNameSet
+    ) -> ListingPage:
+        """
+        ブラウザで一覧ページを開き、同じDOMから会社名と次のページURLを取り出す
+        """
+        self.load_page(driver=driver, url_=url_)
+        # ページのDOMをまとめて取得
+        tree = self.get_page_tree(driver=driver, ready_locator=(By.CLASS_NAME, "p-search-panel__heading"))
+        return ListingPage(
+            company_names=self._create_company_name_list(tree=tree, output_list=output_list),
+            next_url=self._get_next_page_url(tree=tree)
+        )
+
+
+    def _create_company_name_list(
+        self,
+        tree: HtmlElement,
+        output_list: CompanyNameSet
+    ) -> CompanyNameSet:
+        company_name_list = CompanyNameSet()
+        company_name_elements = tree.find_class("p-search-panel__heading")
         # 余計な文言を取り除いた会社名でリストを作成
         for company_name_element in company_name_elements:
-            company_name = company_name_element.text
+            company_name = self.get_element_text(company_name_element)
             if company_name not in output_list:
                 # サイト内での会社名の被らない物のみリストに追加
-                company_name_list.append(company_name)
+                company_name_list.add(company_name)
                 print(f"company_name: {company_name}")
-        nextpage = self._get_next_page_url(driver=driver)
-        # Webドライバを閉じる
-        # driver.close()
-        return company_name_list, nextpage
+        return company_name_list
 
 
     def _get_next_page_url(
         self,
-        driver: Union[ChromeWebDriver, FirefoxWebDriver]
-    ) -> None:
+        tree: HtmlElement
+    ) -> str:
         """
         次のページ用のURLを取得
         """
         try:
             # ページャURL全件取得
-            pager_list_element = driver.find_element(
-                By.XPATH, '//li[@class="next"]/a'
-            )
-            nextpage = pager_list_element.get_attribute("href")
+            pager_list_element = tree.xpath('//li[@class="next"]/a')[0]
+            nextpage = pager_list_element.get("href", "")
         except:
             print("最終ページです。")
             nextpage = ""
 
         print(f"next page url: {nextpage}")
-        driver.close()
         return nextpage
 
 
-    def execute(
+    def crawl_company_names(
         self,
-        source: str = "就活会議",
-        output_filename: str = "./temp.txt",
-        output_filename_csv: str = "./temp.csv",
-        output_flg: bool = False
-    ) -> List[str]:
+        source: str,
+        output_list: CompanyNameSet
+    ) -> Generator[str, None, None]:
         """
-        会社名リスト作成を実行
+        一覧ページから会社名を順に取得(取得した会社名はoutput_listにも追加)
         """
-        # Slack通知
-        self.slack_client.post_message(
-            source=source,
-            message="処理を開始します。"
-        )
-        output_company_list = []
         try:
-            # 検索ページトップ画面の一覧から会社名を取得
-            c_name_list, next_url = self._create_company_name_list(
-                        url_=self.SEARCH_PAGE_URL, output_list=output_company_list)
-            output_company_list.extend(c_name_list)
-            while next_url:
-                interval = generate_interval()
-                print(f"wait: {interval} sec")
-                time.sleep(generate_interval())
-                c_name_list, next_url = self._create_company_name_list(
-                    url_=next_url,
-                    output_list=output_company_list
-                )
-                output_company_list.extend(c_name_list.copy())
-                print(f"out put companys name: {output_company_list}")
-                if not next_url:
-                    # 次のページがない場合、ループ終了
-                    break
+            # 1つのブラウザで検索ページトップ画面から順に一覧の会社名を取得
+            with self.driver_session() as driver:
+                for listing_page in self.iter_listing_pages(
+                        start_url=self.SEARCH_PAGE_URL,
+                        source=source,
+                        get_listing_page=lambda url_: self._get_listing_page(
+                                driver=driver, url_=url_, output_list=output_list)):
+                    output_list.extend(listing_page.company_names)
+                    yield from listing_page.company_names
+                    print(f"company names: {len(output_list)}")
         except Exception as e:
             import traceback
             # Slack通知
@@ -206,20 +204,31 @@ class GetCompanyInfoSyukatsuKaigi(GetCompanyInfoMixin):
                 status="warn"
             )
 
-        if output_flg:
-            # 外部ファイルへの書き出し
-            self.output_data(filename_=output_filename,
-                    data_list=output_company_list)
+
+    def execute(
+        self,
+        source: str = "就活会議",
+        output_filename: str = "./temp.txt",
+        output_filename_csv: str = "./temp.csv",
+        output_flg: bool = False
+    ) -> CompanyNameSet:
+        """
+        会社名リスト作成を実行
+        """
         # Slack通知
         self.slack_client.post_message(
             source=source,
-            message=f"媒体から会社名の取得が完了しました。 {len(output_company_list)} 件"
+            message="処理を開始します。"
         )
-        # 取得した会社名リストにHPのURLを付与したデータをDBへ登録
-        _ = self.create_company_info(
-            company_name_list=output_company_list,
+        output_company_list = CompanyNameSet()
+        # 一覧ページから取得した会社名にHPのURLを付与したデータをDBへ登録
+        self.collect_company_info(
+            company_names=self.crawl_company_names(
+                    source=source, output_list=output_company_list),
+            output_list=output_company_list,
             source=source,
-            output_filename=output_filename_csv,
+            output_filename=output_filename,
+            output_filename_csv=output_filename_csv,
             output_flg=output_flg
         )
         # 出力用ファイル名を設定
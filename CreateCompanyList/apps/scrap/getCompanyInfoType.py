@@ -2,10 +2,13 @@
 
 import os
 import re
-from typing import List
+from typing import Generator, List
 from datetime import datetime
 
-from scrapCompanyInfo import GetCompanyInfoMixin
+from bs4 import BeautifulSoup as bs
+
+from scrapCompanyInfo import GetCompanyInfoMixin, ListingPage
+from common.utils.companyNameSet import CompanyNameSet
 
 
 class GetCompanyInfoType(GetCompanyInfoMixin):
@@ -58,10 +61,20 @@ class GetCompanyInfoType(GetCompanyInfoMixin):
         return c_name
 
 
-    def _create_company_name_list(self, url_: str, output_list: List[str]) -> List[str]:
-        # 会社一覧ページをパース
+    def _get_listing_page(self, url_: str, output_list: CompanyNameSet) -> ListingPage:
+        """
+        一覧ページを1回だけ取得して会社名と次のページURLを取り出す
+        """
         soup = self.parse_html(url_=url_)
-        company_name_list = []
+        return ListingPage(
+            company_names=self._create_company_name_list(soup=soup, output_list=output_list),
+            next_url=self._get_next_page_url(soup=soup)
+        )
+
+
+    def _create_company_name_list(self, soup: bs, output_list: CompanyNameSet) -> CompanyNameSet:
+        # 会社一覧ページから会社名を取得
+        company_name_list = CompanyNameSet()
         for elem in soup.find_all("p", class_="company"):
             company_name = elem.find("span")
             if company_name:
@@ -73,15 +86,14 @@ class GetCompanyInfoType(GetCompanyInfoMixin):
                                 and conpany_name_text not in output_list:
                     print(f"company name: {conpany_name_text}")
                     # 重複なし
-                    company_name_list.append(conpany_name_text)
+                    company_name_list.add(conpany_name_text)
         return company_name_list
 
 
-    def _get_next_page_url(self, url_: str) -> str:
+    def _get_next_page_url(self, soup: bs) -> str:
         """
         次のページ用のURLを取得
         """
-        soup = self.parse_html(url_=url_)
         p_next = soup.find("p", class_="next").find("a")
         nextpage = ""
         if p_next:
@@ -95,38 +107,23 @@ class GetCompanyInfoType(GetCompanyInfoMixin):
         return nextpage
 
 
-    def execute(
+    def crawl_company_names(
         self,
-        source: str = "@type",
-        output_filename: str = "./temp.txt",
-        output_filename_csv: str = "./temp.csv",
-        output_flg: bool = False
-    ) -> List[str]:
+        source: str,
+        output_list: CompanyNameSet
+    ) -> Generator[str, None, None]:
         """
-        会社名リスト作成を実行
+        一覧ページから会社名を順に取得(取得した会社名はoutput_listにも追加)
         """
-        # Slack通知
-        self.slack_client.post_message(
-            source=source,
-            message="処理を開始します。"
-        )
-        output_company_list = []
         try:
-            # 検索ページトップ画面の一覧から会社名を取得
-            c_name_list = self._create_company_name_list(
-                        url_=self.SEARCH_PAGE_URL, output_list=output_company_list)
-            output_company_list.extend(c_name_list)
-            # 次のページURL取得
-            next_url = self._get_next_page_url(url_=self.SEARCH_PAGE_URL)
-            while next_url:
-                output_company_list.extend(
-                        self._create_company_name_list(
-                                url_=next_url, output_list=output_company_list).copy())
-                # 次のページURL取得
-                next_url = self._get_next_page_url(url_=next_url)
-                if not next_url:
-                    # 次のページがない場合、ループ終了
-                    break
+            # 検索ページトップ画面から順に一覧の会社名を取得
+            for listing_page in self.iter_listing_pages(
+                    start_url=self.SEARCH_PAGE_URL,
+                    source=source,
+                    get_listing_page=lambda url_: self._get_listing_page(
+                            url_=url_, output_list=output_list)):
+                output_list.extend(listing_page.company_names)
+                yield from listing_page.company_names
         except Exception as e:
             import traceback
             # Slack通知
@@ -136,20 +133,31 @@ class GetCompanyInfoType(GetCompanyInfoMixin):
                 status="warn"
             )
 
-        if output_flg:
-            # 外部ファイルへの書き出し
-            self.output_data(filename_=output_filename,
-                    data_list=output_company_list)
+
+    def execute(
+        self,
+        source: str = "@type",
+        output_filename: str = "./temp.txt",
+        output_filename_csv: str = "./temp.csv",
+        output_flg: bool = False
+    ) -> CompanyNameSet:
+        """
+        会社名リスト作成を実行
+        """
         # Slack通知
         self.slack_client.post_message(
             source=source,
-            message=f"媒体から会社名の取得が完了しました。 {len(output_company_list)} 件"
+            message="処理を開始します。"
         )
-        # 取得した会社名リストにHPのURLを付与したデータをDBへ登録
-        _ = self.create_company_info(
-            company_name_list=output_company_list,
+        output_company_list = CompanyNameSet()
+        # 一覧ページから取得した会社名にHPのURLを付与したデータをDBへ登録
+        self.collect_company_info(
+            company_names=self.crawl_company_names(
+                    source=source, output_list=output_company_list),
+            output_list=output_company_list,
             source=source,
-            output_filename=output_filename_csv,
+            output_filename=output_filename,
+            output_filename_csv=output_filename_csv,
             output_flg=output_flg
         )
         # 出力用ファイル名を設定
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+import os
+from typing import Dict, List, Tuple
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.company.models import Company
+from apps.scrap.models import CompanyList
+from common.db.mariaDbManager import MariaDbManager
+from common.db.sqlRegistry import get_sql_registry
+
+import logging
+logger = logging.getLogger(__name__)
+
+# 未連絡
+NO_CONTACT = '0'
+# SQL格納ディレクトリ
+SQL_DIR = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "sql")
+
+
+class Command(BaseCommand):
+    help = 'companys_infoの会社情報をCompany・CompanyListへまとめて反映する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk_size', type=int, default=1000,
+                help='1回に読み込み・反映する行数')
+
+
+    def handle(self, *args, **options):
+        logger.info('処理を開始します。')
+        chunk_size = options['chunk_size']
+        statement = get_sql_registry(sql_dir=SQL_DIR).get(name='get_companys_info_for_sync')
+        total = {'created': 0, 'updated': 0}
+        chunk = []
+        with MariaDbManager() as mdb_manager:
+            # 全件をメモリに持たないよう少しずつ読みながら反映
+            for row in mdb_manager.iter_rows(
+                sql=statement.sql, params=statement.bind(), chunk_size=chunk_size
+            ):
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    self._add_total(total, self.sync_chunk(rows=chunk))
+                    chunk = []
+            if chunk:
+                self._add_total(total, self.sync_chunk(rows=chunk))
+        logger.info('登録: {created} 件 / 更新: {updated} 件'.format(**total))
+        logger.info('処理を終了します。')
+
+
+    @staticmethod
+    def _add_total(total: Dict[str, int], counts: Tuple[int, int]) -> None:
+        total['created'] += counts[0]
+        total['updated'] += counts[1]
+
+
+    def sync_chunk(self, rows: List[Tuple[str, str]]) -> Tuple[int, int]:
+        """
+        読み込んだ行をCompanyと突き合わせて、未登録の会社は登録・URLが変わった会社は更新
+        """
+        # 同じ会社名は後の行(新しい方)のURLを使う
+        company_urls: Dict[str, str] = {}
+        for company_name, company_url in rows:
+            company_name = company_name[:100]
+            if company_url or company_name not in company_urls:
+                company_urls[company_name] = company_url or None
+        # 会社名のインデックスでまとめて検索
+        companies = {
+            company.name: company
+            for company in Company.objects.filter(name__in=list(company_urls))
+        }
+        now = datetime.datetime.now()
+        new_companies = []
+        update_companies = []
+        for company_name, company_url in company_urls.items():
+            company = companies.get(company_name)
+            if company is None:
+                new_companies.append(Company(name=company_name, url=company_url, create_date=now))
+            elif company_url and company.url != company_url:
+                company.url = company_url
+                company.update_date = now
+                update_companies.append(company)
+        with transaction.atomic():
+            Company.objects.bulk_create(new_companies, batch_size=len(rows))
+            Company.objects.bulk_update(update_companies, ['url', 'update_date'], batch_size=len(rows))
+            # 新しく登録した会社の会社リストを作成
+            CompanyList.objects.bulk_create(
+                [CompanyList(company=company, status=NO_CONTACT, create_date=now)
+                 for company in new_companies],
+                batch_size=len(rows)
+            )
+        return len(new_companies), len(update_companies)
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Type
+
+from scrapCompanyInfo import GetCompanyInfoMixin
+from common.driver.webDriverPool import get_shared_pool
+from getCompanyInfoCareerconnection import GetCompanyInfoCareerconnection
+from getCompanyInfoDoocyJob import GetCompanyInfoDoocyJob
+from getCompanyInfoEngage import GetCompanyInfoEngage
+from getCompanyInfoForkwell import GetCompanyInfoForkwell
+from getCompanyInfoFuma import GetCompanyInfoFuma
+from getCompanyInfoGeekly import GetCompanyInfoGeekly
+from getCompanyInfoGreen import GetCompanyInfoGreen
+from getCompanyInfoJobtalk import GetCompanyInfoJobtalk
+from getCompanyInfoOpenwork import GetCompanyInfoOpenwork
+from getCompanyInfoRikunabi import GetCompanyInfoRikunabi
+from getCompanyInfoSyukatsuKaigi import GetCompanyInfoSyukatsuKaigi
+from getCompanyInfoType import GetCompanyInfoType
+
+
+class SourceConfig(NamedTuple):
+    """
+    媒体毎の実行設定(各getCompanyInfo*.pyの__main__の既定値と同じ)
+    """
+    # 取得クラス
+    scraper_class: Type[GetCompanyInfoMixin]
+    # 媒体名
+    source: str
+    # 出力ファイル名に付ける名前
+    filename: str
+    # コンストラクタの引数
+    init_kwargs: Dict[str, Any] = {}
+    # executeの引数
+    execute_kwargs: Dict[str, Any] = {}
+    # 一覧ページの取得中はブラウザを借りたままにする媒体(driver_sessionで画面操作する媒体)
+    holds_browser: bool = False
+
+
+class SourceResult(NamedTuple):
+    """
+    媒体毎の実行結果
+    """
+    name: str
+    source: str
+    status: str
+    company_count: int
+    elapsed: float
+    message: str
+
+
+# 実行できる媒体
+SOURCE_CONFIGS: Dict[str, SourceConfig] = {
+    "Type": SourceConfig(
+        scraper_class=GetCompanyInfoType, source="@type", filename="type",
+        init_kwargs={"keyword": "IT"}),
+    "Green": SourceConfig(
+        scraper_class=GetCompanyInfoGreen, source="Green", filename="green",
+        init_kwargs={"keyword": "IT"}),
+    "Jobtalk": SourceConfig(
+        scraper_class=GetCompanyInfoJobtalk, source="転職会議", filename="jobtalk",
+        holds_browser=True,
+        init_kwargs={
+            "industory_list": [
+                "旅行・ホテル",
+                "教育",
+                "医療・福祉・介護業界",
+                "冠婚葬祭業界",
+                "人材",
+                "その他（サービス/外食/レジャー系）",
+            ],
+            "prefecture_list": ["埼玉県", "千葉県", "東京都", "神奈川県"],
+        }),
+    "Engage": SourceConfig(
+        scraper_class=GetCompanyInfoEngage, source="エンゲージ", filename="engage",
+        holds_browser=True,
+        execute_kwargs={"prefecture_list": ["東京都"]}),
+    "Fuma": SourceConfig(
+        scraper_class=GetCompanyInfoFuma, source="Fuma", filename="fuma",
+        init_kwargs={"keyword": "情報サービス業"}),
+    "Rikunabi": SourceConfig(
+        scraper_class=GetCompanyInfoRikunabi, source="リクナビNEXT", filename="rikunabi_next",
+        init_kwargs={"keyword": "IT"}),
+    "Geekly": SourceConfig(
+        scraper_class=GetCompanyInfoGeekly, source="Geekly", filename="geekly",
+        holds_browser=True,
+        init_kwargs={"keyword": "IT", "limit": "50", "sort": "年収が高い順"}),
+    "Openwork": SourceConfig(
+        scraper_class=GetCompanyInfoOpenwork, source="openwork", filename="openwork",
+        holds_browser=True,
+        init_kwargs={"keyword": "IT"}),
+    "Careerconnection": SourceConfig(
+        scraper_class=GetCompanyInfoCareerconnection, source="キャリコネ", filename="careerconnection",
+        holds_browser=True,
+        init_kwargs={"keyword": "IT"}),
+    "DoocyJob": SourceConfig(
+        scraper_class=GetCompanyInfoDoocyJob, source="DoocyJob", filename="doocyjob",
+        init_kwargs={"keyword": "IT"}),
+    "Forkwell": SourceConfig(
+        scraper_class=GetCompanyInfoForkwell, source="ForkwellJobs", filename="forkwell",
+        init_kwargs={"keyword": "IT"}),
+    "SyukatsuKaigi": SourceConfig(
+        scraper_class=GetCompanyInfoSyukatsuKaigi, source="就活会議", filename="syukatsu_kaigi",
+        holds_browser=True,
+        init_kwargs={
+            "industory_list": [
+                "Webサービス",
+                "ソフトウェア",
+                "情報処理",
+                "インターネット附随サービス業",
+                "その他",
+                "通信業",
+            ],
+            "prefecture_list": ["埼玉県", "千葉県", "東京都", "神奈川県"],
+        }),
+}
+
+
+class ScrapAllCompanyInfo:
+    """
+    複数の媒体から並行して企業情報を取得するクラス
+    (アクセス間隔は媒体のホスト毎・検索エンジンはプロセス全体で共有して制限)
+    媒体間でアクセス間隔の制御と登録済みの会社名の索引、ブラウザのプール、
+    URL取得(検索)のワーカーを共有する(同時に行う検索は全媒体でresolvers件まで)
+    """
+    def __init__(
+        self,
+        names: List[str],
+        interval: int = 2,
+        workers: int = 0,
+        browsers: int = 0,
+        resolvers: int = 0,
+        purge_domein_list: List[str] = [],
+        output_flg: bool = False,
+        **kwargs
+    ) -> None:
+        unknown_names = [name for name in names if name not in SOURCE_CONFIGS]
+        if unknown_names:
+            raise ValueError(f"unknown sources: {unknown_names} (choices: {list(SOURCE_CONFIGS)})")
+        self.names = names
+        # 同時に実行する媒体数(未指定の場合は全媒体を同時に実行)
+        self.workers = workers or len(names)
+        self.output_flg = output_flg
+        # 媒体毎の取得クラス(コンストラクタはメインスレッドで実行)
+        self.scrapers: Dict[str, GetCompanyInfoMixin] = {
+            name: SOURCE_CONFIGS[name].scraper_class(
+                interval=interval,
+                purge_domein_list=purge_domein_list,
+                **dict(SOURCE_CONFIGS[name].init_kwargs, **kwargs)
+            )
+            for name in names
+        }
+        # 全媒体で共有するURL取得のワーカー数(未指定の場合は各媒体のRESOLVE_WORKERSの最大値)
+        self.resolvers = resolvers or max(
+            [max(scraper.RESOLVE_WORKERS, 1) for scraper in self.scrapers.values()] or [1])
+        for scraper in self.scrapers.values():
+            # 他の媒体が検索していない間は1媒体で共有のワーカーを使い切れるようにする
+            scraper.RESOLVE_WORKERS = self.resolvers
+        # 全媒体で共有するブラウザ数(未指定の場合は同時に実行する媒体数. 必要数に満たない場合は必要数)
+        min_browsers = self.get_min_browsers()
+        if browsers and browsers < min_browsers:
+            raise ValueError(
+                f"browsers must be at least {min_browsers}"
+                f" (browsers held by listing crawls + browsers for url resolution)")
+        self.browsers = browsers or max(self.workers, min_browsers)
+
+
+    def get_min_browsers(self) -> int:
+        """
+        待ち続ける媒体が出ないために必要なブラウザ数
+        (一覧の取得中にブラウザを借りたままにする媒体の同時実行数 + 共有のURL取得のワーカー数)
+        """
+        holding = sum(SOURCE_CONFIGS[name].holds_browser for name in self.names)
+        return min(holding, self.workers) + self.resolvers
+
+
+    def _share_name_index(self) -> None:
+        """
+        登録済みの会社名の索引を1回だけ読み込み、全媒体で共有する
+        (他の媒体で検索済み・検索中の会社は検索しない)
+        """
+        scrapers = list(self.scrapers.values())
+        if not scrapers:
+            return
+        name_index = scrapers[0]._get_name_index()
+        for scraper in scrapers[1:]:
+            scraper.name_index = name_index
+
+
+    def _run_source(self, name: str) -> SourceResult:
+        """
+        1媒体分の処理を実行
+        """
+        config = SOURCE_CONFIGS[name]
+        scraper = self.scrapers[name]
+        started = time.monotonic()
+        try:
+            company_list = scraper.execute(
+                source=config.source,
+                output_filename=f"temp_{config.filename}.txt",
+                output_filename_csv=f"temp_dict_{config.filename}.csv",
+                output_flg=self.output_flg,
+                **config.execute_kwargs
+            )
+        except Exception:
+            message = traceback.format_exc()
+            print(f"{name} error: {message}")
+            return SourceResult(
+                name=name,
+                source=config.source,
+                status="error",
+                company_count=0,
+                elapsed=time.monotonic() - started,
+                message=message.strip().splitlines()[-1]
+            )
+        return SourceResult(
+            name=name,
+            source=config.source,
+            status="success",
+            company_count=len(company_list or []),
+            elapsed=time.monotonic() - started,
+            message=f"URLキャッシュ ヒット: {scraper.url_cache_stats['hit']} 件"
+                    f" / ミス: {scraper.url_cache_stats['miss']} 件"
+        )
+
+
+    def execute(self) -> List[SourceResult]:
+        """
+        全媒体を並行して実行し、まとめた結果をSlackへ通知
+        """
+        started = time.monotonic()
+        self._share_name_index()
+        # ブラウザのプールは全媒体で共有
+        get_shared_pool().ensure_capacity(size=self.browsers)
+        # URL取得(検索)のワーカーも全媒体で共有
+        with ThreadPoolExecutor(max_workers=self.resolvers) as resolve_executor:
+            for scraper in self.scrapers.values():
+                scraper.resolve_executor = resolve_executor
+            try:
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    results = list(executor.map(self._run_source, self.names))
+            finally:
+                for scraper in self.scrapers.values():
+                    scraper.resolve_executor = None
+        report = self.create_report(results=results, elapsed=time.monotonic() - started)
+        print(report)
+        # Slack通知
+        list(self.scrapers.values())[0].slack_client.post_message(
+            source="全媒体",
+            message=report,
+            status="success" if all(result.status == "success" for result in results) else "warn"
+        )
+        return results
+
+
+    @staticmethod
+    def create_report(results: List[SourceResult], elapsed: float) -> str:
+        """
+        媒体毎の実行結果をまとめたレポートを作成
+        """
+        lines = [f"全媒体の処理が完了しました。({len(results)} 媒体 / {elapsed:.0f} 秒)"]
+        for result in results:
+            lines.append(
+                f"- {result.source}: {result.status}"
+                f" 会社名 {result.company_count} 件 / {result.elapsed:.0f} 秒 ({result.message})"
+            )
+        lines.append(
+            f"合計: 会社名 {sum(result.company_count for result in results)} 件"
+            f" / 失敗 {sum(result.status != 'success' for result in results)} 媒体"
+        )
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+
+    def str_to_list(arg):
+        return arg.split(',')
+
+    import argparse
+    # 引数の設定
+    parser = argparse.ArgumentParser(description='複数の媒体から並行して会社の情報を取得する')
+    parser.add_argument("--sources", type=str_to_list, help=f"取得元媒体のリスト({','.join(SOURCE_CONFIGS)})",
+            default=list(SOURCE_CONFIGS))
+    parser.add_argument("--interval", type=int, help="処理の間隔時間(秒)", default=2)
+    parser.add_argument("--workers", type=int, help="同時に実行する媒体数(0の場合は全媒体)", default=0)
+    parser.add_argument("--browsers", type=int,
+            help="全媒体で共有するブラウザ数(0の場合は同時に実行する媒体数."
+                 " 一覧の取得中にブラウザを借りたままにする媒体数 + URL取得のワーカー数 未満は指定不可)", default=0)
+    parser.add_argument("--resolvers", type=int,
+            help="全媒体で共有するURL取得のワーカー数(0の場合は環境変数RESOLVE_WORKERS)", default=0)
+    parser.add_argument("--incremental_pages", type=int,
+            help="未登録の会社がない一覧ページがこの数だけ続いたら取得を終了(0の場合は全ページ取得)", default=0)
+    parser.add_argument("--pipeline", action="store_true", help="会社名の取得とURL取得・保存を同時に進める")
+    parser.add_argument("--output", type=bool, help="中間ファイル出力可否フラグ", default=False)
+    args = parser.parse_args()
+
+    purge_domein_list = ['wantedly.com']
+    scrap_all_company_info = ScrapAllCompanyInfo(
+        names=args.sources,
+        interval=args.interval,
+        workers=args.workers,
+        browsers=args.browsers,
+        resolvers=args.resolvers,
+        purge_domein_list=purge_domein_list,
+        output_flg=args.output,
+        pipeline_mode=args.pipeline,
+        incremental_pages=args.incremental_pages
+    )
+    scrap_all_company_info.execute()
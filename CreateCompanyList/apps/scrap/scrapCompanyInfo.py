@@ -1,17 +1,25 @@
 # -*- coding: utf-8 -*-
 
 import csv
+import gzip
+import hashlib
 import re
+import threading
 import time
 import os
-from typing import List, Dict, Union, Tuple
+import queue
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Generator, Iterable, List, Dict, NamedTuple, Union, Tuple
+from urllib.parse import urlparse
 
 import cchardet
-import requests
+import lxml.html
 from bs4 import BeautifulSoup as bs
 from selenium import webdriver
+from selenium.common.exceptions import NoSuchElementException
 from selenium.webdriver.chrome.webdriver import WebDriver as ChromeWebDriver
-from selenium.webdriver.common.by import By
 from selenium.webdriver.firefox.webdriver import WebDriver as FirefoxWebDriver
 
 # 削除予定
@@ -19,8 +27,40 @@ import sys
 sys.path.append('./')
 
 from common.db.mariaDbManager import MariaDbManager
-from common.decorater.wait_sec import wait_seconds
+from common.db.sqlRegistry import Statement, get_sql_registry
+from common.driver.webDriverPool import get_shared_pool
+from common.utils.httpSession import get_http_session
 from common.utils.messages import SlackClientManager
+from common.utils.adaptivePacer import AdaptivePacer, PacingDecision, get_host_pacer, parse_retry_after
+from common.utils.companyNameSet import CompanyNameSet
+from common.utils.nameIndex import NameIndex
+from common.utils.recordJournal import RecordJournal, get_journal
+from common.utils.utils import normalize_company_name
+
+
+class ListingPage(NamedTuple):
+    """
+    一覧ページ1ページ分の取得結果
+    """
+    # ページ内の会社名リスト
+    company_names: Iterable[Any]
+    # 次のページのURL(最終ページの場合は空文字)
+    next_url: str
+
+
+class CrawlState(NamedTuple):
+    """
+    前回中断した一覧ページの取得状況
+    """
+    # 次に取得するページのURL
+    next_url: str
+    # 取得済みのページ数
+    page_count: int
+
+
+# テーブル作成・スキーマ変更を同じプロセス内のスレッド間で排他するロック
+# (プロセス間はDBのGET_LOCKで排他する)
+_schema_lock = threading.RLock()
 
 
 class GetCompanyInfoMixin:
@@ -40,10 +80,47 @@ class GetCompanyInfoMixin:
     DRIVER_PATH = os.path.join(BASE_DIR, "driver")
     # SQL格納ディレクトリ
     SQL_DIR = os.path.join(BASE_DIR, "sql")
+    # SQL格納ディレクトリ内の全SQL(読み込み・検証はimport時の1回のみ)
+    SQL_REGISTRY = get_sql_registry(sql_dir=SQL_DIR)
     # 出力ファイル格納ディレクトリ
     OUTPUT_DIR = os.path.join(BASE_DIR, "output")
+    # DB書き込み前のデータを残すジャーナル格納ディレクトリ
+    JOURNAL_DIR = os.path.join(BASE_DIR, "journal")
     # 接続するDB名
     # DB_NAME = "main.db"
+    # 会社URLキャッシュの有効期間(日)
+    URL_CACHE_TTL_DAYS = 30
+    # 検索で会社URLが見つからなかった結果をキャッシュから返す期間(日)
+    URL_CACHE_MISS_TTL_DAYS = 7
+    # テーブル作成・スキーマ変更のロックを待つ時間(秒)
+    SCHEMA_LOCK_TIMEOUT = 300
+    # 媒体サイトへのアクセス間隔(秒). Noneの場合はintervalを使用
+    REQUEST_INTERVAL: Union[float, None] = None
+    # 応答を見て調整するアクセス間隔の下限(秒). Noneの場合はREQUEST_INTERVALを使用
+    REQUEST_INTERVAL_MIN: Union[float, None] = None
+    # 応答を見て調整するアクセス間隔の上限(秒)
+    REQUEST_INTERVAL_MAX = 300
+    # DBへまとめて登録する行数(1バッチ毎にコミット)
+    INSERT_BATCH_SIZE = 500
+    # CSV出力時にDBから1回に読み出す行数
+    EXPORT_CHUNK_SIZE = 1000
+    # URL取得中にDBへ途中保存する件数・間隔(秒)
+    CHECKPOINT_SIZE = 50
+    CHECKPOINT_SECONDS = 300
+    # 一覧ページの取得を前回中断したページから再開するか
+    RESUME_CRAWL = True
+    # 再開できる取得状況の有効期間(時間)
+    CRAWL_STATE_TTL_HOURS = 24
+    # 未登録の会社がない一覧ページがこの数だけ続いたら取得を終了(0の場合は全ページ取得)
+    INCREMENTAL_PAGES = 0
+    # 社名の取得とURL取得・保存を同時に進めるか
+    PIPELINE_MODE = False
+    # 社名の取得とURL取得の間のキューの上限
+    PIPELINE_QUEUE_SIZE = 100
+    # 媒体サイトへ連続でアクセスできる数
+    REQUEST_BURST = 1
+    # 媒体サイトへのアクセス待機時に加えるゆらぎの上限(秒)
+    REQUEST_JITTER = 0.0
 
     def __init__(
         self,
@@ -63,8 +140,153 @@ class GetCompanyInfoMixin:
         self.slack_client = SlackClientManager()
         # Slack通知用(添付)クライアント
         self.slack_file_client = SlackClientManager(webhooks=False)
+        # 使い回すHTTPセッション
+        self.http_session = get_http_session()
+        # 使い回すブラウザのプール
+        self.driver_pool = get_shared_pool()
+        # 会社URLキャッシュの利用可否
+        self.use_url_cache = kwargs.get("use_url_cache", True)
+        # 会社URLキャッシュの有効期間(日)
+        self.URL_CACHE_TTL_DAYS = kwargs.get("url_cache_ttl_days", self.URL_CACHE_TTL_DAYS)
+        self.URL_CACHE_MISS_TTL_DAYS = kwargs.get("url_cache_miss_ttl_days", self.URL_CACHE_MISS_TTL_DAYS)
+        # 一覧ページ毎にまとめて読み込んだキャッシュ(照合用の会社名 -> URL. 見つからなかった会社は空文字)
+        self._url_cache: Dict[str, str] = {}
+        # キャッシュを確認済みの会社名(照合用)
+        self._url_cache_checked: set = set()
+        # DBへまとめて記録するキャッシュのヒット
+        self._url_cache_hits: List[str] = []
+        self._url_cache_lock = threading.Lock()
+        # 会社URLキャッシュのテーブル確認済みフラグ
+        self._url_cache_ready = False
+        # 会社URLキャッシュのヒット/ミス件数
+        self.url_cache_stats = {"hit": 0, "miss": 0}
+        self._stats_lock = threading.Lock()
+        # URL取得を並行して行うワーカー数
+        self.RESOLVE_WORKERS = int(kwargs.get("resolve_workers", os.getenv("RESOLVE_WORKERS", 1)))
+        # 複数の媒体で共有するURL取得のワーカー(Noneの場合は媒体毎に作成)
+        self.resolve_executor: Union[ThreadPoolExecutor, None] = kwargs.get("resolve_executor")
+        # DBへまとめて登録する行数
+        self.INSERT_BATCH_SIZE = int(kwargs.get(
+                "insert_batch_size", os.getenv("INSERT_BATCH_SIZE", self.INSERT_BATCH_SIZE)))
+        # URL取得中にDBへ途中保存する件数・間隔(秒)
+        self.CHECKPOINT_SIZE = int(kwargs.get(
+                "checkpoint_size", os.getenv("CHECKPOINT_SIZE", self.CHECKPOINT_SIZE)))
+        self.CHECKPOINT_SECONDS = float(kwargs.get(
+                "checkpoint_seconds", os.getenv("CHECKPOINT_SECONDS", self.CHECKPOINT_SECONDS)))
+        # 一覧ページの取得を前回中断したページから再開するか
+        self.RESUME_CRAWL = str(kwargs.get(
+                "resume_crawl", os.getenv("RESUME_CRAWL", self.RESUME_CRAWL))).lower() in ("1", "true")
+        self.CRAWL_STATE_TTL_HOURS = int(kwargs.get(
+                "crawl_state_ttl_hours", os.getenv("CRAWL_STATE_TTL_HOURS", self.CRAWL_STATE_TTL_HOURS)))
+        # 未登録の会社がない一覧ページがこの数だけ続いたら取得を終了
+        self.INCREMENTAL_PAGES = int(kwargs.get(
+                "incremental_pages", os.getenv("INCREMENTAL_PAGES", self.INCREMENTAL_PAGES)))
+        # 社名の取得とURL取得・保存を同時に進めるか
+        self.PIPELINE_MODE = str(kwargs.get(
+                "pipeline_mode", os.getenv("PIPELINE_MODE", self.PIPELINE_MODE))).lower() in ("1", "true")
+        self.PIPELINE_QUEUE_SIZE = int(kwargs.get(
+                "pipeline_queue_size", os.getenv("PIPELINE_QUEUE_SIZE", self.PIPELINE_QUEUE_SIZE)))
+        # テーブル・スキーマ変更の確認済みフラグ
+        self._schema_ready = False
+        # 登録済みの会社名の索引(初回のURL取得時に読み込む)
+        self.name_index: Union[NameIndex, None] = None
+        # DB書き込み前のデータを残すジャーナル格納ディレクトリ
+        self.JOURNAL_DIR = kwargs.get("journal_dir", os.getenv("JOURNAL_DIR", self.JOURNAL_DIR))
+        # 媒体サイトへのアクセスペース
+        self.REQUEST_INTERVAL = kwargs.get("request_interval", self.REQUEST_INTERVAL or interval)
+        self.REQUEST_BURST = kwargs.get("request_burst", self.REQUEST_BURST)
+        self.REQUEST_JITTER = kwargs.get("request_jitter", self.REQUEST_JITTER)
+        self.REQUEST_INTERVAL_MIN = kwargs.get(
+                "request_interval_min", self.REQUEST_INTERVAL_MIN or self.REQUEST_INTERVAL)
+        self.REQUEST_INTERVAL_MAX = kwargs.get("request_interval_max", self.REQUEST_INTERVAL_MAX)
+        # ホスト毎のアクセス間隔(同じホストは全ワーカー・全媒体で共有)
+        self.host_pacers: Dict[str, AdaptivePacer] = {
+            urlparse(self.BASE_URL).netloc.lower(): get_host_pacer(
+                url=self.BASE_URL,
+                interval=self.REQUEST_INTERVAL,
+                min_interval=self.REQUEST_INTERVAL_MIN,
+                max_interval=self.REQUEST_INTERVAL_MAX,
+                burst=self.REQUEST_BURST,
+                jitter=self.REQUEST_JITTER
+            ),
+            urlparse(self.SERCH_ENGIN_URL).netloc.lower(): get_host_pacer(
+                url=self.SERCH_ENGIN_URL,
+                interval=self.INTERVAL_TIME,
+                min_interval=self.INTERVAL_TIME,
+                max_interval=self.REQUEST_INTERVAL_MAX
+            ),
+        }
+        # この処理で行ったアクセス間隔の調整履歴
+        self.pacing_decisions: List[PacingDecision] = []
+
+
+    def _get_pacer(self, url_: str) -> AdaptivePacer:
+        """
+        アクセス先ホストのペーサを取得(未登録のホストはintervalから開始)
+        """
+        pacer = self.host_pacers.get(urlparse(url_).netloc.lower())
+        if pacer is None:
+            pacer = get_host_pacer(
+                url=url_,
+                interval=self.INTERVAL_TIME,
+                min_interval=self.INTERVAL_TIME,
+                max_interval=self.REQUEST_INTERVAL_MAX
+            )
+        return pacer
+
+
+    def throttle(self, url_: str) -> float:
+        """
+        アクセス先ホストのリミッタで、同じホストへのアクセスが詰まっている時だけ待機
+        """
+        return self._get_pacer(url_=url_).wait()
+
+
+    def pace(
+        self,
+        url_: str,
+        started: float,
+        status: Union[int, None] = None,
+        retry_after: Union[str, None] = None,
+        failed: bool = False
+    ) -> PacingDecision:
+        """
+        サーバの応答(レイテンシ・ステータス・Retry-After)からアクセス間隔を調整して記録
+        """
+        decision = self._get_pacer(url_=url_).observe(
+            latency=time.monotonic() - started,
+            status=status,
+            retry_after=parse_retry_after(retry_after),
+            failed=failed
+        )
+        with self._stats_lock:
+            self.pacing_decisions.append(decision)
+        print(f"pacing: {decision.host} {decision.reason} "
+              f"(latency: {decision.latency:.2f} sec, status: {decision.status}) "
+              f"interval: {decision.old_interval:.1f} -> {decision.new_interval:.1f} sec")
+        return decision
+
+
+    def get_pacing_summary(self) -> str:
+        """
+        アクセス間隔の調整結果をホスト毎に集計
+        """
+        summary: Dict[str, Dict[str, Any]] = {}
+        with self._stats_lock:
+            for decision in self.pacing_decisions:
+                host_summary = summary.setdefault(decision.host, {"reasons": {}})
+                reasons = host_summary["reasons"]
+                reasons[decision.reason] = reasons.get(decision.reason, 0) + 1
+                host_summary["interval"] = decision.new_interval
+        return "\n".join(
+            "{host}: {reasons} (現在の間隔: {interval:.1f} 秒)".format(
+                host=host,
+                reasons=", ".join(f"{reason} {count}" for reason, count in host_summary["reasons"].items()),
+                interval=host_summary["interval"]
+            ) for host, host_summary in summary.items()
+        )
+
 
-    @wait_seconds(seconds=3)
     def init_selenium_get_page(self, url_: str) -> ChromeWebDriver:
         # ブラウザ非動作オプション
         options = webdriver.ChromeOptions()
@@ -84,36 +306,325 @@ class GetCompanyInfoMixin:
         driver = webdriver.Chrome(
                 executable_path=os.path.join(
                         self.DRIVER_PATH, driver_name), options=options)
+        # インターバル
+        self.throttle(url_=url_)
         # 検索
         driver.get(url_)
         return driver
 
-    @wait_seconds(seconds=1)
     def init_selenium_ff_get_page(self, url_: str) -> FirefoxWebDriver:
-        options = webdriver.FirefoxOptions()
-        options.add_argument('--headless')
-        driver = webdriver.Firefox(options=options)
-        driver.set_window_size(1920, 2160)
-        driver.implicitly_wait(30)
-        # 検索
-        driver.get(url_)
+        """
+        プールからブラウザを借りてページを開く(使用後はrelease_driverで返却)
+        """
+        # インターバル(待機中はブラウザを借りない)
+        self.throttle(url_=url_)
+        driver = self.driver_pool.checkout()
+        started = time.monotonic()
+        try:
+            # 検索
+            driver.get(url_)
+        except Exception:
+            self.pace(url_=url_, started=started, failed=True)
+            self.release_driver(driver=driver, discard=True)
+            raise
+        # 表示にかかった時間からアクセス間隔を調整
+        self.pace(url_=url_, started=started)
         return driver
 
 
+    def release_driver(self, driver: FirefoxWebDriver, discard: bool = False) -> None:
+        """
+        借りたブラウザをプールへ返却
+        """
+        self.driver_pool.checkin(driver=driver, discard=discard)
+
+
+    @contextmanager
+    def driver_session(self) -> Generator[FirefoxWebDriver, None, None]:
+        """
+        一連のページ遷移で使い続けるブラウザを借りる(抜けるとプールへ返却)
+        """
+        with self.driver_pool.driver() as driver:
+            yield driver
+
+
+    def load_page(self, driver: FirefoxWebDriver, url_: str) -> FirefoxWebDriver:
+        """
+        借りているブラウザで指定のページを開く
+        """
+        # インターバル
+        self.throttle(url_=url_)
+        started = time.monotonic()
+        try:
+            driver.get(url_)
+        except Exception:
+            self.pace(url_=url_, started=started, failed=True)
+            raise
+        # 表示にかかった時間からアクセス間隔を調整
+        self.pace(url_=url_, started=started)
+        return driver
+
+
+    def get_page_tree(
+        self,
+        driver: FirefoxWebDriver,
+        ready_locator: Union[Tuple[str, str], None] = None
+    ) -> lxml.html.HtmlElement:
+        """
+        表示中のページのDOMを1回でまとめて取得してパース(リンクは絶対URLへ変換)
+        """
+        if ready_locator:
+            try:
+                # 対象の要素が描画されるまで待機
+                driver.find_element(*ready_locator)
+            except NoSuchElementException:
+                pass
+        tree = lxml.html.fromstring(driver.page_source)
+        tree.make_links_absolute(driver.current_url)
+        return tree
+
+
+    @staticmethod
+    def get_element_text(element: lxml.html.HtmlElement) -> str:
+        """
+        要素内のテキストを空白を詰めて取得(Seleniumの.text相当)
+        """
+        return " ".join(element.text_content().split())
+
+
     def parse_html(self, url_: str) -> bs:
         """
         htmlのパース
         """
         # インターバル
-        time.sleep(self.INTERVAL_TIME)
-        # 対象ページのHTMLの取得
-        response = requests.get(url=url_)
+        self.throttle(url_=url_)
+        # 対象ページのHTMLの取得(タイムアウト・リトライ付き)
+        started = time.monotonic()
+        try:
+            response = self.http_session.get(url=url_)
+        except Exception:
+            self.pace(url_=url_, started=started, failed=True)
+            raise
+        # 応答時間・ステータス・Retry-Afterからアクセス間隔を調整
+        self.pace(
+            url_=url_,
+            started=started,
+            status=response.status_code,
+            retry_after=response.headers.get("Retry-After")
+        )
         # 文字化け対策
         self.CHAR_CODE = cchardet.detect(response.content)["encoding"]
         # htmlのパース
         return bs(response.content, "lxml", from_encoding=self.CHAR_CODE)
     
 
+    def iter_listing_pages(
+        self,
+        start_url: str,
+        get_listing_page: Callable[[str], ListingPage],
+        source: Union[str, None] = None
+    ) -> Generator[ListingPage, None, None]:
+        """
+        一覧ページを先頭から次のページがなくなるまで順に取得
+        sourceを指定した場合は1ページ毎に取得状況を保存し、前回中断したページから再開
+        (再開時は前回URL取得・保存まで終わらなかった・失敗した会社名を先に返す)
+        INCREMENTAL_PAGESを指定した場合は未登録の会社がないページが続いた時点で終了
+        """
+        next_url = start_url
+        page_count = 0
+        # 未登録の会社がないページの連続数
+        known_pages = 0
+        if source and self.RESUME_CRAWL:
+            crawl_state = self.load_crawl_state(source=source, facet=start_url)
+            if crawl_state:
+                next_url, page_count = crawl_state.next_url, crawl_state.page_count
+                print(f"resume crawl: {source} from page {page_count + 1} ({next_url})")
+            # 前回の取得が完了していても、URL取得に失敗した会社名は残っている
+            crawled_names = self.load_crawled_names(source=source, facet=start_url)
+            if crawled_names:
+                self.prefetch_url_cache(company_names=crawled_names)
+                yield ListingPage(company_names=crawled_names, next_url=next_url)
+        while next_url:
+            listing_page = get_listing_page(next_url)
+            # 呼び出し元が会社名を索引へ追加する前に判定
+            known_pages = 0 if self.has_unseen_company(
+                    company_names=listing_page.company_names) else known_pages + 1
+            # ページ内の会社のURLキャッシュをまとめて読み込む
+            self.prefetch_url_cache(company_names=listing_page.company_names)
+            yield listing_page
+            page_count += 1
+            stop = self.INCREMENTAL_PAGES and known_pages >= self.INCREMENTAL_PAGES
+            if stop:
+                print(f"incremental stop: {known_pages} pages without new companies ({next_url})")
+            if source:
+                # 呼び出し元が取り込んだ後に保存(途中で終了した場合も完了として保存)
+                self.checkpoint_crawl_state(
+                    source=source,
+                    facet=start_url,
+                    company_names=listing_page.company_names,
+                    page_url=next_url,
+                    next_url="" if stop else listing_page.next_url,
+                    page_count=page_count
+                )
+            next_url = "" if stop else listing_page.next_url
+
+
+    def has_unseen_company(
+        self,
+        company_names: Iterable[Any],
+        get_company_name: Callable[[Any], str] = lambda company_name: company_name
+    ) -> bool:
+        """
+        一覧ページの会社名に未登録の会社が含まれるか(INCREMENTAL_PAGES未指定の場合は常にTrue)
+        """
+        if not self.INCREMENTAL_PAGES:
+            return True
+        name_index = self._get_name_index()
+        return any(
+            self._get_company_key(company_name=get_company_name(company_name)) not in name_index
+            for company_name in company_names
+        )
+
+
+    def load_crawl_state(self, source: str, facet: str) -> Union[CrawlState, None]:
+        """
+        前回中断した一覧ページの取得状況(CRAWL_STATE_TTL_HOURS時間以内で未完了のもののみ)
+        """
+        try:
+            with MariaDbManager() as mdb_manager:
+                self._prepare_schema(mdb=mdb_manager)
+                statement = self._get_sql(name="get_crawl_state")
+                rows = mdb_manager.execute_statement(
+                    statement=statement,
+                    params={"source": source, "facet": facet, "ttl_hours": self.CRAWL_STATE_TTL_HOURS}
+                )
+        except Exception as e:
+            # 取得できない場合は先頭から取得
+            print(f"crawl state error: {e}")
+            return None
+        if not rows:
+            return None
+        return CrawlState(next_url=rows[0][0], page_count=rows[0][1] or 0)
+
+
+    def save_crawl_state(
+        self,
+        source: str,
+        facet: str,
+        page_url: str,
+        next_url: str,
+        page_count: int
+    ) -> None:
+        """
+        一覧ページ1ページ分の取得状況を保存(次のページがない場合は完了として保存)
+        """
+        try:
+            with MariaDbManager() as mdb_manager:
+                self._prepare_schema(mdb=mdb_manager)
+                statement = self._get_sql(name="upsert_crawl_state")
+                mdb_manager.execute_statement(
+                    statement=statement,
+                    params={
+                        "source": source,
+                        "facet": facet,
+                        "last_page_url": page_url,
+                        "next_url": next_url or None,
+                        "page_count": page_count,
+                        "completed": 0 if next_url else 1,
+                    }
+                )
+        except Exception as e:
+            # 保存できなくても取得は続ける
+            print(f"crawl state error: {e}")
+
+
+    def checkpoint_crawl_state(
+        self,
+        source: str,
+        facet: str,
+        company_names: Iterable[Any],
+        page_url: str,
+        next_url: str,
+        page_count: int
+    ) -> None:
+        """
+        一覧ページの会社名をジャーナルへ残してから取得状況を保存
+        (会社名はURL取得・保存が終わるまで残し、強制終了した場合も再開時に取得し直す)
+        """
+        try:
+            self._get_crawl_journal(source=source, facet=facet).append(
+                records=[{"company_name": company_name} for company_name in company_names])
+        except Exception as e:
+            # 会社名を残せない場合は取得状況を進めない(再開時はこのページから取得)
+            print(f"crawl journal error: {e}")
+            return
+        self.save_crawl_state(
+            source=source,
+            facet=facet,
+            page_url=page_url,
+            next_url=next_url,
+            page_count=page_count
+        )
+
+
+    def load_crawled_names(self, source: str, facet: str) -> List[Any]:
+        """
+        前回URL取得・保存まで終わらなかった一覧ページの会社名
+        """
+        try:
+            records, _ = self._get_crawl_journal(source=source, facet=facet).read()
+        except Exception as e:
+            print(f"crawl journal error: {e}")
+            return []
+        if records:
+            print(f"resume crawled names: {source} {len(records)} companies")
+        return [record["company_name"] for record in records]
+
+
+    def discard_crawled_names(
+        self,
+        source: str,
+        failed_names: Iterable[Any] = (),
+        get_company_name: Callable[[Any], str] = lambda company_name: company_name
+    ) -> None:
+        """
+        URL取得・保存まで終わった媒体の一覧ページの会社名をジャーナルから削除
+        (URL取得に失敗した会社名は次回の再開時に取得し直すため残す)
+        """
+        crawl_journal_dir = self._get_crawl_journal_dir(source=source)
+        if not os.path.isdir(crawl_journal_dir):
+            return
+        failed_keys = {
+            self._get_company_key(company_name=get_company_name(company_name))
+            for company_name in failed_names
+        }
+        for filename in os.listdir(crawl_journal_dir):
+            if not filename.endswith(".jsonl"):
+                continue
+            journal = get_journal(path=os.path.join(crawl_journal_dir, filename))
+            with journal.locked():
+                records, size = journal.read()
+                # 残す分を末尾へ追記してから読み込んだ分を削除(途中で止まっても失わない)
+                journal.append(records=[
+                    record for record in records
+                    if self._get_company_key(
+                        company_name=get_company_name(record["company_name"])) in failed_keys
+                ])
+                journal.discard(size=size)
+
+
+    def _get_crawl_journal_dir(self, source: str) -> str:
+        return os.path.join(self.JOURNAL_DIR, "crawl", source or "unknown")
+
+
+    def _get_crawl_journal(self, source: str, facet: str) -> RecordJournal:
+        """
+        一覧ページの取得条件毎の会社名のジャーナル
+        """
+        digest = hashlib.sha1(facet.encode("utf-8")).hexdigest()
+        return get_journal(path=os.path.join(self._get_crawl_journal_dir(source=source), f"{digest}.jsonl"))
+
+
     def _is_not_purge_url(self, company_url: str) -> bool:
         """
         媒体等のURLかどうか判定(除かない場合True)
@@ -127,9 +638,64 @@ class GetCompanyInfoMixin:
         return not_purge_flg
 
 
+    def collect_company_info(
+        self,
+        company_names: Iterable[Any],
+        output_list: CompanyNameSet,
+        source: str,
+        output_filename: str = "./temp.txt",
+        output_filename_csv: str = "./temp.csv",
+        output_flg: bool = False,
+        detailed: bool = False
+    ) -> None:
+        """
+        一覧ページから取得した会社名にHPのURLを付与してDBへ登録
+        PIPELINE_MODEの場合は会社名の取得(company_names)とURL取得・保存を同時に進める
+        detailed: 会社名が[社名, 資本金, 従業員数, ページ]のリストの場合はTrue
+        """
+        if not self.PIPELINE_MODE:
+            # 全ページの会社名を取得してからURLを取得
+            company_names = list(company_names)
+            self._notify_company_names(source=source, output_list=output_list,
+                    output_filename=output_filename, output_flg=output_flg, detailed=detailed)
+        create_company_info = self.create_company_infos if detailed else self.create_company_info
+        # 取得した会社名リストにHPのURLを付与したデータをDBへ登録
+        _ = create_company_info(
+            company_name_list=company_names,
+            source=source,
+            output_filename=output_filename_csv,
+            output_flg=output_flg
+        )
+        if self.PIPELINE_MODE:
+            self._notify_company_names(source=source, output_list=output_list,
+                    output_filename=output_filename, output_flg=output_flg, detailed=detailed)
+
+
+    def _notify_company_names(
+        self,
+        source: str,
+        output_list: CompanyNameSet,
+        output_filename: str,
+        output_flg: bool,
+        detailed: bool
+    ) -> None:
+        """
+        取得した会社名の件数を通知(output_flgの場合は外部ファイルへ書き出し)
+        """
+        if output_flg:
+            # 外部ファイルへの書き出し
+            output_data = self.output_datas if detailed else self.output_data
+            output_data(filename_=output_filename, data_list=output_list)
+        # Slack通知
+        self.slack_client.post_message(
+            source=source,
+            message=f"媒体から会社名の取得が完了しました。 {len(output_list)} 件"
+        )
+
+
     def create_company_info(
         self,
-        company_name_list: List[str],
+        company_name_list: Iterable[str],
         source: str,
         output_filename: str = "./temp_dict_.csv",
         output_flg: bool = False
@@ -139,29 +705,15 @@ class GetCompanyInfoMixin:
             source=source,
             message="媒体から取得した社名リストからそれぞれのURLを取得する処理を開始しました。"
         )
-        company_info = []
-        for i, company_name in enumerate(company_name_list, start=1):
-            print(f"in processing... {i}/{len(company_name_list)}", end="\r")
-            try:
-                company_url = self.get_company_url(company_name=company_name).copy()
-                company_info.append(
-                    dict(
-                        **company_url,
-                        **{"source": source}
-                    )
-                )
-            except Exception as e:
-                import traceback
-                # Slack通知
-                self.slack_client.post_message(
-                    source=source,
-                    message=traceback.format_exc(),
-                    status="warn"
-                )
-                continue
-        print(f"finished: {len(company_name_list)}")
-        # データ保存
-        self.save(data_list=company_info)
+        company_info = self._resolve_company_list(
+            company_name_list=company_name_list,
+            source=source,
+            build_record=lambda company_name: dict(
+                **self.get_company_url(company_name=company_name).copy(),
+                **{"source": source}
+            )
+        )
+        print(f"url cache: {self.url_cache_stats}")
 
         if output_flg:
             # 外部ファイルへの書き出し
@@ -171,13 +723,16 @@ class GetCompanyInfoMixin:
         self.slack_client.post_message(
             source=source,
             message="媒体から取得した社名リストの作成処理が完了しました。"
+                    f"(URLキャッシュ ヒット: {self.url_cache_stats['hit']} 件"
+                    f" / ミス: {self.url_cache_stats['miss']} 件)\n"
+                    f"アクセス間隔の調整結果:\n{self.get_pacing_summary()}"
         )
         return company_info
 
 
     def create_company_infos(
         self,
-        company_name_list: List[List[str]],
+        company_name_list: Iterable[List[Union[str, int]]],
         source: str,
         output_filename: str = "./temp_dict_.csv",
         output_flg: bool = False
@@ -187,18 +742,52 @@ class GetCompanyInfoMixin:
             source=source,
             message="媒体から取得した社名リストからそれぞれのURLを取得する処理を開始しました。"
         )
-        company_info = []
-        for i, company_name in enumerate(company_name_list, start=1):
-            print(f"in processing... {i}/{len(company_name_list)}", end="\r")
+        company_info = self._resolve_company_list(
+            company_name_list=company_name_list,
+            source=source,
+            build_record=lambda company_name: dict(
+                **self.get_company_url(company_name=company_name[0]).copy(),
+                **{"capital": company_name[1], "employees": company_name[2], "page": company_name[3], "source": source}
+            ),
+            get_company_name=lambda company_name: company_name[0],
+            get_page=lambda company_name: company_name[3]
+        )
+        print(f"url cache: {self.url_cache_stats}")
+
+        if output_flg:
+            # 外部ファイルへの書き出し
+            self.output_datas_csv(filename_=output_filename,
+                    data=company_info)
+        # Slack通知
+        self.slack_client.post_message(
+            source=source,
+            message="媒体から取得した社名リストの作成処理が完了しました。"
+                    f"(URLキャッシュ ヒット: {self.url_cache_stats['hit']} 件"
+                    f" / ミス: {self.url_cache_stats['miss']} 件)\n"
+                    f"アクセス間隔の調整結果:\n{self.get_pacing_summary()}"
+        )
+        return company_info
+
+
+    def _resolve_company_list(
+        self,
+        company_name_list: Iterable[Any],
+        source: str,
+        build_record: Callable[[Any], Dict[str, Union[str, int]]],
+        get_company_name: Callable[[Any], str] = lambda company_name: company_name,
+        get_page: Callable[[Any], Union[str, int, None]] = lambda company_name: None
+    ) -> List[Dict[str, Union[str, int]]]:
+        """
+        社名リストの各社のURLを取得(RESOLVE_WORKERSが2以上の場合は並行処理)
+        resolve_executorがある場合は他の媒体と共有するワーカーでURLを取得
+        PIPELINE_MODEの場合は社名リスト(ジェネレータ)の取得と同時にURLを取得
+        取得した分はCHECKPOINT_SIZE件 もしくは CHECKPOINT_SECONDS秒毎にDBへ保存
+        """
+        def resolve(company_name: Any) -> Union[Dict[str, Union[str, int]], None]:
             try:
-                company_url = self.get_company_url(company_name=company_name[0]).copy()
-                company_info.append(
-                    dict(
-                        **company_url,
-                        **{"capital": company_name[1], "employees": company_name[2], "page": company_name[3], "source": source}
-                    )
-                )
+                return build_record(company_name)
             except Exception as e:
+                failed_names.append(company_name)
                 import traceback
                 # Slack通知
                 self.slack_client.post_message(
@@ -206,45 +795,396 @@ class GetCompanyInfoMixin:
                     message=traceback.format_exc(),
                     status="warn"
                 )
-                continue
-        print(f"finished: {len(company_name_list)}")
-        # データ保存
-        self.save(data_list=company_info)
+                return None
 
-        if output_flg:
-            # 外部ファイルへの書き出し
-            self.output_datas_csv(filename_=output_filename,
-                    data=company_info)
-        # Slack通知
-        self.slack_client.post_message(
+        company_info = []
+        # URL取得に失敗した会社名(一覧ページの会社名のジャーナルに残す)
+        failed_names = []
+        # 未保存のデータ
+        pending = []
+        last_checkpoint = time.monotonic()
+        workers = max(self.RESOLVE_WORKERS, 1)
+        executor = None
+        # 結果を受け取っていないURL取得(中断時に未着手の分は取り消す)
+        futures: Deque[Future] = deque()
+        if self.PIPELINE_MODE:
+            # 社名の取得とURL取得を別スレッドで同時に進める
+            results = self._iter_pipeline_results(
+                company_names=company_name_list,
+                source=source,
+                resolve=resolve,
+                get_company_name=get_company_name,
+                get_page=get_page
+            )
+            total = "?"
+        else:
+            # 登録済みの会社は検索しない
+            company_name_list = self._drop_known_companies(
+                company_name_list=list(company_name_list),
+                source=source,
+                get_company_name=get_company_name,
+                get_page=get_page
+            )
+            total = len(company_name_list)
+            if self.resolve_executor or workers > 1:
+                if self.resolve_executor is None:
+                    # ワーカー毎にブラウザを持てるようにプールを広げる
+                    self.driver_pool.ensure_capacity(size=workers)
+                    executor = ThreadPoolExecutor(max_workers=workers)
+                # 入力順で結果を返す(先に投入するのはワーカー数分まで)
+                results = self._iter_submitted(
+                    executor=self.resolve_executor or executor,
+                    resolve=resolve,
+                    company_names=company_name_list,
+                    futures=futures,
+                    window=workers
+                )
+            else:
+                results = map(resolve, company_name_list)
+        i = 0
+        try:
+            for i, record in enumerate(results, start=1):
+                print(f"in processing... {i}/{total}", end="\r")
+                if record:
+                    company_info.append(record)
+                    pending.append(record)
+                if len(pending) >= self.CHECKPOINT_SIZE \
+                        or (pending and time.monotonic() - last_checkpoint >= self.CHECKPOINT_SECONDS):
+                    # 途中で止まっても検索結果を失わないよう保存
+                    self._checkpoint(data_list=pending)
+                    pending = []
+                    last_checkpoint = time.monotonic()
+        finally:
+            # 中断した場合は社名の取得・URL取得のスレッドを止める
+            close = getattr(results, "close", None)
+            if close:
+                close()
+            # 中断した場合は未着手のURL取得を取り消し、実行中の分は終わるのを待って保存
+            # (共有のワーカーは他の媒体が使うため止めない)
+            pending.extend(self._cancel_futures(futures=futures))
+            if executor:
+                executor.shutdown(wait=True, cancel_futures=True)
+            if pending:
+                # 中断した場合も取得済みの分は保存
+                self._checkpoint(data_list=pending)
+            self.flush_url_cache_hits()
+        # 全件のURL取得・保存まで終わったため、取得状況と一緒に残した会社名は不要
+        # (URL取得に失敗した会社名は残す)
+        self.discard_crawled_names(
             source=source,
-            message="媒体から取得した社名リストの作成処理が完了しました。"
+            failed_names=failed_names,
+            get_company_name=get_company_name
         )
+        print(f"finished: {i}")
         return company_info
 
 
+    @staticmethod
+    def _iter_submitted(
+        executor: ThreadPoolExecutor,
+        resolve: Callable[[Any], Union[Dict[str, Union[str, int]], None]],
+        company_names: Iterable[Any],
+        futures: Deque[Future],
+        window: int
+    ) -> Generator[Union[Dict[str, Union[str, int]], None], None, None]:
+        """
+        社名をwindow件ずつ先に投入しながら、投入した順にURL取得の結果を返す
+        (受け取っていない分はfuturesに残るため、中断時は呼び出し元で取り消す)
+        """
+        for company_name in company_names:
+            futures.append(executor.submit(resolve, company_name))
+            if len(futures) >= window:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+
+    @staticmethod
+    def _cancel_futures(futures: Deque[Future]) -> List[Dict[str, Union[str, int]]]:
+        """
+        未着手のURL取得を取り消し、終わっている(実行中だった)分の結果を返す
+        """
+        for future in futures:
+            future.cancel()
+        wait([future for future in futures if not future.cancelled()])
+        records = [
+            future.result() for future in futures
+            if not future.cancelled() and future.exception() is None and future.result()
+        ]
+        futures.clear()
+        return records
+
+
+    def _iter_pipeline_results(
+        self,
+        company_names: Iterable[Any],
+        source: str,
+        resolve: Callable[[Any], Union[Dict[str, Union[str, int]], None]],
+        get_company_name: Callable[[Any], str],
+        get_page: Callable[[Any], Union[str, int, None]] = lambda company_name: None
+    ) -> Generator[Union[Dict[str, Union[str, int]], None], None, None]:
+        """
+        社名の取得 → (上限付きキュー) → URL取得ワーカー → (上限付きキュー) → 呼び出し元(保存)
+        の順に流し、社名の取得順(executor.mapと同じ順)に結果を返す
+        (resolve_executorがある場合、URL取得ワーカーは共有のワーカーへ検索を渡して待つ)
+        呼び出し元へ返していない結果が2*ワーカー数件に達したら社名の取得を待たせる
+        """
+        name_index = self._get_name_index()
+        workers = max(self.RESOLVE_WORKERS, 1)
+        # 並べ直すために待たせる結果の上限(先頭の1件が遅くても他のワーカーが止まらない程度)
+        window = 2 * workers
+        # 一覧ページ用のブラウザとワーカー毎のブラウザを持てるようにプールを広げる
+        self.driver_pool.ensure_capacity(size=workers + 1)
+        name_queue: queue.Queue = queue.Queue(maxsize=self.PIPELINE_QUEUE_SIZE)
+        record_queue: queue.Queue = queue.Queue(maxsize=self.PIPELINE_QUEUE_SIZE)
+        # 呼び出し元が中断した場合に各スレッドを止める
+        stop = threading.Event()
+        # 各段の終了の目印
+        done = object()
+        # 次に呼び出し元へ返す通し番号(社名の取得側はこの番号からwindow件先までしか進まない)
+        next_seq = 0
+        progress = threading.Condition()
+
+        def put(queue_: queue.Queue, item: Any) -> bool:
+            # キューが一杯の間は待つ(中断された場合は諦める)
+            while not stop.is_set():
+                try:
+                    queue_.put(item, timeout=1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def crawl() -> None:
+            # 検索しなかった登録済みの会社(照合用の会社名, ページ)
+            known_companies = []
+            # 検索する会社の通し番号(結果を取得順に並べ直すために使う)
+            seq = 0
+            try:
+                for company_name in company_names:
+                    company_key = self._get_company_key(company_name=get_company_name(company_name))
+                    # 登録済み・取得済みの会社は検索しない
+                    if not name_index.add(company_key):
+                        known_companies.append((company_key, get_page(company_name)))
+                        continue
+                    with progress:
+                        # 並べ直し待ちの結果が増えすぎないよう、呼び出し元が追いつくまで待つ
+                        while seq - next_seq >= window and not stop.is_set():
+                            progress.wait(timeout=1)
+                    if not put(name_queue, (seq, company_name)):
+                        return
+                    seq += 1
+            except Exception:
+                import traceback
+                # Slack通知
+                self.slack_client.post_message(
+                    source=source,
+                    message=traceback.format_exc(),
+                    status="warn"
+                )
+            finally:
+                # 中断した場合も一覧ページ用のブラウザ・取得状況を手放す
+                close = getattr(company_names, "close", None)
+                if close:
+                    close()
+                self._touch_known_companies(known_companies=known_companies, source=source)
+                for _ in range(workers):
+                    put(name_queue, done)
+
+        def work() -> None:
+            try:
+                while not stop.is_set():
+                    try:
+                        item = name_queue.get(timeout=1)
+                    except queue.Empty:
+                        continue
+                    if item is done:
+                        return
+                    seq, company_name = item
+                    if self.resolve_executor:
+                        record = self.resolve_executor.submit(resolve, company_name).result()
+                    else:
+                        record = resolve(company_name)
+                    if not put(record_queue, (seq, record)):
+                        return
+            finally:
+                put(record_queue, done)
+
+        threads = [threading.Thread(target=crawl, daemon=True)]
+        threads.extend(threading.Thread(target=work, daemon=True) for _ in range(workers))
+        for thread in threads:
+            thread.start()
+        finished = 0
+        # 先に取得できた結果は前の番号の結果が揃うまで待たせる(最大window件)
+        waiting: Dict[int, Union[Dict[str, Union[str, int]], None]] = {}
+        try:
+            while finished < workers:
+                item = record_queue.get()
+                if item is done:
+                    finished += 1
+                    continue
+                seq, record = item
+                waiting[seq] = record
+                while next_seq in waiting:
+                    yield waiting.pop(next_seq)
+                    with progress:
+                        next_seq += 1
+                        progress.notify_all()
+        finally:
+            stop.set()
+            with progress:
+                progress.notify_all()
+            for thread in threads:
+                thread.join()
+
+
+    def _checkpoint(self, data_list: List[Dict[str, Union[str, int]]]) -> None:
+        """
+        取得済みのデータをDBへ保存
+        """
+        self.save(data_list=data_list)
+        print(f"checkpoint: saved {len(data_list)} companies")
+
+
+    def load_name_index(self) -> NameIndex:
+        """
+        companys_infoの登録済みの会社名(正規化済み)を1回のクエリで読み込む(処理中1回のみ)
+        """
+        if self.name_index is not None:
+            return self.name_index
+        with MariaDbManager() as mdb_manager:
+            self._prepare_schema(mdb=mdb_manager)
+            statement = self._get_sql(name="get_company_keys")
+            # 1行ずつ読みながらハッシュ値にするので全件をリストで持たない
+            self.name_index = NameIndex(
+                names=(row[0] for row in mdb_manager.iter_rows(
+                    sql=statement.sql,
+                    params=statement.bind(),
+                    chunk_size=self.EXPORT_CHUNK_SIZE
+                ))
+            )
+        print(f"name index: {len(self.name_index)} companies")
+        return self.name_index
+
+
+    def _get_name_index(self) -> NameIndex:
+        """
+        登録済みの会社名の索引(読み込めない場合は空の索引で今回の重複のみ除く)
+        """
+        try:
+            return self.load_name_index()
+        except Exception as e:
+            print(f"name index error: {e}")
+            self.name_index = NameIndex()
+            return self.name_index
+
+
+    def _drop_known_companies(
+        self,
+        company_name_list: List[Any],
+        source: str,
+        get_company_name: Callable[[Any], str],
+        get_page: Callable[[Any], Union[str, int, None]] = lambda company_name: None
+    ) -> List[Any]:
+        """
+        登録済み・リスト内で重複している会社を社名リストから除く(検索前に除外する)
+        """
+        name_index = self._get_name_index()
+        remaining = []
+        # 除いた会社(照合用の会社名, ページ)
+        known_companies = []
+        for company_name in company_name_list:
+            company_key = self._get_company_key(company_name=get_company_name(company_name))
+            if name_index.add(company_key):
+                remaining.append(company_name)
+            else:
+                known_companies.append((company_key, get_page(company_name)))
+        print(f"skip known: {len(known_companies)} / {len(company_name_list)}")
+        self._touch_known_companies(known_companies=known_companies, source=source)
+        return remaining
+
+
+    def _touch_known_companies(
+        self,
+        known_companies: List[Tuple[str, Union[str, int, None]]],
+        source: str
+    ) -> None:
+        """
+        検索せずに除いた登録済みの会社の登録日時・媒体・ページをまとめて更新
+        (登録時のinsertで更新していた分を、検索を行わない場合も同じく更新する.
+         ページを進めないと、登録済みの会社だけのページから再開し続けるため)
+        """
+        if not known_companies:
+            return
+        statement = self._get_sql(name="update_companys_info_seen")
+        try:
+            with MariaDbManager() as mdb_manager:
+                rowcount = mdb_manager.executemany(
+                    sql=statement.sql,
+                    params_list=[
+                        statement.bind({
+                            "source": source,
+                            "page": page if page else None,
+                            "company_key": company_key,
+                        })
+                        for company_key, page in known_companies
+                    ],
+                    batch_size=self.INSERT_BATCH_SIZE
+                )
+            print(f"touched known: {rowcount} / {len(known_companies)}")
+        except Exception as e:
+            # 更新できなくても会社名の取得・検索は続ける
+            print(f"touch known error: {e}")
+
+
     def get_company_url(self, company_name: str) -> Dict[str, str]:
+        """
+        会社名からURLを取得(キャッシュになければ検索)
+        """
+        if self.use_url_cache:
+            # 過去に取得済みのURLを確認(見つからなかった結果も有効期間内は再検索しない)
+            cached_url = self._get_cached_company_url(company_name=company_name)
+            with self._stats_lock:
+                self.url_cache_stats["hit" if cached_url is not None else "miss"] += 1
+            if cached_url is not None:
+                return {"name": company_name, "url": cached_url}
+        company_info = self.search_company_url(company_name=company_name)
+        if self.use_url_cache:
+            # 検索結果をキャッシュ
+            self._set_cached_company_url(
+                company_name=company_name, company_url=company_info["url"])
+        return company_info
+
+
+    def search_company_url(self, company_name: str) -> Dict[str, str]:
         """
         会社名でググってURLを取得
         """
-        # インターバル
-        time.sleep(self.INTERVAL_TIME)
         # 会社HP検索用URL作成
         url_ = "{base_url}{name}%E3%80%80会社概要".format(
                         base_url=self.SERCH_ENGIN_URL, name=company_name)
-        # 検索結果一覧を取得
+        # 検索結果一覧を取得(並行処理時も検索エンジンへのアクセスは一定間隔)
         # driver = self.init_selenium_get_page(url_=url_)
         driver = self.init_selenium_ff_get_page(url_=url_)
+        try:
+            # 検索結果ページをまとめて取得
+            tree = self.get_page_tree(driver=driver)
+        except Exception:
+            # 状態の分からないブラウザは破棄
+            self.release_driver(driver=driver, discard=True)
+            raise
+        # ブラウザをプールへ返却
+        self.release_driver(driver=driver)
         # 会社URL用
         company_url = ""
         # URLのリスト取得
-        for i, elemh3 in  enumerate(driver.find_elements(By.XPATH, "//a/h3")):
+        for i, elemh3 in  enumerate(tree.xpath("//a/h3")):
             # 検索エンジンにてヒットしたサイト一覧
-            matched_article = re.match(r"^.*会社(概要|案内|情報).*$", elemh3.text)
+            matched_article = re.match(r"^.*会社(概要|案内|情報).*$", self.get_element_text(elemh3))
             # タイトルマッチする記事、もしくは検索した先頭に上がってきた記事
-            elema = elemh3.find_element(By.XPATH, "..")
+            elema = elemh3.getparent()
             # 企業URL
-            _url = elema.get_attribute("href")
+            _url = elema.get("href", "")
 
             if matched_article:
                 if self._is_not_purge_url(company_url=_url):
@@ -256,10 +1196,123 @@ class GetCompanyInfoMixin:
                 company_url = _url
             else:
                 continue
-        # ブラウザを閉じる
-        driver.close()
         return {"name": company_name, "url": company_url}
 
+
+    def _prepare_url_cache(self, mdb: MariaDbManager) -> None:
+        """
+        会社URLキャッシュ用テーブルの準備
+        """
+        if self._url_cache_ready:
+            return
+        with self._schema_migration_lock(mdb=mdb):
+            if not self.exists_table(mdb=mdb, tablename="company_url_cache"):
+                # テーブル作成
+                self.create_table(mdb=mdb, tablename="company_url_cache")
+        self._url_cache_ready = True
+
+
+    def prefetch_url_cache(self, company_names: Iterable[str]) -> None:
+        """
+        一覧ページの会社名のキャッシュを1回のクエリでまとめて読み込む
+        (登録済みで検索しない会社・確認済みの会社は除く)
+        """
+        if not self.use_url_cache:
+            return
+        name_index = self._get_name_index()
+        company_keys = []
+        with self._url_cache_lock:
+            for company_name in company_names:
+                company_key = self._get_company_key(company_name=company_name)
+                if company_key in name_index or company_key in self._url_cache_checked:
+                    continue
+                self._url_cache_checked.add(company_key)
+                company_keys.append(company_key)
+        self._load_url_cache(company_keys=company_keys)
+
+
+    def _load_url_cache(self, company_keys: List[str]) -> None:
+        """
+        有効期間内のキャッシュをINSERT_BATCH_SIZE件ずつまとめて読み込む
+        """
+        try:
+            with MariaDbManager() as mdb_manager:
+                self._prepare_url_cache(mdb=mdb_manager)
+                statement = self._get_sql(name="get_company_url_cache")
+                for i in range(0, len(company_keys), self.INSERT_BATCH_SIZE):
+                    rows = mdb_manager.execute_statement(
+                        statement=statement,
+                        params={
+                            "company_keys": company_keys[i:i + self.INSERT_BATCH_SIZE],
+                            "ttl_days": self.URL_CACHE_TTL_DAYS,
+                            "miss_ttl_days": self.URL_CACHE_MISS_TTL_DAYS,
+                        }
+                    )
+                    with self._url_cache_lock:
+                        self._url_cache.update(rows)
+        except Exception as e:
+            # キャッシュが使えない場合は検索で取得する
+            print(f"url cache error: {e}")
+
+
+    def _get_cached_company_url(self, company_name: str) -> Union[str, None]:
+        """
+        キャッシュから有効期間内の会社URLを取得(見つからなかった結果は空文字. キャッシュなしはNone)
+        読み込んでいない会社のみDBを確認
+        """
+        company_key = self._get_company_key(company_name=company_name)
+        with self._url_cache_lock:
+            checked = company_key in self._url_cache_checked
+            self._url_cache_checked.add(company_key)
+        if not checked:
+            self._load_url_cache(company_keys=[company_key])
+        with self._url_cache_lock:
+            company_url = self._url_cache.pop(company_key, None)
+            if company_url is None:
+                return None
+            # ヒット数はまとめて記録
+            self._url_cache_hits.append(company_key)
+            flush = len(self._url_cache_hits) >= self.INSERT_BATCH_SIZE
+        if flush:
+            self.flush_url_cache_hits()
+        return company_url
+
+
+    def flush_url_cache_hits(self) -> None:
+        """
+        キャッシュのヒット数をまとめてDBへ記録
+        """
+        with self._url_cache_lock:
+            company_keys, self._url_cache_hits = self._url_cache_hits, []
+        if not company_keys:
+            return
+        try:
+            with MariaDbManager() as mdb_manager:
+                statement = self._get_sql(name="update_company_url_cache_hit")
+                mdb_manager.executemany(
+                    sql=statement.sql,
+                    params_list=[statement.bind({"company_key": company_key}) for company_key in company_keys],
+                    batch_size=self.INSERT_BATCH_SIZE
+                )
+        except Exception as e:
+            print(f"url cache error: {e}")
+
+
+    def _set_cached_company_url(self, company_name: str, company_url: str) -> None:
+        """
+        検索した会社URLをキャッシュへ保存
+        """
+        company_key = self._get_company_key(company_name=company_name)
+        try:
+            with MariaDbManager() as mdb_manager:
+                self._prepare_url_cache(mdb=mdb_manager)
+                mdb_manager.execute_statement(
+                    statement=self._get_sql(name="insert_company_url_cache"),
+                    params={"company_key": company_key, "company": company_name, "url": company_url}
+                )
+        except Exception as e:
+            print(f"url cache error: {e}")
+
         
     def output_data(self, filename_: str, data_list: List[str]) -> None:
         with open(filename_, mode="a", encoding=self.CHAR_CODE) as fw:
@@ -316,28 +1369,116 @@ class GetCompanyInfoMixin:
 
 
     def save(self, data_list: List[Dict[str, Union[str, int]]]) -> None:
-        # DBへデータを保存
-        mdb_manager = MariaDbManager()
-        # mariaDBのcursorを生成
-        mdb_manager.generate_cursor()
-        if not self.exists_table(mdb=mdb_manager):
-            # テーブル作成
-            self.create_table(mdb=mdb_manager)
-        # データ挿入
-        self.insert_company_info(mdb=mdb_manager, data_list=data_list)
-        # BDの接続を解除
-        mdb_manager.close()
+        if not data_list:
+            return
+        source = data_list[0].get("source", "")
+        journal = self._get_journal(source=source)
+        # DBへ書き込む前にジャーナルへ残す
+        journal.append(records=data_list)
+        try:
+            # 前回までに書き込めなかった分も含めてDBへ反映
+            self.replay_journal(journal=journal)
+        except Exception as e:
+            # DBへ反映できなかった分はジャーナルに残して次回以降に反映する
+            print(f"save error: {e}")
+            self.slack_client.post_message(
+                source=source,
+                message=f"DBへの保存に失敗したためジャーナルに残しました。({journal.path})\n{e}",
+                status="warn"
+            )
+
+
+    def _get_journal(self, source: str) -> RecordJournal:
+        """
+        媒体毎のジャーナル
+        """
+        return get_journal(path=os.path.join(self.JOURNAL_DIR, f"{source or 'unknown'}.jsonl"))
+
+
+    def replay_journal(self, journal: RecordJournal) -> int:
+        """
+        ジャーナルのデータをDBへ反映し、反映を確認できた分をジャーナルから削除
+        (読み込みから削除までは他のスレッド・プロセスと排他)
+        """
+        with journal.locked():
+            records, size = journal.read()
+            if not records:
+                return 0
+            # DBへデータを保存(接続はプールから借りて抜けると返却)
+            with MariaDbManager() as mdb_manager:
+                self._prepare_schema(mdb=mdb_manager)
+                # データ挿入
+                rejected = self.insert_company_info(mdb=mdb_manager, data_list=records)
+            if rejected:
+                # 値が不正で登録できないデータは退避し、以降の保存を妨げないようにする
+                journal.reject(records=[dict(record, error=error) for record, error in rejected])
+                print(f"rejected: {len(rejected)} rows ({journal.rejected_path})")
+                self.slack_client.post_message(
+                    source=records[0].get("source", ""),
+                    message=f"DBへ登録できないデータ {len(rejected)} 件を退避しました。({journal.rejected_path})",
+                    status="warn"
+                )
+            journal.discard(size=size)
+        return len(records) - len(rejected)
+
+
+    def replay_journals(self) -> int:
+        """
+        ジャーナル格納ディレクトリ内の全ジャーナルをDBへ反映
+        """
+        if not os.path.isdir(self.JOURNAL_DIR):
+            return 0
+        total = 0
+        for filename in sorted(os.listdir(self.JOURNAL_DIR)):
+            if not filename.endswith(".jsonl"):
+                continue
+            journal = get_journal(path=os.path.join(self.JOURNAL_DIR, filename))
+            count = self.replay_journal(journal=journal)
+            print(f"replayed: {filename} {count} rows")
+            total += count
+        return total
+
+
+    def _prepare_schema(self, mdb: MariaDbManager) -> None:
+        """
+        テーブル作成と未適用のスキーマ変更の適用(処理中1回のみ)
+        """
+        if self._schema_ready:
+            return
+        with self._schema_migration_lock(mdb=mdb):
+            if not self.exists_table(mdb=mdb):
+                # テーブル作成
+                self.create_table(mdb=mdb)
+            # 未適用のスキーマ変更を適用
+            self.migrate(mdb=mdb)
+        self._schema_ready = True
+
+
+    @contextmanager
+    def _schema_migration_lock(self, mdb: MariaDbManager) -> Generator[None, None, None]:
+        """
+        テーブル作成・スキーマ変更を他のスレッド・プロセスと排他する
+        (同じプロセス内はモジュールのロック、プロセス間はDBのGET_LOCKで排他.
+         どちらも同じスレッド・接続からは入れ子で取得できる)
+        """
+        params = {"lock_name": "schema_migrations", "timeout": self.SCHEMA_LOCK_TIMEOUT}
+        with _schema_lock:
+            rows = mdb.execute_statement(statement=self._get_sql(name="get_lock"), params=params)
+            if not rows or rows[0][0] != 1:
+                raise TimeoutError(f"schema_migrations のロックを取得できません: {rows}")
+            try:
+                yield
+            finally:
+                mdb.execute_statement(
+                    statement=self._get_sql(name="release_lock"),
+                    params={"lock_name": params["lock_name"]}
+                )
 
 
     def get_page(self, source: str) -> Union[int, None]:
-        # DBへデータを保存
-        mdb_manager = MariaDbManager()
-        # mariaDBのcursorを生成
-        mdb_manager.generate_cursor()
-        # データ取得
-        page = self.get_previous_page(mdb=mdb_manager, source=source)
-        # BDの接続を解除
-        mdb_manager.close()
+        # 前回まで登録したページを取得
+        with MariaDbManager() as mdb_manager:
+            page = self.get_previous_page(mdb=mdb_manager, source=source)
         if page:
             return page[0][0]
         return None
@@ -346,109 +1487,173 @@ class GetCompanyInfoMixin:
     def output_csv_from_db(
         self,
         filename: str = "./all.csv",
-        source: str = None
-    ) -> None:
-        # DBからCSVを生成
-        mdb_manager = MariaDbManager()
-        # mariaDBのcursorを生成
-        mdb_manager.generate_cursor()
+        source: str = None,
+        compress: bool = False
+    ) -> str:
+        # DBからCSVを生成(全件をメモリに載せず読み出した分から書き込む)
         # ファイル名
-        # sql_filename = "get_fuma_company_info.sql" if source == "Fuma" else "get_all_company_info.sql"
         if source == "Fuma":
-            sql_filename = "get_fuma_company_info.sql"
+            sql_name = "get_fuma_company_info"
         elif source:
-            sql_filename = "get_target_source_company_info.sql"
+            sql_name = "get_target_source_company_info"
         else:
-            sql_filename = "get_all_company_info.sql"
+            sql_name = "get_all_company_info"
 
-        # データ取得
-        datas = self.get_data(filename=sql_filename, mdb=mdb_manager, source=source)
-        # BDの接続を解除
-        mdb_manager.close()
+        if compress and not filename.endswith(".gz"):
+            # gzip圧縮して出力
+            filename = f"{filename}.gz"
+        open_file = gzip.open if compress else open
 
         print(f"filename: {filename}")
-        with open(file=filename, mode="w", newline='', encoding="utf-8") as file:
+        with MariaDbManager() as mdb_manager, \
+                open_file(filename, mode="wt", newline='', encoding="utf-8") as file:
             writer = csv.writer(file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-            # データを書き込む
-            for row in datas:
+            # 取得できた分から順にデータを書き込む
+            for row in self.iter_data(name=sql_name, mdb=mdb_manager, source=source):
                 writer.writerow(row)
+        return filename
 
 
-    def _get_sql(self, filename: str) -> str:
-        filepath = os.path.join(self.SQL_DIR, filename)
-        with open(file=filepath, mode="r") as fsql:
-            sql = fsql.read()
-        return sql
+    def _get_sql(self, name: str) -> Statement:
+        """
+        登録済みのSQLを名前(ファイル名の拡張子なし)で取得
+        """
+        return self.SQL_REGISTRY.get(name=name)
 
 
     def get_previous_page(self, mdb: MariaDbManager, source: str) -> List[Union[Tuple[str], None]]:
-        base_sql = self._get_sql(filename="get_latest_page.sql")
-        sql = base_sql.format(source=source)
-        print(sql)
-        return mdb.execute(sql=sql)
+        return mdb.execute_statement(
+            statement=self._get_sql(name="get_latest_page"),
+            params={"source": source}
+        )
 
 
     def exists_table(self, mdb: MariaDbManager, tablename: str = "companys_info") -> List[Union[Tuple[str], None]]:
-        base_sql = self._get_sql(filename="exists_table.sql")
-        sql = base_sql.format(table_name=tablename)
-        print(sql)
-        return mdb.execute(sql=sql)
+        return mdb.execute_statement(
+            statement=self._get_sql(name="exists_table"),
+            params={"table_name": tablename}
+        )
 
 
     def create_table(self, mdb: MariaDbManager, tablename: str = "companys_info") -> None:
-        filename = "create_table_companys_info.sql" if tablename == "companys_info" else "create_table_ng_companys.sql"
-        sql = self._get_sql(filename=filename)
-        print(sql)
-        mdb.execute(sql=sql)
+        mdb.execute_script(sql=self._get_sql(name=f"create_table_{tablename}").sql)
+
+
+    def migrate(self, mdb: MariaDbManager) -> None:
+        """
+        未適用のスキーマ変更(migrations/V***__*.sql)をバージョン順に適用
+        (適用済みのバージョンはロックを取得してから読み込む)
+        """
+        with self._schema_migration_lock(mdb=mdb):
+            mdb.execute_script(sql=self._get_sql(name="create_table_schema_migrations").sql)
+            applied_versions = {
+                row[0] for row in mdb.execute_statement(
+                        statement=self._get_sql(name="get_applied_migrations"))
+            }
+            for name in self.SQL_REGISTRY.names(prefix="migrations/"):
+                matched = re.match(r"^migrations/(V[0-9]+)__.+$", name)
+                if not matched or matched.group(1) in applied_versions:
+                    continue
+                version = matched.group(1)
+                print(f"migrate: {name}")
+                mdb.execute_script(sql=self._get_sql(name=name).sql)
+                # SQLだけでは行えないデータ移行
+                migrate_data = getattr(self, f"_migrate_data_{version.lower()}", None)
+                if migrate_data:
+                    migrate_data(mdb=mdb)
+                mdb.execute_statement(
+                    statement=self._get_sql(name="insert_schema_migration"),
+                    params={"version": version}
+                )
+
+
+    def _migrate_data_v001(self, mdb: MariaDbManager) -> None:
+        """
+        既存データの照合用会社名(company_key)を登録時と同じ正規化で埋める
+        """
+        rows = mdb.execute_statement(statement=self._get_sql(name="get_companys_info_without_key"))
+        statement = self._get_sql(name="update_companys_info_company_key")
+        mdb.executemany(
+            sql=statement.sql,
+            params_list=[
+                statement.bind({
+                    "company_key": self._get_company_key(company_name=company or ""),
+                    "id": id_,
+                })
+                for id_, company in rows
+            ],
+            batch_size=self.INSERT_BATCH_SIZE
+        )
+
+
+    @staticmethod
+    def _get_company_key(company_name: str) -> str:
+        """
+        重複判定用の会社名(正規化済み)
+        """
+        return normalize_company_name(company_name=company_name)[:100]
 
 
     def insert_company_info(
         self,
         mdb: MariaDbManager,
         data_list: List[Dict[str, Union[str, int]]]
-    ) -> None:
-        base_sql = self._get_sql(filename="insert_company_info.sql")
+    ) -> List[Tuple[Dict[str, Union[str, int]], str]]:
+        """
+        データをまとめて登録し、値が不正で登録できなかったデータとエラー内容を返す
+        """
+        statement = self._get_sql(name="insert_company_info")
+        params_list = []
         for d in data_list:
             c_name = d.get("name", "")
             c_url = d.get("url", "")
-            c_capital = d.get("capital", "")
-            c_employee = d.get("employees", "")
-            c_page=d.get("page", "")
-            c_source=d.get("source", "")
-            # 挿入用データ作成
-            insert_data = "'{name}', '{url}', '{employees}', '{capital}', {page}, '{source}', NOW()".format(
-                name=c_name,
-                url=c_url,
-                capital=c_capital,
-                employees=c_employee,
-                page=c_page if c_page else "NULL",
-                source=c_source,
-            )
-            # SQL生成
-            sql = base_sql.format(
-                insert_data=insert_data,
-                company=c_name,
-                url=c_url
-            )
-            print(sql)
-            # insert実行
-            mdb.execute(sql=sql)
+            c_page = d.get("page", "")
+            # 挿入用データ作成(値はプレースホルダへバインド)
+            params_list.append(statement.bind({
+                "company": c_name[:100],
+                "company_key": self._get_company_key(company_name=c_name),
+                # URLなしは重複扱いしないようNULLで登録
+                "url": c_url if c_url else None,
+                "employees": d.get("employees", ""),
+                "capital": d.get("capital", ""),
+                "page": c_page if c_page else None,
+                "source": d.get("source", ""),
+            }))
+        # バッチ毎にまとめてinsert実行(既存の会社は登録日時・媒体を更新)
+        # 複数行のinsertへまとめて送れるよう通常のカーソルで実行
+        # (失敗したバッチは1行ずつ登録し直し、登録できない行だけを除く)
+        rowcount, rejected = mdb.executemany_skip_invalid(
+            sql=statement.sql, params_list=params_list, batch_size=self.INSERT_BATCH_SIZE)
+        print(f"saved: {len(params_list) - len(rejected)} rows (affected: {rowcount})")
+        return [(data_list[i], error) for i, error in rejected]
 
 
     def get_data(
         self,
-        filename: str,
+        name: str,
         mdb: MariaDbManager,
         *args,
         **kwargs
     ) -> List[Union[Tuple[str], None]]:
-        sql = self._get_sql(filename=filename)
-        source = kwargs.get("source", None)
-        if source:
-            sql = sql.format(source=source)
-        print(sql)
+        statement = self._get_sql(name=name)
         # SQL実行
-        return mdb.execute(sql=sql)
+        return mdb.execute_statement(statement=statement, params=kwargs)
+
+
+    def iter_data(
+        self,
+        name: str,
+        mdb: MariaDbManager,
+        *args,
+        **kwargs
+    ) -> Generator[Tuple[Union[str, int, None], ...], None, None]:
+        statement = self._get_sql(name=name)
+        # SQL実行(EXPORT_CHUNK_SIZE件ずつ読み出し)
+        return mdb.iter_rows(
+            sql=statement.sql,
+            params=statement.bind(kwargs),
+            chunk_size=self.EXPORT_CHUNK_SIZE
+        )
 
 
 if __name__ == "__main__":
@@ -459,27 +1664,38 @@ if __name__ == "__main__":
     parser.add_argument("--interval", type=int, help="処理の間隔時間(秒)", default=2)
     parser.add_argument("--source", type=str, help="取得元媒体の種類", default=None)
     parser.add_argument("--file_csv", type=str, help="出力ファイル名(csv).", default="./all.csv")
+    parser.add_argument("--gzip", action="store_true", help="CSVをgzip圧縮して出力する")
+    parser.add_argument("--replay_journal", action="store_true",
+            help="DBへ保存できずにジャーナルへ残ったデータをDBへ反映して終了する(CSV出力・Slack送信は行わない)")
     args = parser.parse_args()
     # 引数の取得
     url = args.url
     interval = args.interval
     source = args.source
     output_filename_csv = args.file_csv
+    compress = args.gzip
+    replay_journal = args.replay_journal
 
     company_list = []
     purge_domein_list = ['wantedly.com']
 
     get_company_info = GetCompanyInfoMixin(base_url=url, interval=interval, purge_domein_list=purge_domein_list)
+    if replay_journal:
+        # ジャーナルに残ったデータをDBへ反映して終了(出力は行わない)
+        replayed = get_company_info.replay_journals()
+        print(f"replayed total: {replayed} rows")
+        sys.exit(0)
     output_filepath: str = os.path.join(
         get_company_info.OUTPUT_DIR,
         output_filename_csv
     )
 
     # DBに取り込んだデータを外部ファイルへ書き込み
-    get_company_info.output_csv_from_db(filename=output_filepath, source=source)
+    output_filepath = get_company_info.output_csv_from_db(
+            filename=output_filepath, source=source, compress=compress)
     # Slackへ出力したデータ送信
     get_company_info.slack_file_client.upload_files(
         csv_file_path=output_filepath,
-        filename=output_filename_csv,
+        filename=os.path.basename(output_filepath),
         title=f"{source}から取得した情報" if source else "全データの情報"
     )
@@ -0,0 +1,11 @@
+CREATE TABLE IF NOT EXISTS company_url_cache
+	(
+		company_key varchar(100) primary key
+		, company varchar(100)
+		, url varchar(2083)
+		, hit_count int default 0
+		, miss_count int default 0
+		, resolved_date datetime
+		, last_hit_date datetime
+	)
+;
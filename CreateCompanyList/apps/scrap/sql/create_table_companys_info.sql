@@ -1,4 +1,4 @@
-CREATE TABLE companys_info
+CREATE TABLE IF NOT EXISTS companys_info
 	(
 		id int primary key auto_increment
 		, company varchar(50)
@@ -0,0 +1,6 @@
+CREATE TABLE IF NOT EXISTS schema_migrations
+	(
+		version varchar(50) primary key
+		, applied_date datetime
+	)
+;
\ No newline at end of file
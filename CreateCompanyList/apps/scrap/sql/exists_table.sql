@@ -1 +1,8 @@
-SHOW TABLES LIKE '{table_name}';
+SELECT
+	table_name
+FROM
+	information_schema.tables
+WHERE
+	table_schema = DATABASE()
+	AND table_name = %(table_name)s
+;
\ No newline at end of file
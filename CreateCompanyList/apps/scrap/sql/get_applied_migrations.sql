@@ -0,0 +1,7 @@
+SELECT
+	version
+FROM
+	schema_migrations
+ORDER BY
+	version
+;
\ No newline at end of file
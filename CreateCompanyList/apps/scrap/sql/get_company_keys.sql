@@ -0,0 +1,7 @@
+SELECT
+	company_key
+FROM
+	companys_info
+WHERE
+	company_key IS NOT NULL
+;
\ No newline at end of file
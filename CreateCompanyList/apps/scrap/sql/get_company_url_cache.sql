@@ -0,0 +1,12 @@
+SELECT
+	company_key
+	, url
+FROM
+	company_url_cache
+WHERE
+	company_key IN (%(company_keys)s)
+	AND (
+		(url <> '' AND resolved_date >= NOW() - INTERVAL %(ttl_days)s DAY)
+		OR (url = '' AND resolved_date >= NOW() - INTERVAL %(miss_ttl_days)s DAY)
+	)
+;
\ No newline at end of file
@@ -0,0 +1,11 @@
+SELECT
+	company
+	, url
+FROM
+	companys_info
+WHERE
+	company IS NOT NULL
+	AND company <> ''
+ORDER BY
+	id
+;
\ No newline at end of file
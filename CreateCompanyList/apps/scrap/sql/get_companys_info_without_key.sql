@@ -0,0 +1,8 @@
+SELECT
+	id
+	, company
+FROM
+	companys_info
+WHERE
+	company_key IS NULL
+;
\ No newline at end of file
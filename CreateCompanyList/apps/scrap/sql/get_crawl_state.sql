@@ -0,0 +1,12 @@
+SELECT
+	next_url
+	, page_count
+FROM
+	crawl_state
+WHERE
+	source = %(source)s
+	AND facet_hash = UNHEX(SHA2(%(facet)s, 256))
+	AND completed = 0
+	AND next_url IS NOT NULL
+	AND updated_date >= NOW() - INTERVAL %(ttl_hours)s HOUR
+;
\ No newline at end of file
@@ -3,7 +3,7 @@ SELECT
 FROM
 	companys_info
 WHERE
-	source = '{source}'
+	source = %(source)s
 ORDER BY
 	page DESC
 LIMIT
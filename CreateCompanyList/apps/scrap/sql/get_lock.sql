@@ -0,0 +1,3 @@
+SELECT
+	GET_LOCK(%(lock_name)s, %(timeout)s)
+;
\ No newline at end of file
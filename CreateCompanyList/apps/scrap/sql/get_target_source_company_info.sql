@@ -6,7 +6,7 @@ SELECT
 FROM
 	companys_info
 WHERE
-	source = '{source}'
+	source = %(source)s
 ORDER BY
 	add_date
 	, company
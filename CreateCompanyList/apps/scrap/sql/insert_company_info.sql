@@ -1,5 +1,6 @@
 INSERT INTO companys_info(
 	company
+	, company_key
 	, url
 	, employees
 	, capital
@@ -7,15 +8,11 @@ INSERT INTO companys_info(
 	, source
 	, add_date
 )
-SELECT
-	{insert_data}
-WHERE NOT EXISTS (
-	SELECT
-		'exists'
-	FROM
-		companys_info
-	WHERE
-		company = '{company}'
-		OR url = '{url}'
+VALUES (
+	%(company)s, %(company_key)s, %(url)s, %(employees)s, %(capital)s, %(page)s, %(source)s, NOW()
 )
+ON DUPLICATE KEY UPDATE
+	add_date = NOW()
+	, source = VALUES(source)
+	, page = COALESCE(VALUES(page), page)
 ;
\ No newline at end of file
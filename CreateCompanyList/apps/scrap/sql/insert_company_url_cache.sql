@@ -0,0 +1,20 @@
+INSERT INTO company_url_cache(
+	company_key
+	, company
+	, url
+	, miss_count
+	, resolved_date
+)
+VALUES (
+	%(company_key)s
+	, %(company)s
+	, %(url)s
+	, 1
+	, NOW()
+)
+ON DUPLICATE KEY UPDATE
+	company = VALUES(company)
+	, url = VALUES(url)
+	, miss_count = miss_count + 1
+	, resolved_date = NOW()
+;
@@ -0,0 +1,8 @@
+INSERT INTO schema_migrations(
+	version
+	, applied_date
+)
+VALUES (
+	%(version)s, NOW()
+)
+;
\ No newline at end of file
@@ -0,0 +1,11 @@
+ALTER TABLE companys_info
+	ADD COLUMN company_key varchar(100) AFTER company
+	, ADD COLUMN url_hash binary(32) AS (UNHEX(SHA2(url, 256))) PERSISTENT AFTER url
+;
+UPDATE
+	companys_info
+SET
+	url = NULL
+WHERE
+	url = ''
+;
\ No newline at end of file
@@ -0,0 +1,4 @@
+ALTER IGNORE TABLE companys_info
+	ADD UNIQUE KEY uq_companys_info_company_key (company_key)
+	, ADD UNIQUE KEY uq_companys_info_url_hash (url_hash)
+;
\ No newline at end of file
@@ -0,0 +1,4 @@
+ALTER TABLE companys_info
+	ADD INDEX idx_companys_info_source_page (source, page)
+	, ADD INDEX idx_companys_info_source_add_date_company (source, add_date, company)
+;
\ No newline at end of file
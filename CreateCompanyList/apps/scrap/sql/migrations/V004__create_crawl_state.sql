@@ -0,0 +1,14 @@
+CREATE TABLE IF NOT EXISTS crawl_state
+	(
+		id int primary key auto_increment
+		, source varchar(20) NOT NULL
+		, facet varchar(2083) NOT NULL
+		, facet_hash binary(32) AS (UNHEX(SHA2(facet, 256))) PERSISTENT
+		, last_page_url varchar(2083)
+		, next_url varchar(2083)
+		, page_count int NOT NULL DEFAULT 0
+		, completed tinyint(1) NOT NULL DEFAULT 0
+		, updated_date datetime
+		, UNIQUE KEY uq_crawl_state_source_facet (source, facet_hash)
+	)
+;
\ No newline at end of file
@@ -0,0 +1,3 @@
+ALTER TABLE companys_info
+	MODIFY company varchar(100)
+;
\ No newline at end of file
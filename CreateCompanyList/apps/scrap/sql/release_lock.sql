@@ -0,0 +1,3 @@
+SELECT
+	RELEASE_LOCK(%(lock_name)s)
+;
\ No newline at end of file
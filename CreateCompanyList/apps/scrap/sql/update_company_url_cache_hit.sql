@@ -0,0 +1,8 @@
+UPDATE
+	company_url_cache
+SET
+	hit_count = hit_count + 1
+	, last_hit_date = NOW()
+WHERE
+	company_key = %(company_key)s
+;
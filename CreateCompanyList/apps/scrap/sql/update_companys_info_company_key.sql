@@ -0,0 +1,7 @@
+UPDATE
+	companys_info
+SET
+	company_key = %(company_key)s
+WHERE
+	id = %(id)s
+;
\ No newline at end of file
@@ -0,0 +1,9 @@
+UPDATE
+	companys_info
+SET
+	add_date = NOW()
+	, source = %(source)s
+	, page = COALESCE(%(page)s, page)
+WHERE
+	company_key = %(company_key)s
+;
\ No newline at end of file
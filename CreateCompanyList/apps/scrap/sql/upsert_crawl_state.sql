@@ -0,0 +1,25 @@
+INSERT INTO crawl_state(
+	source
+	, facet
+	, last_page_url
+	, next_url
+	, page_count
+	, completed
+	, updated_date
+)
+VALUES (
+	%(source)s
+	, %(facet)s
+	, %(last_page_url)s
+	, %(next_url)s
+	, %(page_count)s
+	, %(completed)s
+	, NOW()
+)
+ON DUPLICATE KEY UPDATE
+	last_page_url = VALUES(last_page_url)
+	, next_url = VALUES(next_url)
+	, page_count = VALUES(page_count)
+	, completed = VALUES(completed)
+	, updated_date = NOW()
+;
\ No newline at end of file
@@ -1,3 +1,890 @@
-from django.test import TestCase
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from typing import Any, Dict, List
+from unittest import mock
+
+from bs4 import BeautifulSoup as bs
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from apps.company.models import Company
+from apps.scrap.models import CompanyList
+from common.db.mariaDbManager import MariaDbManager
+from common.db.sqlRegistry import get_sql_registry, parse_statement
+from common.driver.webDriverPool import WebDriverPool, WebDriverPoolTimeout
+from common.utils.adaptivePacer import AdaptivePacer, parse_retry_after
+from common.utils.companyNameSet import CompanyNameSet
+from common.utils.nameIndex import NameIndex
+from common.utils.rateLimiter import RateLimiter, get_rate_limiter
+from common.utils.recordJournal import RecordJournal, get_journal
+
+# 媒体の取得クラスはgetCompanyInfo*.pyと同じくscrapディレクトリから読み込む
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from getCompanyInfoGreen import GetCompanyInfoGreen  # noqa: E402
+from scrapAllCompanyInfo import ScrapAllCompanyInfo  # noqa: E402
+from scrapCompanyInfo import CrawlState, GetCompanyInfoMixin, ListingPage  # noqa: E402
 
 # Create your tests here.
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql")
+
+
+class FakeSlackClient:
+    """
+    送信したメッセージを記録するだけのSlackクライアント
+    """
+    def __init__(self) -> None:
+        self.messages: List[Dict[str, str]] = []
+
+    def post_message(self, source: str, message: str, status: str = "success") -> None:
+        self.messages.append({"source": source, "message": message, "status": status})
+
+
+class ScraperTestMixin:
+    """
+    DB・ブラウザを使わずに取得クラスを動かすための準備
+    """
+    def setUp(self) -> None:
+        super().setUp()
+        self.journal_dir = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.journal_dir, ignore_errors=True)
+        super().tearDown()
+
+    def create_scraper(self, **kwargs) -> GetCompanyInfoMixin:
+        kwargs.setdefault("use_url_cache", False)
+        scraper = GetCompanyInfoMixin(
+            base_url="https://example.com",
+            interval=0,
+            journal_dir=self.journal_dir,
+            **kwargs
+        )
+        scraper.slack_client = FakeSlackClient()
+        # 登録済みの会社はない状態で始める
+        scraper.name_index = NameIndex()
+        return scraper
+
+
+class FakeMariaDbManager:
+    """
+    companys_infoを会社名(照合用) -> 媒体・ページの辞書で持つだけのDB
+    """
+    def __init__(self, rows: Dict[str, Dict[str, Any]]) -> None:
+        self.rows = rows
+        self.registry = get_sql_registry(sql_dir=SQL_DIR)
+
+    def __call__(self) -> "FakeMariaDbManager":
+        return self
+
+    def __enter__(self) -> "FakeMariaDbManager":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+    def execute_statement(self, statement: Any, params: Dict[str, Any] = {}) -> List[Any]:
+        if statement.name != "get_latest_page":
+            raise NotImplementedError(statement.name)
+        pages = [int(row["page"]) for row in self.rows.values()
+                 if row["source"] == params["source"] and row["page"] is not None]
+        return [(max(pages),)] if pages else []
+
+    def executemany(self, sql: str, params_list: List[Any], batch_size: int = 500) -> int:
+        statement = self.registry.get(name="update_companys_info_seen")
+        if sql != statement.sql:
+            raise NotImplementedError(sql)
+        for params in params_list:
+            params = dict(zip(statement.param_names, params))
+            row = self.rows.get(params["company_key"])
+            if row is not None:
+                row["source"] = params["source"]
+                if params["page"] is not None:
+                    row["page"] = params["page"]
+        return len(params_list)
+
+
+class FakeSchemaDbManager:
+    """
+    スキーマ変更の適用状況だけを持つDB(スレッド毎に作り、状態は共有する)
+    """
+    def __init__(self, applied_versions: set, scripts: List[str]) -> None:
+        self.applied_versions = applied_versions
+        self.scripts = scripts
+
+    def execute_statement(self, statement: Any, params: Dict[str, Any] = {}) -> List[Any]:
+        if statement.name in ("get_lock", "release_lock"):
+            return [(1,)]
+        if statement.name == "exists_table":
+            return [(params["table_name"],)]
+        if statement.name == "get_applied_migrations":
+            return [(version,) for version in sorted(self.applied_versions)]
+        if statement.name == "insert_schema_migration":
+            self.applied_versions.add(params["version"])
+            return []
+        if statement.name == "get_companys_info_without_key":
+            return []
+        raise NotImplementedError(statement.name)
+
+    def execute_script(self, sql: str) -> None:
+        self.scripts.append(sql)
+        # 他のスレッドが割り込めるようにする
+        time.sleep(0.01)
+
+    def executemany(self, sql: str, params_list: List[Any], batch_size: int = 500) -> int:
+        return len(params_list)
+
+
+class FakeUrlCacheDbManager:
+    """
+    company_url_cacheを会社名(照合用) -> URLの辞書で持つだけのDB
+    """
+    def __init__(self, urls: Dict[str, str]) -> None:
+        self.urls = urls
+        self.queries: List[str] = []
+        self.hits: List[str] = []
+
+    def __call__(self) -> "FakeUrlCacheDbManager":
+        return self
+
+    def __enter__(self) -> "FakeUrlCacheDbManager":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+    def execute_statement(self, statement: Any, params: Dict[str, Any] = {}) -> List[Any]:
+        sql, values = statement.expand(params)
+        self.queries.append(sql)
+        if statement.name == "get_company_url_cache":
+            return [(key, self.urls[key]) for key in params["company_keys"] if key in self.urls]
+        if statement.name == "insert_company_url_cache":
+            self.urls[params["company_key"]] = params["url"]
+            return []
+        raise NotImplementedError(statement.name)
+
+    def executemany(self, sql: str, params_list: List[Any], batch_size: int = 500) -> int:
+        self.hits.extend(params[0] for params in params_list)
+        return len(params_list)
+
+
+class CompanysInfoIndexTest(SimpleTestCase):
+    """
+    媒体別のクエリでcompanys_infoのインデックスが使えるかをEXPLAINで確認
+    (DBに接続できない場合はスキップ)
+    """
+    # 確認するSQLと使えるべきインデックス
+    QUERIES = (
+        ("get_latest_page", "idx_companys_info_source_page"),
+        ("get_target_source_company_info", "idx_companys_info_source_add_date_company"),
+        ("get_fuma_company_info", "idx_companys_info_source_add_date_company"),
+    )
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.mdb = MariaDbManager()
+        try:
+            cls.mdb.generate_cursor()
+        except Exception as e:
+            raise unittest.SkipTest(f"DBに接続できません: {e}")
+        if not cls.mdb.execute(sql="SHOW TABLES LIKE 'companys_info'"):
+            cls.mdb.close()
+            raise unittest.SkipTest("companys_infoテーブルがありません")
+        # 行数が少ないテーブルでも全件走査よりインデックスを選ぶようにする
+        cls.mdb.cursor.execute("SET SESSION max_seeks_for_key = 1")
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.mdb.close()
+        super().tearDownClass()
+
+    def _explain(self, name: str) -> List[Dict[str, Any]]:
+        statement = get_sql_registry(sql_dir=SQL_DIR).get(name=name)
+        self.mdb.cursor.execute(f"EXPLAIN {statement.sql}", statement.bind({"source": "Fuma"}))
+        rows = self.mdb.cursor.fetchall()
+        return [dict(zip(self.mdb.cursor.column_names, row)) for row in rows]
+
+    def test_source_queries_use_index(self) -> None:
+        for name, index_name in self.QUERIES:
+            with self.subTest(sql=name):
+                plan = [row for row in self._explain(name=name)
+                        if row["table"] == "companys_info"]
+                self.assertTrue(plan)
+                for row in plan:
+                    self.assertIn(index_name, row["possible_keys"] or "")
+                    self.assertEqual(
+                        row["key"], index_name, f"{name} でインデックスが使われていません: {row}")
+
+
+class ResolveCompanyListTest(ScraperTestMixin, SimpleTestCase):
+    """
+    URL取得の並行処理と途中保存
+    """
+    def test_interrupt_cancels_queued_and_saves_finished(self) -> None:
+        scraper = self.create_scraper(resolve_workers=4)
+        resolved = []
+
+        def build_record(company_name: str) -> Dict[str, str]:
+            if company_name == "2":
+                raise KeyboardInterrupt()
+            time.sleep(0.05)
+            resolved.append(company_name)
+            return {"name": company_name, "url": "", "source": "test"}
+
+        saved = []
+        with mock.patch.object(scraper, "_checkpoint", side_effect=lambda data_list: saved.extend(data_list)):
+            with self.assertRaises(KeyboardInterrupt):
+                scraper._resolve_company_list(
+                    company_name_list=[str(i) for i in range(40)],
+                    source="test",
+                    build_record=build_record
+                )
+        # 中断後は未着手の社名を検索しない
+        self.assertLess(len(resolved), 10)
+        # 検索を終えた分は保存する
+        self.assertEqual(sorted(record["name"] for record in saved), sorted(resolved))
+
+    def test_results_keep_input_order(self) -> None:
+        scraper = self.create_scraper(resolve_workers=4)
+        with mock.patch.object(scraper, "_checkpoint"):
+            company_info = scraper._resolve_company_list(
+                company_name_list=[str(i) for i in range(20)],
+                source="test",
+                build_record=lambda company_name: (
+                    time.sleep(0.001 * (20 - int(company_name))), {"name": company_name})[1]
+            )
+        self.assertEqual([record["name"] for record in company_info], [str(i) for i in range(20)])
+
+
+class IterListingPagesTest(ScraperTestMixin, SimpleTestCase):
+    """
+    一覧ページの取得状況の保存・再開と、未登録の会社がないページでの終了
+    """
+    PAGES = {
+        "p1": ListingPage(company_names=["a社", "b社"], next_url="p2"),
+        "p2": ListingPage(company_names=["c社", "d社"], next_url="p3"),
+        "p3": ListingPage(company_names=["e社", "f社"], next_url="p4"),
+        "p4": ListingPage(company_names=["g社"], next_url=""),
+    }
+
+    def iter_pages(self, scraper: GetCompanyInfoMixin, saved: List[Dict[str, Any]]) -> List[ListingPage]:
+        with mock.patch.object(scraper, "save_crawl_state",
+                               side_effect=lambda **kwargs: saved.append(kwargs)):
+            return list(scraper.iter_listing_pages(
+                start_url="p1", get_listing_page=self.PAGES.get, source="test"))
+
+    def test_resume_from_saved_page_with_crawled_names(self) -> None:
+        scraper = self.create_scraper()
+        # 前回は2ページ目まで取得し、会社名のURL取得・保存までは終わらずに中断
+        with mock.patch.object(scraper, "save_crawl_state"):
+            scraper.checkpoint_crawl_state(
+                source="test", facet="p1", company_names=["c社", "d社"],
+                page_url="p2", next_url="p3", page_count=2)
+        saved = []
+        with mock.patch.object(scraper, "load_crawl_state",
+                               return_value=CrawlState(next_url="p3", page_count=2)):
+            pages = self.iter_pages(scraper=scraper, saved=saved)
+        self.assertEqual(
+            [list(page.company_names) for page in pages], [["c社", "d社"], ["e社", "f社"], ["g社"]])
+        self.assertEqual(
+            [(state["page_url"], state["next_url"], state["page_count"]) for state in saved],
+            [("p3", "p4", 3), ("p4", "", 4)])
+
+    def test_incremental_stop_after_known_pages(self) -> None:
+        scraper = self.create_scraper(incremental_pages=2)
+        scraper.name_index = NameIndex(names=[
+            scraper._get_company_key(company_name=name) for name in ("c社", "d社", "e社", "f社")])
+        saved = []
+        with mock.patch.object(scraper, "load_crawl_state", return_value=None):
+            pages = self.iter_pages(scraper=scraper, saved=saved)
+        # 未登録の会社がないページが2ページ続いた時点で終了し、完了として保存
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(saved[-1]["page_url"], "p3")
+        self.assertEqual(saved[-1]["next_url"], "")
+
+    def test_failed_names_stay_in_crawl_journal(self) -> None:
+        scraper = self.create_scraper()
+        with mock.patch.object(scraper, "save_crawl_state"):
+            scraper.checkpoint_crawl_state(
+                source="test", facet="p1", company_names=["a社", "b社", "c社"],
+                page_url="p1", next_url="", page_count=1)
+
+        def build_record(company_name: str) -> Dict[str, str]:
+            if company_name == "b社":
+                raise ValueError()
+            return {"name": company_name}
+
+        with mock.patch.object(scraper, "_checkpoint"):
+            scraper._resolve_company_list(
+                company_name_list=["a社", "b社", "c社"], source="test", build_record=build_record)
+        # URL取得に失敗した会社名だけを次回取得し直す
+        self.assertEqual(scraper.load_crawled_names(source="test", facet="p1"), ["b社"])
+        with mock.patch.object(scraper, "load_crawl_state", return_value=None):
+            pages = self.iter_pages(scraper=scraper, saved=[])
+        self.assertEqual(list(pages[0].company_names), ["b社"])
+
+
+class GreenListingPageTest(ScraperTestMixin, SimpleTestCase):
+    """
+    Greenの一覧ページ(ページャがHTMLにない場合)の終了判定
+    """
+    def create_green(self, last_page: int, **kwargs) -> GetCompanyInfoGreen:
+        scraper = GetCompanyInfoGreen(
+            keyword="IT", interval=0, use_url_cache=False, journal_dir=self.journal_dir, **kwargs)
+        scraper.slack_client = FakeSlackClient()
+        scraper.name_index = NameIndex()
+
+        def parse_html(url_: str) -> bs:
+            # 範囲外のページ番号は最終ページを返す
+            page = min(scraper._get_page_number(url_=url_), last_page)
+            return bs("".join(
+                f'<div class="MuiTypography-subtitle2">{page}-{i}社</div>' for i in range(2)), "lxml")
+
+        scraper.parse_html = parse_html
+        return scraper
+
+    def iter_pages(self, scraper: GetCompanyInfoGreen) -> List[ListingPage]:
+        output_list = CompanyNameSet()
+        pages = []
+        for listing_page in scraper.iter_listing_pages(
+                start_url=scraper.SEARCH_PAGE_URL,
+                get_listing_page=lambda url_: scraper._get_listing_page(url_=url_, output_list=output_list)):
+            output_list.extend(listing_page.company_names)
+            pages.append(listing_page)
+        return pages
+
+    def test_stop_when_last_page_repeats(self) -> None:
+        pages = self.iter_pages(scraper=self.create_green(last_page=3))
+        self.assertEqual(
+            [list(page.company_names) for page in pages],
+            [["1-0社", "1-1社"], ["2-0社", "2-1社"], ["3-0社", "3-1社"], []])
+        self.assertEqual(pages[-1].next_url, "")
+
+    def test_stop_at_max_pages(self) -> None:
+        pages = self.iter_pages(scraper=self.create_green(last_page=1000, max_pages=5))
+        self.assertEqual(len(pages), 5)
+
+
+class PipelineResultsTest(ScraperTestMixin, SimpleTestCase):
+    """
+    社名の取得とURL取得を同時に進める場合の結果の順序・待たせる件数
+    """
+    def test_results_keep_crawl_order_within_window(self) -> None:
+        scraper = self.create_scraper(resolve_workers=3, pipeline_queue_size=100)
+        crawled = []
+
+        def company_names():
+            for i in range(40):
+                crawled.append(i)
+                yield str(i)
+
+        def resolve(company_name: str) -> Dict[str, str]:
+            # 先頭ほど遅く終わる
+            time.sleep(0.001 * (40 - int(company_name)))
+            return {"name": company_name}
+
+        results = []
+        ahead = []
+        for record in scraper._iter_pipeline_results(
+                company_names=company_names(),
+                source="test",
+                resolve=resolve,
+                get_company_name=lambda company_name: company_name):
+            results.append(record["name"])
+            ahead.append(len(crawled) - len(results))
+            time.sleep(0.002)
+        self.assertEqual(results, [str(i) for i in range(40)])
+        # 呼び出し元へ返していない社名は2*ワーカー数(+取得済みで待っている1件)まで
+        self.assertLessEqual(max(ahead), 2 * 3 + 1)
+
+    def test_close_releases_listing_generator(self) -> None:
+        scraper = self.create_scraper(resolve_workers=2)
+        closed = threading.Event()
+
+        def company_names():
+            try:
+                for i in range(1000):
+                    yield str(i)
+            finally:
+                # 一覧ページ用のブラウザ・取得状況を手放す処理の代わり
+                closed.set()
+
+        results = scraper._iter_pipeline_results(
+            company_names=company_names(),
+            source="test",
+            resolve=lambda company_name: {"name": company_name},
+            get_company_name=lambda company_name: company_name
+        )
+        self.assertEqual(next(results), {"name": "0"})
+        results.close()
+        self.assertTrue(closed.is_set())
+
+
+class TouchKnownCompaniesTest(ScraperTestMixin, SimpleTestCase):
+    """
+    検索せずに除いた登録済みの会社の更新
+    """
+    def test_resume_page_advances_when_all_companies_known(self) -> None:
+        scraper = self.create_scraper()
+        company_keys = [scraper._get_company_key(company_name=name) for name in ("a社", "b社")]
+        scraper.name_index = NameIndex(names=company_keys)
+        fake_mdb = FakeMariaDbManager(
+            rows={company_key: {"source": "Fuma", "page": 1} for company_key in company_keys})
+        with mock.patch("scrapCompanyInfo.MariaDbManager", fake_mdb), \
+                mock.patch.object(scraper, "_checkpoint"):
+            self.assertEqual(scraper.get_page(source="Fuma"), 1)
+            # 2ページ目の会社がすべて登録済み
+            company_info = scraper._resolve_company_list(
+                company_name_list=[["a社", "", "", "2"], ["b社", "", "", "2"]],
+                source="Fuma",
+                build_record=lambda company_name: self.fail("登録済みの会社を検索しました"),
+                get_company_name=lambda company_name: company_name[0],
+                get_page=lambda company_name: company_name[3]
+            )
+            self.assertEqual(company_info, [])
+            # 次回は2ページ目の次から再開する
+            self.assertEqual(scraper.get_page(source="Fuma"), 2)
+
+
+class PrepareSchemaTest(ScraperTestMixin, SimpleTestCase):
+    """
+    テーブル作成・スキーマ変更の排他
+    """
+    def test_parallel_scrapers_apply_each_migration_once(self) -> None:
+        applied_versions = set()
+        scripts = []
+        scrapers = [self.create_scraper() for _ in range(4)]
+        threads = [
+            threading.Thread(target=scraper._prepare_schema,
+                             kwargs={"mdb": FakeSchemaDbManager(applied_versions, scripts)})
+            for scraper in scrapers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        migrations = list(GetCompanyInfoMixin.SQL_REGISTRY.names(prefix="migrations/"))
+        self.assertTrue(migrations)
+        self.assertEqual(len(applied_versions), len(migrations))
+        for name in migrations:
+            sql = GetCompanyInfoMixin.SQL_REGISTRY.get(name=name).sql
+            self.assertEqual(scripts.count(sql), 1, name)
+
+
+class InsertCompanyInfoTest(ScraperTestMixin, SimpleTestCase):
+    """
+    companys_infoへの登録(既存の会社は更新)
+    """
+    def test_upsert_binds_company_key_and_keeps_existing_values(self) -> None:
+        statement = GetCompanyInfoMixin.SQL_REGISTRY.get(name="insert_company_info")
+        update_sql = statement.sql.split("ON DUPLICATE KEY UPDATE")[1]
+        # 既存の会社は登録日時・媒体・ページのみ更新し、会社名・URLは上書きしない
+        self.assertIn("source = VALUES(source)", update_sql)
+        self.assertIn("page = COALESCE(VALUES(page), page)", update_sql)
+        self.assertNotIn("url", update_sql)
+        self.assertNotIn("company", update_sql)
+
+        scraper = self.create_scraper()
+        mdb = mock.Mock()
+        mdb.executemany_skip_invalid.return_value = (1, [(1, "Data too long")])
+        data_list = [
+            {"name": "株式会社A", "url": "", "page": "", "source": "Fuma"},
+            {"name": "B社", "url": "https://b.example.com", "page": 3, "source": "Fuma"},
+        ]
+        rejected = scraper.insert_company_info(mdb=mdb, data_list=data_list)
+        params_list = mdb.executemany_skip_invalid.call_args.kwargs["params_list"]
+        first = dict(zip(statement.param_names, params_list[0]))
+        self.assertEqual(first["company_key"], scraper._get_company_key(company_name="株式会社A"))
+        # URL・ページなしはNULLで登録
+        self.assertIsNone(first["url"])
+        self.assertIsNone(first["page"])
+        self.assertEqual(rejected, [(data_list[1], "Data too long")])
+
+
+class ScrapAllCompanyInfoTest(ScraperTestMixin, SimpleTestCase):
+    """
+    複数媒体の同時実行で共有するブラウザ・URL取得のワーカー
+    """
+    def create_orchestrator(self, names: List[str], **kwargs) -> ScrapAllCompanyInfo:
+        orchestrator = ScrapAllCompanyInfo(
+            names=names, interval=0, use_url_cache=False, journal_dir=self.journal_dir, **kwargs)
+        for scraper in orchestrator.scrapers.values():
+            scraper.slack_client = FakeSlackClient()
+            scraper.name_index = NameIndex()
+        return orchestrator
+
+    def test_browsers_cover_holding_sources_and_resolvers(self) -> None:
+        # Jobtalk・Engageは一覧の取得中にブラウザを借りたままにする
+        orchestrator = self.create_orchestrator(names=["Type", "Jobtalk", "Engage"], resolvers=3)
+        self.assertEqual(orchestrator.get_min_browsers(), 5)
+        self.assertEqual(orchestrator.browsers, 5)
+        for scraper in orchestrator.scrapers.values():
+            self.assertEqual(scraper.RESOLVE_WORKERS, 3)
+        # 同時に実行する媒体数が少なければ借りたままにするブラウザも少ない
+        orchestrator = self.create_orchestrator(names=["Type", "Jobtalk", "Engage"], workers=1, resolvers=3)
+        self.assertEqual(orchestrator.get_min_browsers(), 4)
+        with self.assertRaises(ValueError):
+            self.create_orchestrator(names=["Type", "Jobtalk", "Engage"], browsers=4, resolvers=3)
+
+    def test_sources_share_resolvers(self) -> None:
+        orchestrator = self.create_orchestrator(names=["Type", "Green", "Fuma"], resolvers=2)
+        running = []
+        max_running = []
+        lock = threading.Lock()
+
+        def build_record(company_name: str) -> Dict[str, str]:
+            with lock:
+                running.append(company_name)
+                max_running.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.remove(company_name)
+            return {"name": company_name}
+
+        def execute(scraper: GetCompanyInfoMixin, source: str, **kwargs) -> List[Dict[str, str]]:
+            return scraper._resolve_company_list(
+                company_name_list=[f"{source}{i}" for i in range(10)],
+                source=source,
+                build_record=build_record
+            )
+
+        for scraper in orchestrator.scrapers.values():
+            mock.patch.object(scraper, "execute", side_effect=lambda scraper=scraper, **kwargs: execute(
+                scraper=scraper, **kwargs)).start()
+            mock.patch.object(scraper, "_checkpoint").start()
+        self.addCleanup(mock.patch.stopall)
+        results = orchestrator.execute()
+        self.assertEqual([result.company_count for result in results], [10, 10, 10])
+        # 3媒体で同時に行う検索は共有のワーカー数まで
+        self.assertLessEqual(max(max_running), 2)
+        for scraper in orchestrator.scrapers.values():
+            self.assertIsNone(scraper.resolve_executor)
+
+
+class UrlCacheTest(ScraperTestMixin, SimpleTestCase):
+    """
+    会社URLキャッシュの一覧ページ毎の読み込みと、見つからなかった結果のキャッシュ
+    """
+    def test_prefetched_page_serves_urls_and_misses(self) -> None:
+        scraper = self.create_scraper(use_url_cache=True)
+        scraper._url_cache_ready = True
+        fake_mdb = FakeUrlCacheDbManager(urls={
+            scraper._get_company_key(company_name="a社"): "https://a.example.com",
+            # 前回検索して見つからなかった会社
+            scraper._get_company_key(company_name="b社"): "",
+        })
+        searched = []
+
+        def search_company_url(company_name: str) -> Dict[str, str]:
+            searched.append(company_name)
+            return {"name": company_name, "url": "https://c.example.com"}
+
+        with mock.patch("scrapCompanyInfo.MariaDbManager", fake_mdb), \
+                mock.patch.object(scraper, "search_company_url", side_effect=search_company_url):
+            scraper.prefetch_url_cache(company_names=["a社", "b社", "c社"])
+            urls = [scraper.get_company_url(company_name=name)["url"] for name in ("a社", "b社", "c社")]
+            scraper.flush_url_cache_hits()
+        self.assertEqual(urls, ["https://a.example.com", "", "https://c.example.com"])
+        # 見つからなかった結果は再検索しない
+        self.assertEqual(searched, ["c社"])
+        # ページ内の会社のキャッシュは1回のクエリで読み込む
+        selects = [sql for sql in fake_mdb.queries if sql.startswith("SELECT")]
+        self.assertEqual(len(selects), 1)
+        self.assertIn("IN (%s, %s, %s)", selects[0])
+        self.assertEqual(scraper.url_cache_stats, {"hit": 2, "miss": 1})
+        self.assertEqual(len(fake_mdb.hits), 2)
+
+
+class SyncCompanyInfoTest(TestCase):
+    """
+    companys_infoからCompany・CompanyListへの反映(synccompanyinfoコマンド)
+    """
+    def sync(self, rows: List[Any], chunk_size: int = 2) -> None:
+        mdb = mock.MagicMock()
+        mdb.__enter__.return_value = mdb
+        mdb.iter_rows.return_value = iter(rows)
+        with mock.patch("apps.scrap.management.commands.synccompanyinfo.MariaDbManager",
+                        return_value=mdb):
+            call_command("synccompanyinfo", chunk_size=chunk_size)
+
+    def test_creates_new_and_updates_changed_urls(self) -> None:
+        Company.objects.create(name="a社", url="https://old.example.com")
+        Company.objects.create(name="b社", url="https://b.example.com")
+        self.sync(rows=[
+            ("a社", "https://a.example.com"),
+            ("b社", ""),
+            ("c社", ""),
+            ("c社", "https://c.example.com"),
+            ("d社", None),
+        ])
+        self.assertEqual(
+            dict(Company.objects.values_list("name", "url")),
+            {
+                "a社": "https://a.example.com",
+                # URLなしの行では既存のURLを消さない
+                "b社": "https://b.example.com",
+                # 同じ会社名は後の行のURLを使う
+                "c社": "https://c.example.com",
+                "d社": None,
+            })
+        # 新しく登録した会社のみ会社リストを作成
+        self.assertEqual(
+            sorted(CompanyList.objects.values_list("company__name", flat=True)), ["c社", "d社"])
+
+    def test_rerun_does_not_duplicate(self) -> None:
+        rows = [("a社", "https://a.example.com"), ("b社", "")]
+        self.sync(rows=rows)
+        self.sync(rows=rows)
+        self.assertEqual(Company.objects.count(), 2)
+        self.assertEqual(CompanyList.objects.count(), 2)
+
+
+class FakeDriver:
+    """
+    WebDriverPoolTest用のドライバ
+    """
+    def __init__(self) -> None:
+        self.current_url = "about:blank"
+        self.quitted = False
+
+    def quit(self) -> None:
+        self.quitted = True
+
+
+class WebDriverPoolTest(SimpleTestCase):
+    """
+    起動済みのドライバを貸し出すプール
+    """
+    def setUp(self) -> None:
+        self.created: List[FakeDriver] = []
+
+    def _factory(self) -> FakeDriver:
+        driver = FakeDriver()
+        self.created.append(driver)
+        return driver
+
+    def test_checkin_reuses_driver(self) -> None:
+        pool = WebDriverPool(factory=self._factory, max_size=1)
+        driver = pool.checkout()
+        pool.checkin(driver=driver)
+        self.assertIs(pool.checkout(), driver)
+        self.assertEqual(len(self.created), 1)
+
+    def test_discard_and_max_uses(self) -> None:
+        pool = WebDriverPool(factory=self._factory, max_size=1, max_uses=2)
+        driver = pool.checkout()
+        pool.checkin(driver=driver, discard=True)
+        self.assertTrue(driver.quitted)
+        driver = pool.checkout()
+        self.assertIsNot(driver, self.created[0])
+        pool.checkin(driver=driver)
+        pool.checkin(driver=pool.checkout())
+        self.assertTrue(driver.quitted)
+
+    def test_checkout_timeout(self) -> None:
+        pool = WebDriverPool(factory=self._factory, max_size=1)
+        pool.checkout()
+        with self.assertRaises(WebDriverPoolTimeout):
+            pool.checkout(timeout=0.05)
+
+    def test_driver_is_returned_when_interrupted(self) -> None:
+        pool = WebDriverPool(factory=self._factory, max_size=1)
+        with self.assertRaises(ValueError):
+            with pool.driver():
+                raise ValueError()
+        self.assertTrue(self.created[0].quitted)
+
+        def crawl():
+            with pool.driver() as driver:
+                yield driver
+
+        generator = crawl()
+        next(generator)
+        # ジェネレータを途中で閉じてもプールへ戻る
+        generator.close()
+        self.assertTrue(self.created[1].quitted)
+        pool.checkout(timeout=0.05)
+
+
+class RateLimiterTest(SimpleTestCase):
+    """
+    トークンバケットのリミッタ
+    """
+    def test_burst_passes_without_wait(self) -> None:
+        rate_limiter = RateLimiter(interval=60, burst=2)
+        self.assertEqual(rate_limiter.wait(), 0)
+        self.assertEqual(rate_limiter.wait(), 0)
+
+    def test_waits_interval_after_burst(self) -> None:
+        rate_limiter = RateLimiter(interval=0.05)
+        rate_limiter.wait()
+        wait_sec = rate_limiter.wait()
+        self.assertGreater(wait_sec, 0)
+        self.assertLessEqual(wait_sec, 0.05)
+
+    def test_defer_blocks_until_released(self) -> None:
+        rate_limiter = RateLimiter(interval=0)
+        rate_limiter.defer(seconds=0.05)
+        started = time.monotonic()
+        rate_limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+
+    def test_shared_by_key_and_interval_is_raised(self) -> None:
+        rate_limiter = get_rate_limiter(key="tests.example.com", interval=1)
+        self.assertIs(get_rate_limiter(key="tests.example.com", interval=3), rate_limiter)
+        self.assertEqual(rate_limiter.interval, 3)
+
+
+class AdaptivePacerTest(SimpleTestCase):
+    """
+    応答を見てアクセス間隔を調整するペーサ
+    """
+    def _create_pacer(self, interval: float = 2.0) -> AdaptivePacer:
+        return AdaptivePacer(
+            host="example.com",
+            rate_limiter=RateLimiter(interval=interval),
+            min_interval=1.0,
+            max_interval=10.0
+        )
+
+    def test_backoff_on_too_many_requests(self) -> None:
+        pacer = self._create_pacer()
+        decision = pacer.observe(latency=0.1, status=429)
+        self.assertEqual(decision.reason, "backoff")
+        self.assertEqual(pacer.interval, 4.0)
+
+    def test_interval_is_clamped(self) -> None:
+        pacer = self._create_pacer()
+        pacer.observe(latency=0.1, status=503, retry_after=60)
+        self.assertEqual(pacer.interval, 10.0)
+        pacer = self._create_pacer(interval=1.0)
+        pacer.observe(latency=0.1, status=200)
+        self.assertEqual(pacer.interval, 1.0)
+
+    def test_speedup_and_hold(self) -> None:
+        pacer = self._create_pacer()
+        self.assertEqual(pacer.observe(latency=0.1, status=200).reason, "speedup")
+        self.assertAlmostEqual(pacer.interval, 1.6)
+        self.assertEqual(pacer.observe(latency=0.1, status=404).reason, "hold")
+        self.assertAlmostEqual(pacer.interval, 1.6)
+
+    def test_parse_retry_after(self) -> None:
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+
+
+class SqlRegistryTest(SimpleTestCase):
+    """
+    名前付きプレースホルダのSQLの変換
+    """
+    def test_named_params_are_converted_in_order(self) -> None:
+        statement = parse_statement(
+            name="test", sql="SELECT * FROM t WHERE a = %(a)s AND b = %(b)s AND c = %(a)s;\n")
+        self.assertEqual(statement.sql, "SELECT * FROM t WHERE a = %s AND b = %s AND c = %s")
+        self.assertEqual(statement.bind({"a": 1, "b": 2}), (1, 2, 1))
+        self.assertTrue(statement.returns_rows)
+        with self.assertRaises(KeyError):
+            statement.bind({"a": 1})
+
+    def test_list_params_are_expanded(self) -> None:
+        statement = parse_statement(
+            name="test", sql="SELECT * FROM t WHERE a IN (%(a)s) AND b = %(b)s")
+        self.assertEqual(
+            statement.expand({"a": ["x", "y", "z"], "b": 1}),
+            ("SELECT * FROM t WHERE a IN (%s, %s, %s) AND b = %s", ("x", "y", "z", 1)))
+        with self.assertRaises(ValueError):
+            statement.expand({"a": [], "b": 1})
+
+    def test_rejects_embedded_values(self) -> None:
+        for sql in ("SELECT * FROM {table}", "SELECT * FROM t WHERE a = %s", " "):
+            with self.subTest(sql=sql):
+                with self.assertRaises(ValueError):
+                    parse_statement(name="test", sql=sql)
+
+    def test_registered_sql(self) -> None:
+        statement = get_sql_registry(sql_dir=SQL_DIR).get(name="insert_company_info")
+        self.assertFalse(statement.returns_rows)
+        self.assertEqual(statement.param_names,
+                ("company", "company_key", "url", "employees", "capital", "page", "source"))
+        with self.assertRaises(KeyError):
+            get_sql_registry(sql_dir=SQL_DIR).get(name="not_found")
+
+
+class RecordJournalTest(SimpleTestCase):
+    """
+    DBへ書き込む前のデータのジャーナル
+    """
+    def setUp(self) -> None:
+        self.journal_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.journal_dir, "test.jsonl")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.journal_dir, ignore_errors=True)
+
+    def test_read_ignores_partial_line(self) -> None:
+        journal = RecordJournal(path=self.path)
+        journal.append(records=[{"name": "A社"}, {"name": "B社"}])
+        with open(file=self.path, mode="a", encoding="utf-8") as fjournal:
+            fjournal.write('{"name": "C')
+        records, _ = journal.read()
+        self.assertEqual(records, [{"name": "A社"}, {"name": "B社"}])
+
+    def test_discard_keeps_appended_after_read(self) -> None:
+        journal = RecordJournal(path=self.path)
+        journal.append(records=[{"name": "A社"}])
+        _, size = journal.read()
+        journal.append(records=[{"name": "B社"}])
+        journal.discard(size=size)
+        self.assertEqual(journal.read()[0], [{"name": "B社"}])
+        _, size = journal.read()
+        journal.discard(size=size)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_reject_and_shared_journal(self) -> None:
+        journal = get_journal(path=self.path)
+        self.assertIs(get_journal(path=self.path), journal)
+        journal.reject(records=[{"name": "A社", "error": "Data too long"}])
+        self.assertEqual(RecordJournal(path=journal.rejected_path).read()[0],
+                [{"name": "A社", "error": "Data too long"}])
+        self.assertEqual(journal.read(), ([], 0))
+
+
+class CompanyNameSetTest(SimpleTestCase):
+    """
+    正規化した会社名をキーに順序を保つ集合
+    """
+    def test_keeps_first_item_in_order(self) -> None:
+        company_names = CompanyNameSet(items=["Ｂ社 ", "A社", "b社"])
+        self.assertEqual(list(company_names), ["Ｂ社 ", "A社"])
+        self.assertIn("a社", company_names)
+        self.assertFalse(company_names.add("a 社"))
+        self.assertTrue(company_names.add("c社"))
+        self.assertEqual(len(company_names), 3)
+
+    def test_items_with_company_name(self) -> None:
+        company_names = CompanyNameSet(get_company_name=lambda item: item[0])
+        company_names.extend([["A社", "1000万円"], ["a社", "2000万円"]])
+        self.assertEqual(list(company_names), [["A社", "1000万円"]])
+
+
+class NameIndexTest(SimpleTestCase):
+    """
+    ハッシュ値で持つ会社名の集合
+    """
+    def test_contains_loaded_and_added_names(self) -> None:
+        name_index = NameIndex(names=["a社", "b社", "", "a社"])
+        self.assertEqual(len(name_index), 2)
+        self.assertIn("a社", name_index)
+        self.assertNotIn("c社", name_index)
+        self.assertTrue(name_index.add("c社"))
+        self.assertFalse(name_index.add("c社"))
+        self.assertFalse(name_index.add("b社"))
+        self.assertIn("c社", name_index)
+        self.assertEqual(len(name_index), 3)
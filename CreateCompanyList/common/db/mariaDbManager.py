@@ -1,13 +1,27 @@
 import os
 import re
-from typing import Union, Optional, Generator, List, Tuple
+import threading
+from typing import Any, Union, Optional, Generator, List, Mapping, Tuple
 
 import mysql.connector
+from mysql.connector import pooling
 from dotenv import load_dotenv
 
+from common.db.sqlRegistry import Statement
+
 # .env ファイルのロード
 load_dotenv()
 
+
+# プロセス内で共有するコネクションプール
+_pool: Optional[pooling.MySQLConnectionPool] = None
+# プールの空き数(使い切った場合は返却を待つ)
+_pool_slots: Optional[threading.BoundedSemaphore] = None
+_pool_lock = threading.Lock()
+# 行の値によらない(接続の切断等の)失敗
+CONNECTION_ERRORS = (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError)
+
+
 class MariaDbManager:
     """
     MariaDBを操作するクラス
@@ -17,36 +31,84 @@ class MariaDbManager:
         self.db_user = os.getenv("DB_USER")
         self.db_password = os.getenv("DB_PASSWORD")
         self.db_host = os.getenv("DB_HOST")
+        # プールの接続数(mysql.connectorの上限は32)
+        self.pool_size = min(max(int(os.getenv("DB_POOL_SIZE", 5)), 1), pooling.CNX_POOL_MAXSIZE)
+        # プールの空き待ちの上限(秒)
+        self.pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", 60))
+        self.conn = None
+        self.cursor = None
+
+
+    def __enter__(self) -> "MariaDbManager":
+        self.generate_cursor()
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type and self.conn is not None:
+            # 途中で失敗した処理は取り消す
+            try:
+                self.conn.rollback()
+            except mysql.connector.Error:
+                pass
+        self.close()
+
+
+    def _get_pool(self) -> Tuple[pooling.MySQLConnectionPool, threading.BoundedSemaphore]:
+        """プロセス内で共有するコネクションプールを取得(初回のみ作成)
+
+        Returns:
+            Tuple[MySQLConnectionPool, BoundedSemaphore]: プールとその空き数
+        """
+        global _pool, _pool_slots
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name="create_company_list",
+                    pool_size=self.pool_size,
+                    user=self.db_user,
+                    password=self.db_password,
+                    host=self.db_host,
+                    database=self.db_name
+                )
+                _pool_slots = threading.BoundedSemaphore(self.pool_size)
+            return _pool, _pool_slots
 
 
     def generate_cursor(self) -> None:
-        """DB接続
+        """プールから接続を借りてカーソルを生成(使用後はcloseで返却)
 
         Raises:
-            e: _description_
+            e: 接続できない場合、もしくはプールの空きを待ちきれない場合
         """
+        pool, pool_slots = self._get_pool()
+        if not pool_slots.acquire(timeout=self.pool_timeout):
+            raise pooling.PoolError(
+                f"no connection available in pool within {self.pool_timeout} seconds")
         try:
-            # DB接続
-            self.conn = mysql.connector.connect(
-                user=self.db_user,
-                password=self.db_password,
-                host=self.db_host,
-                database=self.db_name
-            )
+            self.conn = pool.get_connection()
+            # 切れている接続は張り直す
+            self.conn.ping(reconnect=True, attempts=3, delay=1)
             self.cursor = self.conn.cursor()
-        except mysql.connector.Error as e:
+        except Exception as e:
             # TODO エラーログ出力
-            self.conn.rollback()
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+            pool_slots.release()
             raise e
-        except Exception as error:
-            print(error)
 
 
-    def execute(self, sql: str) -> List[Union[Tuple[str], None]]:
+    def execute(
+        self,
+        sql: str,
+        params: Optional[Tuple[Union[str, int, None], ...]] = None
+    ) -> List[Union[Tuple[str], None]]:
         """SQL実行
 
         Args:
             sql (str): クエリ
+            params (Optional[Tuple], optional): プレースホルダ(%s)へバインドする値. Defaults to None.
 
         Raises:
             e: _description_
@@ -57,7 +119,7 @@ class MariaDbManager:
         results = []
         try:
             # SQL実行
-            self.cursor.execute(sql)
+            self.cursor.execute(sql, params)
             if re.match(r"^(INSERT|UPDATE|DELETE).*", sql, re.IGNORECASE):
                 # 結果をコミット
                 self.conn.commit()
@@ -72,8 +134,181 @@ class MariaDbManager:
             return results
 
 
+    def execute_statement(
+        self,
+        statement: Statement,
+        params: Mapping[str, Any] = {}
+    ) -> List[Tuple[Union[str, int, None], ...]]:
+        """登録済みのSQLを値をバインドして実行
+        (サーバ側のプリペアドステートメントは使わない.
+         プールへ返却した接続はセッションがリセット(COM_RESET_CONNECTION)され、
+         準備したステートメントも解放されるため、接続毎に準備結果を持っても使い回せない)
+
+        Args:
+            statement (Statement): 登録済みのSQL
+            params (Mapping[str, Any], optional): プレースホルダ名と値(リストの値はIN (...)用に展開). Defaults to {}.
+
+        Raises:
+            e: 失敗した場合はロールバックして送出
+
+        Returns:
+            List[Tuple]: 結果行(結果を返さないSQLはコミットして空リスト)
+        """
+        sql, values = statement.expand(params)
+        try:
+            self.cursor.execute(sql, values)
+            if statement.returns_rows:
+                return self.cursor.fetchall()
+            self.conn.commit()
+            return []
+        except mysql.connector.Error as e:
+            # TODO エラーログ出力
+            self.conn.rollback()
+            raise e
+
+
+    def iter_rows(
+        self,
+        sql: str,
+        params: Optional[Tuple[Union[str, int, None], ...]] = None,
+        chunk_size: int = 1000
+    ) -> Generator[Tuple[Union[str, int, None], ...], None, None]:
+        """結果を全件メモリに載せず、サーバから少しずつ読み出す(非バッファカーソル)
+
+        Args:
+            sql (str): クエリ
+            params (Optional[Tuple], optional): プレースホルダ(%s)へバインドする値. Defaults to None.
+            chunk_size (int, optional): 1回に読み出す行数. Defaults to 1000.
+
+        Yields:
+            Tuple: 1行分のデータ
+        """
+        cursor = self.conn.cursor(buffered=False)
+        try:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(size=chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            # 途中で止めた場合も読み残しを捨てて接続を使える状態に戻す
+            if self.conn.unread_result:
+                self.conn.consume_results()
+            cursor.close()
+
+
+    def execute_script(self, sql: str) -> None:
+        """;区切りの複数のSQLを順に実行(DDL等の結果を返さないSQL用)
+
+        Args:
+            sql (str): クエリ
+
+        Raises:
+            e: 失敗した場合はロールバックして送出
+        """
+        try:
+            for statement in re.split(r";\s*(?:\r?\n|$)", sql):
+                if statement.strip():
+                    self.cursor.execute(statement)
+            self.conn.commit()
+        except mysql.connector.Error as e:
+            # TODO エラーログ出力
+            self.conn.rollback()
+            raise e
+
+
+    def executemany(
+        self,
+        sql: str,
+        params_list: List[Tuple[Union[str, int, None], ...]],
+        batch_size: int = 500
+    ) -> int:
+        """複数行分のSQLをまとめて実行(バッチ毎にコミット)
+
+        Args:
+            sql (str): プレースホルダ(%s)付きのクエリ
+            params_list (List[Tuple]): 1行毎にバインドする値のリスト
+            batch_size (int, optional): 1回のコミットで実行する行数. Defaults to 500.
+
+        Raises:
+            e: 実行に失敗したバッチはロールバックして送出
+
+        Returns:
+            int: 影響を受けた行数
+        """
+        rowcount = 0
+        batch_size = max(batch_size, 1)
+        for i in range(0, len(params_list), batch_size):
+            try:
+                # 複数行をまとめて送信
+                self.cursor.executemany(sql, params_list[i:i + batch_size])
+                # バッチ単位でコミット
+                self.conn.commit()
+                rowcount += max(self.cursor.rowcount, 0)
+            except mysql.connector.Error as e:
+                # TODO エラーログ出力
+                self.conn.rollback()
+                raise e
+        return rowcount
+
+
+    def executemany_skip_invalid(
+        self,
+        sql: str,
+        params_list: List[Tuple[Union[str, int, None], ...]],
+        batch_size: int = 500
+    ) -> Tuple[int, List[Tuple[int, str]]]:
+        """複数行分のSQLをまとめて実行し、失敗したバッチは1行ずつ実行し直す
+        (値が不正で登録できない行だけを除いて反映する)
+
+        Args:
+            sql (str): プレースホルダ(%s)付きのクエリ
+            params_list (List[Tuple]): 1行毎にバインドする値のリスト
+            batch_size (int, optional): 1回のコミットで実行する行数. Defaults to 500.
+
+        Raises:
+            e: 接続の切断等、行の値によらない失敗の場合
+
+        Returns:
+            Tuple[int, List[Tuple[int, str]]]: 影響を受けた行数と、登録できなかった行の(位置, エラー内容)
+        """
+        rowcount = 0
+        rejected = []
+        batch_size = max(batch_size, 1)
+        for i in range(0, len(params_list), batch_size):
+            batch = params_list[i:i + batch_size]
+            try:
+                rowcount += self.executemany(sql=sql, params_list=batch, batch_size=batch_size)
+                continue
+            except CONNECTION_ERRORS as e:
+                raise e
+            except mysql.connector.Error:
+                # バッチはロールバック済みのため1行ずつ実行し直す
+                pass
+            for j, params in enumerate(batch, start=i):
+                try:
+                    rowcount += self.executemany(sql=sql, params_list=[params], batch_size=1)
+                except CONNECTION_ERRORS as e:
+                    raise e
+                except mysql.connector.Error as e:
+                    rejected.append((j, str(e)))
+        return rowcount, rejected
+
+
     def close(self) -> None:
-        """DB接続の切断
+        """接続をプールへ返却
         """
-        self.cursor.close()
-        self.conn.close()
+        if self.conn is None:
+            return
+        conn, cursor = self.conn, self.cursor
+        self.conn = self.cursor = None
+        _, pool_slots = self._get_pool()
+        try:
+            if cursor is not None:
+                cursor.close()
+        finally:
+            try:
+                conn.close()
+            finally:
+                pool_slots.release()
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import threading
+from typing import Any, Dict, List, Mapping, NamedTuple, Tuple
+
+# 名前付きプレースホルダ %(name)s
+NAMED_PARAM_PTN = re.compile(r"%\((\w+)\)s")
+# 許可しない埋め込み(str.format用の{name} と 位置指定の%s)
+FORMAT_FIELD_PTN = re.compile(r"\{\w*\}")
+POSITIONAL_PARAM_PTN = re.compile(r"%s")
+# 結果行を返すSQL
+ROWS_SQL_PTN = re.compile(r"^\s*(SELECT|SHOW|EXPLAIN|WITH)\b", re.IGNORECASE)
+
+
+class Statement(NamedTuple):
+    """
+    登録済みのSQL(名前付きプレースホルダを位置指定の%sへ変換済み)
+    """
+    name: str
+    sql: str
+    param_names: Tuple[str, ...]
+
+    @property
+    def returns_rows(self) -> bool:
+        return bool(ROWS_SQL_PTN.match(self.sql))
+
+    def bind(self, params: Mapping[str, Any] = {}) -> Tuple[Any, ...]:
+        """名前付きの値をプレースホルダの順に並べる
+
+        Args:
+            params (Mapping[str, Any], optional): プレースホルダ名と値. Defaults to {}.
+
+        Raises:
+            KeyError: 値が指定されていないプレースホルダがある場合
+
+        Returns:
+            Tuple[Any, ...]: バインドする値
+        """
+        missing = [name for name in self.param_names if name not in params]
+        if missing:
+            raise KeyError(f"{self.name}: missing sql params {missing}")
+        return tuple(params[name] for name in self.param_names)
+
+    def expand(self, params: Mapping[str, Any] = {}) -> Tuple[str, Tuple[Any, ...]]:
+        """名前付きの値をバインドし、リスト・タプルの値はIN (...)用に値の数だけのプレースホルダへ展開
+
+        Args:
+            params (Mapping[str, Any], optional): プレースホルダ名と値. Defaults to {}.
+
+        Raises:
+            KeyError: 値が指定されていないプレースホルダがある場合
+            ValueError: 空のリスト・タプルが指定された場合
+
+        Returns:
+            Tuple[str, Tuple[Any, ...]]: 展開後のSQLとバインドする値
+        """
+        values = self.bind(params)
+        parts = self.sql.split("%s")
+        sql = parts[0]
+        expanded = []
+        for name, value, part in zip(self.param_names, values, parts[1:]):
+            if isinstance(value, (list, tuple)):
+                if not value:
+                    raise ValueError(f"{self.name}: empty list for sql param {name}")
+                sql += ", ".join(["%s"] * len(value))
+                expanded.extend(value)
+            else:
+                sql += "%s"
+                expanded.append(value)
+            sql += part
+        return sql, tuple(expanded)
+
+
+def parse_statement(name: str, sql: str) -> Statement:
+    """SQLを検証して登録用に変換
+
+    Args:
+        name (str): SQLの名前
+        sql (str): %(name)s形式のプレースホルダを含むSQL
+
+    Raises:
+        ValueError: 空のSQL、もしくは{name}や%sで値を埋め込む形式のSQLの場合
+
+    Returns:
+        Statement: 変換後のSQL
+    """
+    sql = sql.strip()
+    if not sql:
+        raise ValueError(f"{name}: empty sql")
+    if FORMAT_FIELD_PTN.search(sql) or POSITIONAL_PARAM_PTN.search(sql):
+        raise ValueError(f"{name}: use named placeholders like %(name)s")
+    param_names = tuple(NAMED_PARAM_PTN.findall(sql))
+    return Statement(
+        name=name,
+        # 1文として実行できるよう末尾の;は外す
+        sql=NAMED_PARAM_PTN.sub("%s", sql).rstrip(";").rstrip(),
+        param_names=param_names
+    )
+
+
+class SqlRegistry:
+    """
+    ディレクトリ内の.sqlファイルを一度だけ読み込んで検証し、名前で引けるようにする
+    """
+    def __init__(self, sql_dir: str) -> None:
+        self.sql_dir = sql_dir
+        self._statements: Dict[str, Statement] = {}
+        for dirpath, _, filenames in os.walk(sql_dir):
+            for filename in filenames:
+                if not filename.endswith(".sql"):
+                    continue
+                filepath = os.path.join(dirpath, filename)
+                # ディレクトリからの相対パス(拡張子なし・/区切り)を名前とする
+                name = os.path.relpath(filepath, sql_dir)[:-len(".sql")].replace(os.sep, "/")
+                with open(file=filepath, mode="r", encoding="utf-8") as fsql:
+                    self._statements[name] = parse_statement(name=name, sql=fsql.read())
+
+
+    def get(self, name: str) -> Statement:
+        """名前からSQLを取得
+
+        Args:
+            name (str): SQLの名前(例: "insert_company_info", "migrations/V001__xxx")
+
+        Raises:
+            KeyError: 登録されていない名前の場合
+
+        Returns:
+            Statement: 登録済みのSQL
+        """
+        try:
+            return self._statements[name]
+        except KeyError:
+            raise KeyError(f"sql not found: {name} (in {self.sql_dir})")
+
+
+    def names(self, prefix: str = "") -> List[str]:
+        """登録済みのSQL名を昇順で取得
+
+        Args:
+            prefix (str, optional): 名前の前方一致で絞り込む. Defaults to "".
+
+        Returns:
+            List[str]: SQL名のリスト
+        """
+        return sorted(name for name in self._statements if name.startswith(prefix))
+
+
+# ディレクトリ毎に共有するレジストリ
+_registries: Dict[str, SqlRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_sql_registry(sql_dir: str) -> SqlRegistry:
+    """ディレクトリ毎に共有するレジストリを取得(初回のみ読み込み)
+
+    Args:
+        sql_dir (str): .sqlファイルを格納したディレクトリ
+
+    Returns:
+        SqlRegistry: SQLレジストリ
+    """
+    sql_dir = os.path.abspath(sql_dir)
+    with _registries_lock:
+        registry = _registries.get(sql_dir)
+        if registry is None:
+            registry = _registries[sql_dir] = SqlRegistry(sql_dir=sql_dir)
+        return registry
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Generator, List, Optional
+
+from dotenv import load_dotenv
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.firefox.webdriver import WebDriver as FirefoxWebDriver
+
+# .env ファイルのロード
+load_dotenv()
+
+
+class WebDriverPoolTimeout(Exception):
+    """
+    プールからドライバを取得できなかった場合の例外
+    """
+
+
+def create_firefox_driver() -> FirefoxWebDriver:
+    """ヘッドレスのFirefoxドライバを生成
+
+    Returns:
+        FirefoxWebDriver: Firefoxドライバ
+    """
+    options = webdriver.FirefoxOptions()
+    options.add_argument('--headless')
+    driver = webdriver.Firefox(options=options)
+    driver.set_window_size(1920, 2160)
+    driver.implicitly_wait(30)
+    return driver
+
+
+class WebDriverPool:
+    """
+    起動済みのWebドライバを貸し出すプール
+    """
+    def __init__(
+        self,
+        factory: Callable[[], FirefoxWebDriver],
+        max_size: int = 2,
+        max_uses: int = 50,
+        checkout_timeout: int = 600
+    ) -> None:
+        # ドライバ生成関数
+        self.factory = factory
+        # 同時に起動するドライバの上限
+        self.max_size = max_size
+        # 1つのドライバを使い回す上限回数(超えたら作り直す)
+        self.max_uses = max_uses
+        # 貸し出し待ちの上限時間(秒)
+        self.checkout_timeout = checkout_timeout
+        # 待機中のドライバ
+        self._idle: List[FirefoxWebDriver] = []
+        # 起動中の全ドライバ
+        self._drivers: Dict[int, FirefoxWebDriver] = {}
+        # ドライバ毎の利用回数
+        self._uses: Dict[int, int] = {}
+        self._cond = threading.Condition()
+
+
+    def ensure_capacity(self, size: int) -> None:
+        """同時に起動できるドライバ数を引き上げる
+
+        Args:
+            size (int): 必要なドライバ数
+        """
+        with self._cond:
+            if size > self.max_size:
+                self.max_size = size
+                self._cond.notify_all()
+
+
+    def checkout(self, timeout: Optional[int] = None) -> FirefoxWebDriver:
+        """ドライバを借りる
+
+        Args:
+            timeout (Optional[int], optional): 待機の上限時間(秒). Defaults to None.
+
+        Raises:
+            WebDriverPoolTimeout: 上限時間内に空きが出なかった場合
+
+        Returns:
+            FirefoxWebDriver: 利用可能なドライバ
+        """
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            driver = None
+            with self._cond:
+                while not self._idle and len(self._drivers) >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise WebDriverPoolTimeout(
+                            f"no webdriver available within {timeout} sec")
+                    self._cond.wait(timeout=remaining)
+                if self._idle:
+                    driver = self._idle.pop()
+                else:
+                    # 枠を確保してからロック外で起動
+                    placeholder = object()
+                    self._drivers[id(placeholder)] = placeholder
+            if driver is None:
+                try:
+                    driver = self.factory()
+                finally:
+                    with self._cond:
+                        self._drivers.pop(id(placeholder), None)
+                        if driver is not None:
+                            self._drivers[id(driver)] = driver
+                            self._uses[id(driver)] = 0
+                        self._cond.notify()
+                return driver
+            if self._is_healthy(driver=driver):
+                return driver
+            # 応答しないドライバは破棄して取り直す
+            self._discard(driver=driver)
+
+
+    def checkin(self, driver: FirefoxWebDriver, discard: bool = False) -> None:
+        """ドライバを返却
+
+        Args:
+            driver (FirefoxWebDriver): 返却するドライバ
+            discard (bool, optional): 再利用せずに破棄する場合True. Defaults to False.
+        """
+        with self._cond:
+            uses = self._uses.get(id(driver), 0) + 1
+            self._uses[id(driver)] = uses
+        if discard or uses >= self.max_uses:
+            # 使用上限に達したドライバは作り直す
+            self._discard(driver=driver)
+            return
+        with self._cond:
+            self._idle.append(driver)
+            self._cond.notify()
+
+
+    @contextmanager
+    def driver(self) -> Generator[FirefoxWebDriver, None, None]:
+        """with文でドライバを借りる
+        """
+        driver = self.checkout()
+        discard = False
+        try:
+            yield driver
+        except BaseException:
+            # 途中で中断(ジェネレータのclose・KeyboardInterrupt等を含む)したドライバは破棄
+            discard = True
+            raise
+        finally:
+            self.checkin(driver=driver, discard=discard)
+
+
+    def close_all(self) -> None:
+        """起動中の全ドライバを終了
+        """
+        with self._cond:
+            drivers = [d for d in self._drivers.values() if hasattr(d, "quit")]
+            self._drivers.clear()
+            self._uses.clear()
+            self._idle.clear()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+    def _is_healthy(self, driver: FirefoxWebDriver) -> bool:
+        """ドライバが応答するか確認
+        """
+        try:
+            _ = driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+
+    def _discard(self, driver: FirefoxWebDriver) -> None:
+        """ドライバを終了してプールから外す
+        """
+        with self._cond:
+            self._drivers.pop(id(driver), None)
+            self._uses.pop(id(driver), None)
+            self._cond.notify()
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+
+# プロセス内で共有するプール
+_shared_pool: Optional[WebDriverPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_pool() -> WebDriverPool:
+    """プロセス内で共有するFirefoxドライバのプールを取得
+
+    Returns:
+        WebDriverPool: 共有プール
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = WebDriverPool(
+                factory=create_firefox_driver,
+                max_size=int(os.getenv("WEBDRIVER_POOL_SIZE", 2)),
+                max_uses=int(os.getenv("WEBDRIVER_MAX_USES", 50))
+            )
+            # 終了時にブラウザを閉じる
+            atexit.register(_shared_pool.close_all)
+    return _shared_pool
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, NamedTuple, Union
+from urllib.parse import urlparse
+
+from common.utils.rateLimiter import RateLimiter, get_host_rate_limiter
+
+
+class PacingDecision(NamedTuple):
+    """
+    アクセス間隔の調整結果
+    """
+    host: str
+    reason: str
+    latency: float
+    status: Union[int, None]
+    old_interval: float
+    new_interval: float
+
+
+def parse_retry_after(value: Union[str, None]) -> Union[float, None]:
+    """Retry-Afterヘッダの値を秒数に変換
+
+    Args:
+        value (Union[str, None]): Retry-Afterヘッダの値(秒数 もしくは HTTP日付)
+
+    Returns:
+        Union[float, None]: 待機すべき秒数. 解釈できない場合はNone
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(retry_at.timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptivePacer:
+    """
+    サーバの応答(レイテンシ・ステータス・Retry-After)を見て、上下限の範囲でアクセス間隔を調整するペーサ
+    """
+    # 間隔を広げるステータス
+    BACKOFF_STATUS_LIST = (429, 503)
+
+    def __init__(
+        self,
+        host: str,
+        rate_limiter: RateLimiter,
+        min_interval: float,
+        max_interval: float,
+        slow_latency: float = 10.0,
+        backoff_factor: float = 2.0,
+        slowdown_factor: float = 1.5,
+        speedup_factor: float = 0.8
+    ) -> None:
+        self.host = host
+        self.rate_limiter = rate_limiter
+        # アクセス間隔の上下限(秒)
+        self.min_interval = min(min_interval, max_interval)
+        self.max_interval = max_interval
+        # 遅いと判断するレイテンシ(秒)
+        self.slow_latency = slow_latency
+        self.backoff_factor = backoff_factor
+        self.slowdown_factor = slowdown_factor
+        self.speedup_factor = speedup_factor
+        # レイテンシの移動平均
+        self._latency_avg: Union[float, None] = None
+        self._lock = threading.Lock()
+        self.rate_limiter.interval = self._clamp(self.rate_limiter.interval)
+
+
+    @property
+    def interval(self) -> float:
+        return self.rate_limiter.interval
+
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self.min_interval), self.max_interval)
+
+
+    def wait(self) -> float:
+        """アクセスできるまで待機
+
+        Returns:
+            float: 待機した時間(秒)
+        """
+        return self.rate_limiter.wait()
+
+
+    def observe(
+        self,
+        latency: float,
+        status: Union[int, None] = None,
+        retry_after: Union[float, None] = None,
+        failed: bool = False
+    ) -> PacingDecision:
+        """応答の結果からアクセス間隔を調整
+
+        Args:
+            latency (float): 応答までにかかった時間(秒)
+            status (Union[int, None], optional): HTTPステータス. 不明な場合はNone. Defaults to None.
+            retry_after (Union[float, None], optional): Retry-Afterで指定された秒数. Defaults to None.
+            failed (bool, optional): 通信自体が失敗したか. Defaults to False.
+
+        Returns:
+            PacingDecision: 調整結果
+        """
+        with self._lock:
+            old_interval = self.rate_limiter.interval
+            latency_avg = self._latency_avg
+            if status in self.BACKOFF_STATUS_LIST or retry_after:
+                # 混雑・制限の応答は大きく間隔を空ける
+                reason = "backoff"
+                new_interval = max(old_interval * self.backoff_factor, retry_after or 0.0)
+            elif failed or (status is not None and status >= 500):
+                reason = "error"
+                new_interval = old_interval * self.slowdown_factor
+            elif latency >= self.slow_latency \
+                    or (latency_avg is not None and latency > latency_avg * 2):
+                # 普段より応答が遅い
+                reason = "slow"
+                new_interval = old_interval * self.slowdown_factor
+            elif status is not None and status >= 400:
+                # ページ側の問題なので間隔は変えない
+                reason = "hold"
+                new_interval = old_interval
+            else:
+                reason = "speedup"
+                new_interval = old_interval * self.speedup_factor
+            new_interval = self._clamp(new_interval)
+            self.rate_limiter.interval = new_interval
+            if retry_after:
+                # 指定された時間はアクセスしない
+                self.rate_limiter.defer(seconds=retry_after)
+            if not failed:
+                self._latency_avg = latency if latency_avg is None \
+                        else latency_avg * 0.7 + latency * 0.3
+        return PacingDecision(
+            host=self.host,
+            reason=reason,
+            latency=latency,
+            status=status,
+            old_interval=old_interval,
+            new_interval=new_interval
+        )
+
+
+# プロセス内で共有するペーサ
+_pacers: Dict[str, AdaptivePacer] = {}
+_pacers_lock = threading.Lock()
+
+
+def get_host_pacer(
+    url: str,
+    interval: float,
+    min_interval: float,
+    max_interval: float,
+    burst: int = 1,
+    jitter: float = 0.0
+) -> AdaptivePacer:
+    """アクセス先ホスト毎に共有するペーサを取得
+
+    Args:
+        url (str): アクセス先のURL
+        interval (float): 開始時のアクセス間隔(秒)
+        min_interval (float): アクセス間隔の下限(秒)
+        max_interval (float): アクセス間隔の上限(秒)
+        burst (int, optional): 同一ホストへ連続でアクセスできる数. Defaults to 1.
+        jitter (float, optional): 待機時に加えるゆらぎの上限(秒). Defaults to 0.0.
+
+    Returns:
+        AdaptivePacer: ホスト単位の共有ペーサ
+    """
+    host = urlparse(url).netloc.lower()
+    with _pacers_lock:
+        pacer = _pacers.get(host)
+        if pacer is None:
+            pacer = _pacers[host] = AdaptivePacer(
+                host=host,
+                rate_limiter=get_host_rate_limiter(
+                        url=url, interval=interval, burst=burst, jitter=jitter),
+                min_interval=min_interval,
+                max_interval=max_interval
+            )
+        return pacer
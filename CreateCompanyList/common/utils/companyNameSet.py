@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+from typing import Any, Callable, Dict, Iterable, Iterator, Union
+
+from common.utils.utils import normalize_company_name
+
+
+class CompanyNameSet:
+    """
+    正規化した会社名をキーに、取得した順序を保って会社を持つ集合
+    (重複判定は会社名の文字列で行い、リストの線形探索はしない)
+    """
+    def __init__(
+        self,
+        items: Iterable[Any] = (),
+        get_company_name: Union[Callable[[Any], str], None] = None
+    ) -> None:
+        # 要素から会社名を取り出す関数(要素が会社名そのものの場合は不要)
+        self.get_company_name = get_company_name or (lambda item: item)
+        # 正規化した会社名 -> 要素(dictは挿入順を保つ)
+        self._items: Dict[str, Any] = {}
+        self.extend(items)
+
+
+    def __contains__(self, company_name: str) -> bool:
+        return normalize_company_name(company_name=company_name) in self._items
+
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._items.values())
+
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+    def __repr__(self) -> str:
+        return repr(list(self._items.values()))
+
+
+    def add(self, item: Any) -> bool:
+        """要素を追加(同じ会社名の要素がある場合は追加しない)
+
+        Args:
+            item (Any): 会社名 もしくは 会社名を含む要素
+
+        Returns:
+            bool: 追加した場合はTrue
+        """
+        key = normalize_company_name(company_name=self.get_company_name(item))
+        if key in self._items:
+            return False
+        self._items[key] = item
+        return True
+
+
+    def extend(self, items: Iterable[Any]) -> None:
+        """要素をまとめて追加
+
+        Args:
+            items (Iterable[Any]): 会社名 もしくは 会社名を含む要素
+        """
+        for item in items:
+            self.add(item)
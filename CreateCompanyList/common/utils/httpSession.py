@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+from typing import Optional, Tuple
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# .env ファイルのロード
+load_dotenv()
+
+# リトライ対象のHTTPステータス
+RETRY_STATUS_LIST = (429, 500, 502, 503, 504)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """
+    タイムアウト未指定のリクエストに既定のタイムアウトを設定するアダプタ
+    """
+    def __init__(self, timeout: Tuple[float, float], *args, **kwargs) -> None:
+        # (接続, 読み込み)のタイムアウト(秒)
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def _accept_encoding() -> str:
+    """対応している圧縮形式を取得
+    """
+    encodings = "gzip, deflate"
+    try:
+        # brotliが入っていればurllib3が展開できる
+        import brotli  # noqa: F401
+        encodings += ", br"
+    except ImportError:
+        pass
+    return encodings
+
+
+def create_http_session(
+    connect_timeout: float = 5.0,
+    read_timeout: float = 30.0,
+    retries: int = 3,
+    backoff_factor: float = 1.0,
+    pool_maxsize: int = 10
+) -> requests.Session:
+    """コネクションを使い回すHTTPセッションを生成
+
+    Args:
+        connect_timeout (float, optional): 接続タイムアウト(秒). Defaults to 5.0.
+        read_timeout (float, optional): 読み込みタイムアウト(秒). Defaults to 30.0.
+        retries (int, optional): リトライ回数. Defaults to 3.
+        backoff_factor (float, optional): リトライ間隔の係数(1, 2, 4...秒). Defaults to 1.0.
+        pool_maxsize (int, optional): ホスト毎に保持するコネクション数. Defaults to 10.
+
+    Returns:
+        requests.Session: HTTPセッション
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_LIST,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        # リトライしきった場合は最後のレスポンスを返す
+        raise_on_status=False
+    )
+    adapter = TimeoutHTTPAdapter(
+        timeout=(connect_timeout, read_timeout),
+        max_retries=retry,
+        pool_connections=pool_maxsize,
+        pool_maxsize=pool_maxsize
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": _accept_encoding()})
+    return session
+
+
+# プロセス内で共有するセッション
+_shared_session: Optional[requests.Session] = None
+_shared_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """プロセス内で共有するHTTPセッションを取得
+
+    Returns:
+        requests.Session: HTTPセッション
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = create_http_session(
+                connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", 5)),
+                read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", 30)),
+                retries=int(os.getenv("HTTP_RETRIES", 3)),
+                backoff_factor=float(os.getenv("HTTP_BACKOFF_FACTOR", 1)),
+                pool_maxsize=int(os.getenv("HTTP_POOL_MAXSIZE", 10))
+            )
+    return _shared_session
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Set
+
+
+def name_digest(name: str) -> int:
+    """名前を8バイトのハッシュ値に変換
+
+    Args:
+        name (str): 正規化済みの名前
+
+    Returns:
+        int: 64bitのハッシュ値
+    """
+    return int.from_bytes(
+        hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class NameIndex:
+    """
+    名前を8バイトのハッシュ値だけで保持する省メモリの集合
+    (ハッシュの衝突で未登録の名前を登録済みと判定する可能性はごく僅かにある)
+    """
+    def __init__(self, names: Iterable[str] = ()) -> None:
+        # 読み込み時の名前はソート済みの配列で持つ(1件8バイト)
+        self._digests = array("Q", sorted({name_digest(name) for name in names if name}))
+        # 後から追加した名前
+        self._added: Set[int] = set()
+        self._lock = threading.Lock()
+
+
+    def __len__(self) -> int:
+        return len(self._digests) + len(self._added)
+
+
+    def __contains__(self, name: str) -> bool:
+        digest = name_digest(name)
+        i = bisect_left(self._digests, digest)
+        if i < len(self._digests) and self._digests[i] == digest:
+            return True
+        return digest in self._added
+
+
+    def add(self, name: str) -> bool:
+        """名前を追加
+
+        Args:
+            name (str): 正規化済みの名前
+
+        Returns:
+            bool: 新しく追加した場合はTrue. 登録済みの場合はFalse
+        """
+        with self._lock:
+            if name in self:
+                return False
+            self._added.add(name_digest(name))
+            return True
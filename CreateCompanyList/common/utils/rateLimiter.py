@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+import random
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlparse
+
+
+class RateLimiter:
+    """
+    複数スレッドから呼ばれても一定のペースでしか処理を通さないリミッタ(トークンバケット)
+    """
+    def __init__(self, interval: float, burst: int = 1, jitter: float = 0.0) -> None:
+        # トークン1つが溜まるまでの時間(秒)
+        self.interval = interval
+        # 溜めておけるトークン数(連続で通せる数)
+        self.burst = max(int(burst), 1)
+        # 待機時に加えるゆらぎの上限(秒)
+        self.jitter = jitter
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        # この時刻までは処理を通さない
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+
+    def wait(self) -> float:
+        """処理を通せるまで待機
+
+        Returns:
+            float: 待機した時間(秒)
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.interval > 0:
+                # 経過時間分のトークンを補充
+                self._tokens = min(
+                    self._tokens + (now - self._updated) / self.interval,
+                    float(self.burst)
+                )
+            else:
+                self._tokens = float(self.burst)
+            self._updated = now
+            # トークンを1つ予約してからロックを外す(不足分はマイナスで持つ)
+            self._tokens -= 1
+            wait_sec = max(-self._tokens * self.interval, 0.0)
+            if self._blocked_until > now + wait_sec:
+                # 止められている間に来た処理は、解除後に間隔を空けて1つずつ通す
+                wait_sec = self._blocked_until - now
+                self._blocked_until += self.interval
+        if wait_sec and self.jitter:
+            # 待機が必要な時だけゆらぎを加える
+            wait_sec += random.uniform(0, self.jitter)
+        if wait_sec:
+            time.sleep(wait_sec)
+        return wait_sec
+
+
+    def defer(self, seconds: float) -> None:
+        """指定時間は処理を通さないようにする(Retry-After等)
+
+        Args:
+            seconds (float): 処理を止める時間(秒)
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+# プロセス内で共有するリミッタ
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    key: str,
+    interval: float,
+    burst: int = 1,
+    jitter: float = 0.0
+) -> RateLimiter:
+    """キー毎に共有するリミッタを取得
+
+    Args:
+        key (str): リミッタの識別子
+        interval (float): 処理の間隔(秒). 既存のリミッタより長い場合は引き上げる.
+        burst (int, optional): 連続で通せる数. Defaults to 1.
+        jitter (float, optional): 待機時に加えるゆらぎの上限(秒). 既存より大きい場合は引き上げる. Defaults to 0.0.
+
+    Returns:
+        RateLimiter: 共有リミッタ
+    """
+    with _rate_limiters_lock:
+        rate_limiter = _rate_limiters.get(key)
+        if rate_limiter is None:
+            rate_limiter = _rate_limiters[key] = RateLimiter(
+                    interval=interval, burst=burst, jitter=jitter)
+        else:
+            rate_limiter.interval = max(rate_limiter.interval, interval)
+            rate_limiter.jitter = max(rate_limiter.jitter, jitter)
+        return rate_limiter
+
+
+def get_host_rate_limiter(
+    url: str,
+    interval: float,
+    burst: int = 1,
+    jitter: float = 0.0
+) -> RateLimiter:
+    """アクセス先ホスト毎に共有するリミッタを取得
+
+    Args:
+        url (str): アクセス先のURL
+        interval (float): 同一ホストへのアクセス間隔(秒)
+        burst (int, optional): 同一ホストへ連続でアクセスできる数. Defaults to 1.
+        jitter (float, optional): 待機時に加えるゆらぎの上限(秒). Defaults to 0.0.
+
+    Returns:
+        RateLimiter: ホスト単位の共有リミッタ
+    """
+    return get_rate_limiter(
+        key=urlparse(url).netloc.lower(),
+        interval=interval,
+        burst=burst,
+        jitter=jitter
+    )
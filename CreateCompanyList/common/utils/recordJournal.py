@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Generator, List, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windowsではプロセス間の排他は行わない
+    fcntl = None
+
+
+class RecordJournal:
+    """
+    DBへ書き込む前のデータを1行1件(JSONL)で追記していくローカルのジャーナル
+    (同じファイルを扱う他のスレッド・プロセスとはロックファイルで排他する)
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # DBへ登録できなかったデータの退避先
+        self.rejected_path = f"{path}.rejected"
+        self._lock = threading.RLock()
+        # locked()の入れ子の深さ(ロックを持つスレッドのみ更新)
+        self._lock_depth = 0
+
+
+    @contextmanager
+    def locked(self) -> Generator[None, None, None]:
+        """ジャーナルを排他して操作する
+        (読み込みからdiscardまでを1つの処理として扱う場合に使用)
+        """
+        with self._lock:
+            if self._lock_depth or fcntl is None:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(file=f"{self.path}.lock", mode="a") as flock:
+                fcntl.flock(flock.fileno(), fcntl.LOCK_EX)
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                    fcntl.flock(flock.fileno(), fcntl.LOCK_UN)
+
+
+    def append(self, records: List[Dict[str, Any]]) -> None:
+        """データを追記(ディスクへの書き込みまで待つ)
+
+        Args:
+            records (List[Dict[str, Any]]): 追記するデータ
+        """
+        with self.locked():
+            self._append(path=self.path, records=records)
+
+
+    def reject(self, records: List[Dict[str, Any]]) -> None:
+        """DBへ登録できなかったデータを退避先へ追記
+
+        Args:
+            records (List[Dict[str, Any]]): 退避するデータ
+        """
+        with self.locked():
+            self._append(path=self.rejected_path, records=records)
+
+
+    @staticmethod
+    def _append(path: str, records: List[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(file=path, mode="a", encoding="utf-8") as fjournal:
+            fjournal.write(lines)
+            fjournal.flush()
+            os.fsync(fjournal.fileno())
+
+
+    def read(self) -> Tuple[List[Dict[str, Any]], int]:
+        """追記済みのデータを読み込む
+
+        Returns:
+            Tuple[List[Dict[str, Any]], int]: データと読み込んだバイト数(discardに渡す)
+        """
+        records = []
+        with self.locked():
+            if not os.path.exists(self.path):
+                return records, 0
+            with open(file=self.path, mode="rb") as fjournal:
+                data = fjournal.read()
+        # 書き込み途中で止まった末尾の行は読まない
+        size = data.rfind(b"\n") + 1
+        for line in data[:size].decode("utf-8").splitlines():
+            if line.strip():
+                records.append(json.loads(line))
+        return records, size
+
+
+    def discard(self, size: int) -> None:
+        """DBへの反映を確認できた先頭からsizeバイト分を削除
+
+        Args:
+            size (int): readで返されたバイト数
+        """
+        with self.locked():
+            if not size or not os.path.exists(self.path):
+                return
+            with open(file=self.path, mode="rb") as fjournal:
+                fjournal.seek(size)
+                rest = fjournal.read()
+            if not rest:
+                os.remove(self.path)
+                return
+            # 読み込み後に追記された分は残す
+            tmp_path = f"{self.path}.tmp"
+            with open(file=tmp_path, mode="wb") as fjournal:
+                fjournal.write(rest)
+                fjournal.flush()
+                os.fsync(fjournal.fileno())
+            os.replace(tmp_path, self.path)
+
+
+# ファイル毎に共有するジャーナル
+_journals: Dict[str, RecordJournal] = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(path: str) -> RecordJournal:
+    """ファイル毎に共有するジャーナルを取得(初回のみ作成)
+
+    Args:
+        path (str): ジャーナルのファイルパス
+
+    Returns:
+        RecordJournal: ジャーナル
+    """
+    path = os.path.abspath(path)
+    with _journals_lock:
+        journal = _journals.get(path)
+        if journal is None:
+            journal = _journals[path] = RecordJournal(path=path)
+        return journal
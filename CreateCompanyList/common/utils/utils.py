@@ -1,14 +1,14 @@
-import random
+import unicodedata
 
 
-def generate_interval(min: int = 60, max: int = 300) -> int:
-    """ランダムに待機時間を生成
+def normalize_company_name(company_name: str) -> str:
+    """照合用に会社名を正規化
 
     Args:
-        min (int, optional): 待機時間の下限(秒). Defaults to 60.
-        max (int, optional): 待機時間の上限(秒). Defaults to 300.
+        company_name (str): 会社名
 
     Returns:
-        int: 待機時間(秒)
+        str: 全角英数の半角化(NFKC)、空白除去、小文字化を行った会社名
     """
-    return random.randint(min, max)
\ No newline at end of file
+    normalized = unicodedata.normalize("NFKC", company_name)
+    return "".join(normalized.split()).lower()
\ No newline at end of file